@@ -1,22 +1,40 @@
 from django.contrib import admin
-from .models import Servicios, Empleados, Proveedores, Productos, Clientes, Carrito, CarritoItem, Pedido, PedidoItem
+from django.db.models import DecimalField, Prefetch, Value
+from django.db.models.functions import Coalesce
+from . import busqueda
+from .models import Servicios, Empleados, Proveedores, Productos, Clientes, Carrito, CarritoItem, Pedido, PedidoItem, Cita
 
 @admin.register(Servicios)
 class ServiciosAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'precio', 'duracion', 'tipo_servicio', 'empleados_asignados', 'clientes_asignados', 'productos_utilizados_nombres']
     search_fields = ['nombre', 'tipo_servicio']
     list_filter = ['tipo_servicio']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).para_listado()
+    
+    def get_search_results(self, request, queryset, search_term):
+        ids = busqueda.buscar_ids(search_term, 'servicio') if search_term else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
 
 @admin.register(Empleados)
 class EmpleadosAdmin(admin.ModelAdmin):
     list_display = ['nombre_completo', 'especialidad', 'cargo', 'servicio_nombre', 'telefono']
     list_filter = ['cargo', 'servicio']
     search_fields = ['nombre', 'apellido']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).para_listado()
 
 @admin.register(Proveedores)
 class ProveedoresAdmin(admin.ModelAdmin):
     list_display = ['nombre_empresa', 'contacto', 'telefono', 'email', 'especialidad', 'productos_proveidos']
     search_fields = ['nombre_empresa', 'contacto']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).para_listado()
 
 @admin.register(Productos)
 class ProductosAdmin(admin.ModelAdmin):
@@ -25,6 +43,15 @@ class ProductosAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'descripcion']
     filter_horizontal = ['servicios']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).para_listado()
+    
+    def get_search_results(self, request, queryset, search_term):
+        ids = busqueda.buscar_ids(search_term, 'producto') if search_term else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+    
     def estado_stock(self, obj):
         if obj.stock > 10:
             return 'Alto'
@@ -60,6 +87,26 @@ class ClientesAdmin(admin.ModelAdmin):
     ]
     list_editable = ['telefono']
     
+    def get_queryset(self, request):
+        # Columnas de historial desde ResumenCliente: consultas constantes y ordenables
+        return super().get_queryset(request).con_resumen().annotate(
+            num_pedidos=Coalesce('resumen__pedidos', 0),
+            gastado=Coalesce(
+                'resumen__total_gastado', Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+    
+    def pedidos_realizados(self, obj):
+        return obj.num_pedidos
+    pedidos_realizados.short_description = 'Pedidos realizados'
+    pedidos_realizados.admin_order_field = 'num_pedidos'
+    
+    def total_gastado(self, obj):
+        return obj.gastado
+    total_gastado.short_description = 'Total gastado'
+    total_gastado.admin_order_field = 'gastado'
+    
     fieldsets = (
         ('Información Personal', {
             'fields': ('usuario', 'nombre', 'apellido', 'email', 'telefono')
@@ -84,12 +131,8 @@ class ClientesAdmin(admin.ModelAdmin):
     
     def servicios_contratados_detalle(self, obj):
         """Mostrar servicios que realmente ha comprado"""
-        servicios = []
-        if obj.usuario:
-            for pedido in obj.usuario.pedidos.all():
-                for item in pedido.items.all():
-                    if item.servicio and item.servicio not in servicios:
-                        servicios.append(item.servicio)
+        resumen = obj.resumen_compras()
+        servicios = list(resumen.servicios.all()) if resumen else []
         
         if servicios:
             html = "<ul>"
@@ -103,12 +146,8 @@ class ClientesAdmin(admin.ModelAdmin):
     
     def productos_interes_detalle(self, obj):
         """Mostrar productos que realmente ha comprado"""
-        productos = []
-        if obj.usuario:
-            for pedido in obj.usuario.pedidos.all():
-                for item in pedido.items.all():
-                    if item.producto and item.producto not in productos:
-                        productos.append(item.producto)
+        resumen = obj.resumen_compras()
+        productos = list(resumen.productos.all()) if resumen else []
         
         if productos:
             html = "<ul>"
@@ -159,14 +198,17 @@ class ClientesAdmin(admin.ModelAdmin):
         return obj.usuario.is_active if obj.usuario else False
     activo.boolean = True
     activo.short_description = 'Activo'
+
 @admin.register(Carrito)
 class CarritoAdmin(admin.ModelAdmin):
     list_display = ['usuario', 'fecha_creacion', 'activo', 'total_items', 'total_carrito']
+    list_select_related = ['usuario']
 
 @admin.register(CarritoItem)
 class CarritoItemAdmin(admin.ModelAdmin):
     list_display = ['carrito', 'nombre_item', 'tipo', 'cantidad', 'subtotal']
     list_filter = ['tipo', 'carrito']
+    list_select_related = ['carrito__usuario', 'producto', 'servicio']
 
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
@@ -174,6 +216,7 @@ class PedidoAdmin(admin.ModelAdmin):
     list_filter = ['estado', 'fecha_pedido']
     readonly_fields = ['cliente_info', 'items_detalle']
     search_fields = ['usuario__username', 'usuario__email', 'id']
+    list_select_related = ['usuario__cliente']
     
     fieldsets = (
         ('Información del Pedido', {
@@ -184,18 +227,24 @@ class PedidoAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('items', queryset=PedidoItem.objects.select_related('producto', 'servicio'))
+        )
+    
     def cliente_asociado(self, obj):
         cliente = obj.cliente_asociado()
         if cliente:
-            return f"{cliente.nombre_completo}"
+            return cliente.nombre_completo()
         return "No asociado"
     cliente_asociado.short_description = 'Cliente'
+    cliente_asociado.admin_order_field = 'usuario__cliente__apellido'
     
     def cliente_info(self, obj):
         cliente = obj.cliente_asociado()
         if cliente:
             return f"""
-            <strong>Cliente:</strong> {cliente.nombre_completo}<br>
+            <strong>Cliente:</strong> {cliente.nombre_completo()}<br>
             <strong>Email:</strong> {cliente.email}<br>
             <strong>Teléfono:</strong> {cliente.telefono}<br>
             <strong>Alergias:</strong> {cliente.alergias or 'Ninguna'}<br>
@@ -225,4 +274,16 @@ class PedidoAdmin(admin.ModelAdmin):
 @admin.register(PedidoItem)
 class PedidoItemAdmin(admin.ModelAdmin):
     list_display = ['pedido', 'nombre_item', 'cantidad', 'precio', 'subtotal']
-    list_filter = ['pedido']
\ No newline at end of file
+    # Filtrar por pedido listaría todos los pedidos (y su usuario, uno por uno) en la barra lateral;
+    # un pedido se busca por su cliente o se abre con ?pedido__id__exact=<id>
+    list_filter = ['pedido__estado']
+    search_fields = ['pedido__usuario__username', 'producto__nombre', 'servicio__nombre']
+    list_select_related = ['pedido__usuario', 'producto', 'servicio']
+
+@admin.register(Cita)
+class CitaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'inicio', 'fin', 'servicio', 'empleado', 'estado', 'pedido']
+    list_filter = ['estado', 'fecha', 'servicio']
+    search_fields = ['empleado__nombre', 'empleado__apellido', 'pedido__usuario__username']
+    list_select_related = ['servicio', 'empleado', 'pedido__usuario']
+    date_hierarchy = 'fecha'
@@ -0,0 +1,241 @@
+"""
+Agenda de servicios: horarios libres por servicio y reserva de citas.
+
+La ocupación de cada empleado en cada día vive en AgendaDia como un bitset de bloques de
+RESOLUCION minutos entre APERTURA y CIERRE (132 bits, 17 bytes). Buscar disponibilidad
+lee una fila por empleado y día con citas, sin recorrer las citas, y resuelve con
+operaciones de bits sobre enteros de Python: un inicio con n bloques libres seguidos es
+un bit que sobrevive a libres & libres>>1 & ... & libres>>(n-1), calculado en log2(n) pasos.
+
+Reservar marca los bits con un UPDATE condicional sobre el valor leído (como el stock en
+Carrito.generar_pedido): si otro checkout tomó el día mientras tanto no actualiza nada
+y se intenta con otro empleado, así que dos pedidos no pueden quedarse el mismo turno.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import AgendaDia, CheckoutError, Cita, Empleados, Servicios
+
+RESOLUCION = 5  # minutos por bloque
+APERTURA = datetime.time(9)
+CIERRE = datetime.time(20)
+PASO_OFERTA = 15  # cada cuántos minutos se ofrece un inicio
+MAX_DIAS = 62
+
+BLOQUES = (CIERRE.hour * 60 + CIERRE.minute - APERTURA.hour * 60 - APERTURA.minute) // RESOLUCION
+COMPLETO = (1 << BLOQUES) - 1
+OFRECIDOS = sum(1 << bloque for bloque in range(0, BLOQUES, PASO_OFERTA // RESOLUCION))
+BYTES = (BLOQUES + 7) // 8
+
+
+class HorarioNoDisponible(CheckoutError):
+    pass
+
+
+def a_entero(ocupacion):
+    return int.from_bytes(ocupacion or b'', 'little')
+
+
+def a_bytes(mascara):
+    return mascara.to_bytes(BYTES, 'little')
+
+
+def _minutos(hora):
+    return (hora.hour - APERTURA.hour) * 60 + hora.minute - APERTURA.minute
+
+
+def bloque(hora, redondear_arriba=False):
+    """Índice del bloque que empieza en `hora` (o del siguiente si no cae justo en uno)"""
+    minutos = _minutos(hora)
+    return -(-minutos // RESOLUCION) if redondear_arriba else minutos // RESOLUCION
+
+
+def hora(indice):
+    minutos = APERTURA.hour * 60 + APERTURA.minute + indice * RESOLUCION
+    return datetime.time(minutos // 60, minutos % 60)
+
+
+def bloques_servicio(duracion):
+    return max(1, -(-duracion // RESOLUCION))
+
+
+def mascara(inicio, bloques):
+    return ((1 << bloques) - 1) << inicio
+
+
+def mascara_cita(inicio, fin):
+    primero = max(bloque(inicio), 0)
+    ultimo = min(bloque(fin, redondear_arriba=True), BLOQUES)
+    return mascara(primero, ultimo - primero) if ultimo > primero else 0
+
+
+def inicios_posibles(libres, bloques):
+    """Bits s de `libres` tales que s .. s+bloques-1 también están libres"""
+    alcance = 1
+    while alcance < bloques:
+        paso = min(alcance, bloques - alcance)
+        libres &= libres >> paso
+        alcance += paso
+    return libres
+
+
+def _desde_ahora(fecha, ahora):
+    """Bloques que todavía se pueden ofrecer en `fecha`"""
+    hoy = ahora.date()
+    if fecha < hoy:
+        return 0
+    if fecha > hoy:
+        return COMPLETO
+    primero = bloque(ahora.time().replace(second=0, microsecond=0), redondear_arriba=True)
+    if primero >= BLOQUES:
+        return 0
+    return COMPLETO & ~((1 << max(primero, 0)) - 1)
+
+
+def horarios(mascara_inicios):
+    return [hora(indice) for indice in range(BLOQUES) if mascara_inicios >> indice & 1]
+
+
+def disponibilidad(servicio, desde, dias=7, ahora=None):
+    """
+    Inicios libres con cualquier empleado del servicio, por día: [(fecha, [hora, ...])].
+    Dos consultas en total, sin importar cuántas citas haya en el rango.
+    """
+    dias = min(max(dias, 1), MAX_DIAS)
+    hasta = desde + datetime.timedelta(days=dias - 1)
+    ahora = timezone.localtime(ahora)
+    bloques = bloques_servicio(servicio.duracion)
+    total_empleados = Empleados.objects.filter(servicio_id=servicio.pk).count()
+    por_dia = defaultdict(list)
+    filas = AgendaDia.objects.filter(
+        empleado__servicio_id=servicio.pk, fecha__gte=desde, fecha__lte=hasta,
+    ).values_list('fecha', 'ocupacion')
+    for fecha, ocupacion in filas:
+        por_dia[fecha].append(a_entero(ocupacion))
+
+    dia_libre = inicios_posibles(COMPLETO, bloques) & OFRECIDOS
+    resultado = []
+    for desplazamiento in range(dias):
+        fecha = desde + datetime.timedelta(days=desplazamiento)
+        vigentes = _desde_ahora(fecha, ahora) & OFRECIDOS
+        if not total_empleados or not vigentes:
+            resultado.append((fecha, []))
+            continue
+        ocupaciones = por_dia.get(fecha, ())
+        if len(ocupaciones) < total_empleados:
+            # Algún empleado no tiene citas ese día
+            inicios = dia_libre
+        else:
+            inicios = 0
+            for ocupacion in ocupaciones:
+                inicios |= inicios_posibles(COMPLETO & ~ocupacion, bloques)
+                if inicios & dia_libre == dia_libre:
+                    break
+        resultado.append((fecha, horarios(inicios & vigentes)))
+    return resultado
+
+
+def _validar(servicio, fecha, hora_inicio, ahora):
+    if _minutos(hora_inicio) % RESOLUCION or hora_inicio.second or hora_inicio.microsecond:
+        raise HorarioNoDisponible(f"Los horarios van cada {RESOLUCION} minutos")
+    inicio = bloque(hora_inicio)
+    bloques = bloques_servicio(servicio.duracion)
+    if inicio < 0 or inicio + bloques > BLOQUES:
+        raise HorarioNoDisponible(
+            f"{servicio.nombre} debe empezar y terminar entre las {APERTURA:%H:%M} y las {CIERRE:%H:%M}"
+        )
+    if not _desde_ahora(fecha, ahora) >> inicio & 1:
+        raise HorarioNoDisponible("Ese horario ya pasó")
+    return mascara(inicio, bloques)
+
+
+def reservar(servicio, fecha, hora_inicio, pedido=None, ahora=None):
+    """
+    Crear la Cita con el empleado del servicio menos ocupado ese día que tenga libre el
+    horario. Lanza HorarioNoDisponible si ninguno lo tiene.
+    """
+    if not isinstance(servicio, Servicios):
+        servicio = Servicios.objects.get(pk=servicio)
+    ocupa = _validar(servicio, fecha, hora_inicio, timezone.localtime(ahora))
+    empleados = list(Empleados.objects.filter(servicio_id=servicio.pk).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        # Dos pasadas: si se pierde una carrera se vuelve a leer el día una vez
+        for _ in range(2):
+            dia = {
+                empleado: bytes(ocupacion) for empleado, ocupacion in
+                AgendaDia.objects.filter(empleado__servicio_id=servicio.pk, fecha=fecha).values_list('empleado_id', 'ocupacion')
+            }
+            ocupaciones = {empleado: a_entero(dia.get(empleado)) for empleado in empleados}
+            for empleado in sorted(empleados, key=lambda e: (ocupaciones[e].bit_count(), e)):
+                actual = ocupaciones[empleado]
+                if actual & ocupa:
+                    continue
+                if empleado in dia:
+                    tomado = AgendaDia.objects.filter(
+                        empleado_id=empleado, fecha=fecha, ocupacion=dia[empleado],
+                    ).update(ocupacion=a_bytes(actual | ocupa))
+                else:
+                    try:
+                        with transaction.atomic():
+                            AgendaDia.objects.create(empleado_id=empleado, fecha=fecha, ocupacion=a_bytes(ocupa))
+                        tomado = True
+                    except IntegrityError:
+                        tomado = False
+                if not tomado:
+                    continue
+                fin = hora(bloque(hora_inicio) + bloques_servicio(servicio.duracion))
+                # bulk_create no dispara post_save: los bits ya quedaron marcados arriba
+                cita, = Cita.objects.bulk_create([Cita(
+                    empleado_id=empleado, servicio=servicio, pedido=pedido,
+                    fecha=fecha, inicio=hora_inicio, fin=fin,
+                )])
+                return cita
+    raise HorarioNoDisponible(
+        f"No hay disponibilidad para {servicio.nombre} el {fecha:%d/%m/%Y} a las {hora_inicio:%H:%M}"
+    )
+
+
+def recalcular_dia(empleado_id, fecha):
+    """Regenerar los bits de un empleado en un día a partir de sus citas reservadas"""
+    ocupacion = 0
+    for inicio, fin in Cita.objects.filter(
+        empleado_id=empleado_id, fecha=fecha, estado='reservada',
+    ).values_list('inicio', 'fin'):
+        ocupacion |= mascara_cita(inicio, fin)
+    if not AgendaDia.objects.filter(empleado_id=empleado_id, fecha=fecha).update(ocupacion=a_bytes(ocupacion)):
+        if ocupacion:
+            AgendaDia.objects.create(empleado_id=empleado_id, fecha=fecha, ocupacion=a_bytes(ocupacion))
+
+
+def cancelar_citas(pedido):
+    """Liberar los turnos de un pedido cancelado; la señal de Cita recalcula cada día"""
+    for cita in pedido.citas.filter(estado='reservada'):
+        cita.estado = 'cancelada'
+        cita.save(update_fields=['estado'])
+
+
+def reconstruir(desde=None, hasta=None):
+    """Regenerar AgendaDia desde las citas entre `desde` y `hasta` (inclusivas; todo si faltan)"""
+    citas = Cita.objects.filter(estado='reservada')
+    agenda = AgendaDia.objects.all()
+    if desde:
+        citas = citas.filter(fecha__gte=desde)
+        agenda = agenda.filter(fecha__gte=desde)
+    if hasta:
+        citas = citas.filter(fecha__lte=hasta)
+        agenda = agenda.filter(fecha__lte=hasta)
+    ocupacion = defaultdict(int)
+    for empleado_id, fecha, inicio, fin in citas.values_list('empleado_id', 'fecha', 'inicio', 'fin').iterator():
+        ocupacion[empleado_id, fecha] |= mascara_cita(inicio, fin)
+    filas = [
+        AgendaDia(empleado_id=empleado_id, fecha=fecha, ocupacion=a_bytes(bits))
+        for (empleado_id, fecha), bits in ocupacion.items() if bits
+    ]
+    with transaction.atomic():
+        agenda.delete()
+        AgendaDia.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
@@ -0,0 +1,194 @@
+import json
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_http_methods
+
+from . import agenda, busqueda, cache_catalogo, carrito_temporal, exportacion, recomendaciones
+from .models import Productos, Servicios
+
+LIMITE_BUSQUEDA = 10
+MAX_OPERACIONES = 50
+
+
+@require_GET
+def buscar_catalogo(request):
+    """Búsqueda con ranking para la tienda y el autocompletado: ?q=texto&tipo=producto|servicio"""
+    texto = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo')
+    try:
+        limite = min(int(request.GET.get('limite', LIMITE_BUSQUEDA)), 50)
+    except ValueError:
+        limite = LIMITE_BUSQUEDA
+
+    resultados = []
+    if texto:
+        if tipo in (None, '', 'producto'):
+            for producto in busqueda.buscar(texto, 'producto', Productos.objects.all(), limite):
+                resultados.append({
+                    'tipo': 'producto',
+                    'id': producto.id_productos,
+                    'nombre': producto.nombre,
+                    'precio': str(producto.precio),
+                    'stock': producto.stock,
+                    'disponible': producto.disponible(),
+                    'imagen': producto.imagen.url if producto.imagen else None,
+                })
+        if tipo in (None, '', 'servicio'):
+            for servicio in busqueda.buscar(texto, 'servicio', Servicios.objects.all(), limite):
+                resultados.append({
+                    'tipo': 'servicio',
+                    'id': servicio.id_servicios,
+                    'nombre': servicio.nombre,
+                    'precio': str(servicio.precio),
+                    'duracion': servicio.duracion,
+                    'imagen': servicio.imagen.url if servicio.imagen else None,
+                })
+    return JsonResponse({'q': texto, 'resultados': resultados})
+
+
+@staff_member_required
+@require_GET
+def estadisticas_cache(request):
+    """Versión del catálogo y contadores de aciertos/fallos de la caché de páginas y fragmentos"""
+    return JsonResponse(cache_catalogo.estadisticas())
+
+
+def _fecha(texto):
+    if not texto:
+        return None
+    fecha = parse_date(texto)
+    if fecha is None:
+        raise ValueError(f"Fecha inválida: {texto} (usar AAAA-MM-DD)")
+    return fecha
+
+
+@staff_member_required
+@require_GET
+def exportar(request, conjunto):
+    """
+    Descarga en streaming de pedidos, items o clientes para contabilidad:
+    ?formato=csv|ndjson&desde=AAAA-MM-DD&hasta=AAAA-MM-DD&estado=entregado&gzip=1
+    """
+    formato = request.GET.get('formato', 'csv')
+    comprimir = request.GET.get('gzip') in ('1', 'true', 'si')
+    try:
+        filtros = {
+            'desde': _fecha(request.GET.get('desde')),
+            'hasta': _fecha(request.GET.get('hasta')),
+            'estado': request.GET.get('estado') or None,
+        }
+        if formato not in exportacion.FORMATOS:
+            raise exportacion.ErrorExportacion(f"Formato desconocido: {formato}")
+        # consulta() valida conjunto y estado antes de empezar a enviar
+        exportacion.consulta(conjunto, **filtros)
+    except (ValueError, exportacion.ErrorExportacion) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    nombre = f"{conjunto}-{timezone.localdate():%Y%m%d}.{formato}"
+    respuesta = StreamingHttpResponse(
+        exportacion.bloques(conjunto, formato, comprimir, **filtros),
+        content_type='application/gzip' if comprimir else f"{exportacion.FORMATOS[formato]}; charset=utf-8",
+    )
+    if comprimir:
+        nombre += '.gz'
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
+
+
+def _linea_json(item):
+    objeto = item.producto if item.tipo == 'producto' else item.servicio
+    return {
+        'clave': item.clave,
+        'tipo': item.tipo,
+        'id': objeto.pk,
+        'nombre': objeto.nombre,
+        'cantidad': item.cantidad,
+        'maximo': item.maximo,
+        'precio': str(objeto.precio),
+        'subtotal': str(item.subtotal()),
+    }
+
+
+@ensure_csrf_cookie
+@require_http_methods(['GET', 'POST'])
+async def carrito(request):
+    """
+    GET: líneas y totales del carrito. POST {"operaciones": [...]}: aplica el lote completo
+    o nada (ver CarritoTemporal.aaplicar) y responde con el carrito resultante.
+    Lo usa static/js/carrito.js; la cookie CSRF queda puesta desde el primer GET.
+    """
+    if request.method == 'POST':
+        try:
+            operaciones = json.loads(request.body)['operaciones']
+            if not isinstance(operaciones, list) or not 1 <= len(operaciones) <= MAX_OPERACIONES:
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {'error': f'Se espera {{"operaciones": [...]}} con 1 a {MAX_OPERACIONES} operaciones'}, status=400,
+            )
+    async with carrito_temporal.CarritoTemporal.aeditar(request, await request.auser()) as temporal:
+        if request.method == 'GET':
+            items, avisos = await temporal.aresolver()
+        else:
+            items, avisos, errores = await temporal.aaplicar(operaciones)
+            if errores:
+                return JsonResponse({'errores': errores}, status=400)
+        if avisos or request.method == 'POST':
+            await temporal.aguardar()
+
+    montos = carrito_temporal.totales(items)
+    respuesta = JsonResponse({
+        'items': [_linea_json(item) for item in items],
+        'total_items': temporal.total_items(),
+        'subtotal': str(montos['subtotal']),
+        'iva': str(montos['iva']),
+        'total': str(montos['total']),
+        'avisos': avisos,
+    })
+    return temporal.poner_cookie(respuesta)
+
+
+@require_GET
+def disponibilidad(request, servicio_id):
+    """Horarios libres de un servicio: ?desde=AAAA-MM-DD (hoy por defecto)&dias=7"""
+    servicio = get_object_or_404(Servicios, pk=servicio_id)
+    try:
+        desde = _fecha(request.GET.get('desde')) or timezone.localdate()
+        dias = int(request.GET.get('dias', 7))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({
+        'servicio': servicio.pk,
+        'duracion': servicio.duracion,
+        'dias': [
+            {'fecha': fecha.isoformat(), 'horarios': [hora.strftime('%H:%M') for hora in horas]}
+            for fecha, horas in agenda.disponibilidad(servicio, desde, dias)
+        ],
+    })
+
+
+@require_GET
+def recomendados(request):
+    """Lo que más se compra junto con unos items: ?items=p-12,s-3 (claves del carrito)"""
+    claves = [clave for clave in request.GET.get('items', '').split(',') if carrito_temporal.partir_clave(clave)]
+    try:
+        limite = min(int(request.GET.get('limite', recomendaciones.VECINOS)), 20)
+    except ValueError:
+        limite = recomendaciones.VECINOS
+    return JsonResponse({'resultados': [
+        {
+            'tipo': recomendacion.tipo,
+            'id': recomendacion.objeto.pk,
+            'clave': carrito_temporal.clave_item(recomendacion.tipo, recomendacion.objeto.pk),
+            'nombre': recomendacion.objeto.nombre,
+            'precio': str(recomendacion.objeto.precio),
+            'imagen': recomendacion.objeto.imagen.url if recomendacion.objeto.imagen else None,
+            'pedidos': recomendacion.pedidos,
+        }
+        for recomendacion in recomendaciones.para(claves[:50], limite)
+    ]})
@@ -5,4 +5,5 @@ class AppSpaConfig(AppConfig):
     name = 'app_spa'
     
     def ready(self):
-        import app_spa.signals  # Registrar las señales
\ No newline at end of file
+        import app_spa.signals  # Registrar las señales
+        import app_spa.tareas  # Registrar las tareas de la cola
\ No newline at end of file
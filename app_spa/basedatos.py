@@ -0,0 +1,91 @@
+"""
+Perfil de producción de SQLite y enrutador de lecturas.
+
+Con los valores por defecto SQLite usa rollback journal: mientras alguien escribe nadie
+puede leer, y una transacción que empieza leyendo y después escribe (el checkout) falla
+con "database is locked" en cuanto otra ya escribe, sin esperar al busy timeout. El
+perfil usa WAL (los lectores no esperan al escritor), BEGIN IMMEDIATE (el bloqueo de
+escritura se pide al abrir la transacción, así que la espera sí aplica) y PRAGMAs por
+conexión.
+settings.py lo activa con SPA_DB_PRODUCCION=1 y la conexión de lectura con SPA_DB_LECTURA=1.
+
+Las conexiones no persisten por defecto (CONN_MAX_AGE=0): bajo ASGI cada petición
+síncrona puede correr en un hilo distinto del pool de sync_to_async, y una conexión
+persistente queda abierta por hilo sin que Django la cierre al terminar la petición.
+Con un servidor WSGI de hilos fijos se puede subir con SPA_DB_CONN_MAX_AGE.
+"""
+from django.db import connections
+
+ESCRITURA = 'default'
+LECTURA = 'lectura'
+CONN_MAX_AGE = 0
+
+# busy_timeout primero: cambiar a WAL necesita un bloqueo exclusivo momentáneo
+PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    # En WAL, NORMAL solo arriesga las últimas transacciones ante un corte de energía, no la integridad
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # en KiB: 64 MiB por conexión
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Catálogo y reportes: se leen mucho y solo los escribe staff o las señales
+MODELOS_LECTURA = frozenset({
+    'app_spa.servicios',
+    'app_spa.productos',
+    'app_spa.proveedores',
+    'app_spa.resumencliente',
+    'app_spa.ventadiaria',
+    'app_spa.ventadiariaitem',
+})
+
+
+def init_command(solo_lectura=False):
+    pragmas = dict(PRAGMAS, query_only='ON') if solo_lectura else PRAGMAS
+    return ';'.join(f"PRAGMA {nombre}={valor}" for nombre, valor in pragmas.items())
+
+
+def perfil_produccion(nombre, lectura=False, conn_max_age=CONN_MAX_AGE):
+    """DATABASES para el archivo `nombre`; con lectura=True agrega la conexión de solo lectura"""
+    base = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nombre,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    bases = {ESCRITURA: dict(base, OPTIONS={'init_command': init_command(), 'transaction_mode': 'IMMEDIATE'})}
+    if lectura:
+        bases[LECTURA] = dict(
+            base, OPTIONS={'init_command': init_command(solo_lectura=True)}, TEST={'MIRROR': ESCRITURA},
+        )
+    return bases
+
+
+class EnrutadorLectura:
+    """
+    Lee MODELOS_LECTURA por la conexión de solo lectura (mismo archivo, así que ve todo lo
+    confirmado). Dentro de una transacción de 'default' todo sigue en 'default': el
+    checkout debe ver sus propias escrituras y el stock que está descontando.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.label_lower in MODELOS_LECTURA
+            and LECTURA in connections.settings
+            and not connections[ESCRITURA].in_atomic_block
+        ):
+            return LECTURA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return ESCRITURA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {ESCRITURA, LECTURA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == LECTURA else None
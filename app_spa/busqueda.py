@@ -0,0 +1,118 @@
+"""
+Índice de búsqueda de texto completo (SQLite FTS5) para Productos y Servicios.
+
+Cada fila del índice usa como rowid el id del objeto codificado con su tipo
+(id * 2 para productos, id * 2 + 1 para servicios), así que actualizar o borrar
+una entrada es una búsqueda por rowid y no un recorrido de la tabla.
+El tokenizador unicode61 con remove_diacritics ignora acentos ("baño" == "bano")
+y los índices de prefijo permiten búsquedas mientras se escribe.
+Con otro motor de base de datos todo esto es un no-op y la búsqueda vuelve a icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+TABLA = 'app_spa_busqueda'
+TIPOS = {'producto': 0, 'servicio': 1}
+# Pesos de bm25 por columna: nombre, descripcion, categoria, proveedor
+PESOS = (10.0, 1.0, 3.0, 2.0)
+
+SQL_POBLAR = f"""
+INSERT INTO {TABLA} (rowid, nombre, descripcion, categoria, proveedor)
+SELECT p.id_productos * 2, p.nombre, COALESCE(p.descripcion, ''), p.tipo_producto, pr.nombre_empresa
+FROM app_spa_productos p JOIN app_spa_proveedores pr ON pr.id_proveedores = p.proveedor_id
+UNION ALL
+SELECT s.id_servicios * 2 + 1, s.nombre, COALESCE(s.descripcion, ''), s.tipo_servicio, ''
+FROM app_spa_servicios s
+"""
+
+
+def disponible():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(tipo, pk):
+    return pk * 2 + TIPOS[tipo]
+
+
+def indexar_producto(producto):
+    if not disponible():
+        return
+    _guardar(
+        _rowid('producto', producto.pk),
+        producto.nombre, producto.descripcion, producto.tipo_producto, producto.proveedor.nombre_empresa,
+    )
+
+
+def indexar_servicio(servicio):
+    if not disponible():
+        return
+    _guardar(_rowid('servicio', servicio.pk), servicio.nombre, servicio.descripcion, servicio.tipo_servicio, '')
+
+
+def _guardar(rowid, nombre, descripcion, categoria, proveedor):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA} WHERE rowid = %s", [rowid])
+        cursor.execute(
+            f"INSERT INTO {TABLA} (rowid, nombre, descripcion, categoria, proveedor) VALUES (%s, %s, %s, %s, %s)",
+            [rowid, nombre, descripcion or '', categoria, proveedor],
+        )
+
+
+def eliminar(tipo, pk):
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA} WHERE rowid = %s", [_rowid(tipo, pk)])
+
+
+def reconstruir_indice():
+    """Regenerar el índice completo desde las tablas (tras cargas masivas con bulk_create)"""
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA}")
+        cursor.execute(SQL_POBLAR)
+
+
+def consulta_fts(texto):
+    """
+    Convertir texto libre en una expresión MATCH segura: cada palabra entre comillas
+    (sin operadores de FTS5) y con '*' para que funcione como prefijo.
+    """
+    palabras = re.findall(r'\w+', texto.lower())
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar_ids(texto, tipo, limite=None):
+    """
+    Ids de `tipo` ('producto' o 'servicio') que coinciden con `texto`, ordenados por bm25.
+    Devuelve None si el índice no está disponible, para que el llamador use icontains.
+    """
+    if not disponible():
+        return None
+    expresion = consulta_fts(texto)
+    if not expresion:
+        return []
+    sql = (
+        f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s AND rowid %% 2 = %s "
+        f"ORDER BY bm25({TABLA}, {', '.join(map(str, PESOS))})"
+    )
+    parametros = [expresion, TIPOS[tipo]]
+    if limite:
+        sql += " LIMIT %s"
+        parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [rowid // 2 for rowid, in cursor.fetchall()]
+
+
+def buscar(texto, tipo, queryset, limite=None):
+    """Objetos de `queryset` que coinciden con `texto`, en orden de relevancia"""
+    ids = buscar_ids(texto, tipo, limite)
+    if ids is None:
+        filtro = queryset.filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto))
+        return list(filtro[:limite] if limite else filtro)
+    objetos = queryset.in_bulk(ids)
+    return [objetos[pk] for pk in ids if pk in objetos]
@@ -0,0 +1,168 @@
+"""
+Caché del catálogo con invalidación por versión.
+
+Todas las llaves incluyen el número de versión del catálogo; las señales lo
+incrementan cuando cambian Servicios, Productos, Empleados, Proveedores o Clientes, de
+modo que las entradas viejas simplemente dejan de consultarse y expiran solas.
+Las páginas completas llevan además la versión de las reservas, que reservas.py
+incrementa cuando cambia lo apartado (Productos.reservado): las unidades disponibles
+de la tienda se renuevan sin descartar los fragmentos, que no las incluyen.
+Funciona con cualquier backend de Django (memoria local o archivos); con memoria
+local cada proceso tiene su propia versión, así que en despliegues con varios
+workers conviene el backend de archivos.
+Las páginas cacheadas pueden llevar formularios POST (agregar al carrito): se guardan
+con el token CSRF vacío y cada respuesta recibe el token de su visitante.
+"""
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+LLAVE_VERSION = 'catalogo:version'
+LLAVE_VERSION_RESERVAS = 'catalogo:version_reservas'
+LLAVE_ACIERTOS = 'catalogo:aciertos'
+LLAVE_FALLOS = 'catalogo:fallos'
+TIMEOUT = 60 * 15
+TOKEN_CSRF = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]*"')
+TOKEN_VACIO = b'name="csrfmiddlewaretoken" value=""'
+
+
+def activo():
+    return getattr(settings, 'CACHE_CATALOGO', True)
+
+
+def _version(llave):
+    valor = cache.get(llave)
+    if valor is None:
+        # Partir del reloj: si el backend perdió la llave, la nueva versión no choca con las viejas
+        cache.add(llave, int(time.time()), None)
+        valor = cache.get(llave)
+    return valor
+
+
+def _incrementar(llave):
+    try:
+        cache.incr(llave)
+    except ValueError:
+        cache.set(llave, int(time.time()), None)
+
+
+def version():
+    return _version(LLAVE_VERSION)
+
+
+def incrementar_version():
+    _incrementar(LLAVE_VERSION)
+
+
+def incrementar_version_reservas():
+    _incrementar(LLAVE_VERSION_RESERVAS)
+
+
+def _contar(llave):
+    if cache.add(llave, 1, None):
+        return
+    try:
+        cache.incr(llave)
+    except ValueError:
+        cache.set(llave, 1, None)
+
+
+def registrar_acierto():
+    _contar(LLAVE_ACIERTOS)
+
+
+def registrar_fallo():
+    _contar(LLAVE_FALLOS)
+
+
+def estadisticas():
+    aciertos = cache.get(LLAVE_ACIERTOS, 0)
+    fallos = cache.get(LLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        'version': version(),
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': round(aciertos / total, 4) if total else None,
+    }
+
+
+def llave_fragmento(*partes, version_actual=None):
+    if version_actual is None:
+        version_actual = version()
+    return f"catalogo:{version_actual}:fragmento:" + ":".join(str(parte) for parte in partes)
+
+
+def _omitir_cache(request, usuario):
+    # Import diferido: carrito_temporal importa models, que importa este módulo
+    from .carrito_temporal import COOKIE
+    # Con carrito propio el contador del menú ya no es igual para todos los anónimos.
+    # Las búsquedas (?q=) tampoco: cada texto distinto sería una entrada nueva
+    return (
+        not activo() or request.method != 'GET' or usuario.is_authenticated
+        or COOKIE in request.COOKIES or len(get_messages(request)) or request.GET.get('q')
+    )
+
+
+def _buscar_pagina(request):
+    llave = f"catalogo:{version()}:{_version(LLAVE_VERSION_RESERVAS)}:pagina:{request.get_full_path()}"
+    guardada = cache.get(llave)
+    if guardada is None:
+        registrar_fallo()
+        return llave, None
+    registrar_acierto()
+    contenido, content_type = guardada
+    if TOKEN_VACIO in contenido:
+        # get_token() también hace que CsrfViewMiddleware envíe la cookie correspondiente
+        token = f'name="csrfmiddlewaretoken" value="{get_token(request)}"'.encode()
+        contenido = contenido.replace(TOKEN_VACIO, token)
+    return llave, HttpResponse(contenido, content_type=content_type)
+
+
+def _guardar_pagina(llave, request, respuesta):
+    if hasattr(respuesta, 'render') and callable(respuesta.render):
+        respuesta = respuesta.render()
+    cacheable = respuesta.status_code == 200 and not respuesta.streaming and not respuesta.cookies
+    if cacheable:
+        # El token es de este visitante: se guarda vacío y _buscar_pagina pone el de cada uno
+        contenido = TOKEN_CSRF.sub(TOKEN_VACIO, respuesta.content)
+        cache.set(llave, (contenido, respuesta['Content-Type']), TIMEOUT)
+    return respuesta
+
+
+def cache_pagina_catalogo(vista):
+    """
+    Cachear la respuesta completa de una vista del catálogo para visitantes anónimos.
+    No se cachean respuestas con mensajes pendientes o cookies, porque no son iguales
+    para todos los visitantes; el token CSRF se quita y se repone en cada respuesta.
+    Acepta vistas síncronas y async.
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            if _omitir_cache(request, await request.auser()):
+                return await vista(request, *args, **kwargs)
+            # El backend puede ser de archivos: la caché se lee fuera del event loop
+            llave, guardada = await sync_to_async(_buscar_pagina)(request)
+            if guardada is not None:
+                return guardada
+            respuesta = await vista(request, *args, **kwargs)
+            return await sync_to_async(_guardar_pagina)(llave, request, respuesta)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if _omitir_cache(request, request.user):
+            return vista(request, *args, **kwargs)
+        llave, guardada = _buscar_pagina(request)
+        if guardada is not None:
+            return guardada
+        return _guardar_pagina(llave, request, vista(request, *args, **kwargs))
+    return envoltura
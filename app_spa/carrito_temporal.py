@@ -0,0 +1,466 @@
+"""
+Carrito temporal: la copia de trabajo del carrito vive en la caché, no en SQLite.
+
+Los visitantes anónimos se identifican con una cookie aleatoria (COOKIE). Los usuarios
+con sesión usan carrito_cache_key(usuario_id), y si su copia no está en caché se carga
+una vez del Carrito persistente. Agregar, cambiar o quitar items solo reescribe la
+entrada de caché, con o sin sesión. La base de datos se escribe en dos momentos:
+
+- al iniciar sesión, el carrito anónimo se suma al del usuario y el resultado se guarda
+  en Carrito con un upsert (bulk_create con update_conflicts) por tipo de item;
+- en el checkout (confirmar_pedido), justo antes de generar el pedido.
+
+En ambos se revalida contra el catálogo: se quitan los items borrados o agotados, las
+cantidades se limitan al stock y se avisa de los cambios de precio.
+Quien cambia un carrito lo abre con aeditar(), que bloquea su llave mientras tanto: dos
+peticiones del mismo carrito se turnan en lugar de pisar una las líneas de la otra.
+Cambiar el carrito también aparta el stock de sus productos (reservas.sincronizar, por la
+llave de caché): lo que otro carrito apartó no se le ofrece a este, y al iniciar sesión
+las reservas del carrito anónimo pasan al del usuario.
+Si la entrada expira o el backend la desaloja, un usuario con sesión recupera lo que se
+guardó en Carrito al iniciar sesión (pierde los cambios posteriores) y un anónimo pierde
+su carrito. Para que eso sea raro las entradas van en el alias 'carritos' de
+settings.CACHES, aparte de los fragmentos del catálogo y con MAX_ENTRIES alto;
+con varios procesos su backend debe ser compartido (archivos, memcached o redis), no
+memoria local: cada worker vería su propio carrito y el bloqueo no serviría entre ellos.
+"""
+import asyncio
+import re
+import secrets
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import reservas
+from .models import (
+    CARRITO_CACHE_TIMEOUT, IVA, Carrito, CarritoItem, CheckoutError, Productos, ReservaStock, Servicios,
+    cache_carritos, carrito_cache_key,
+)
+
+COOKIE = 'spa_carrito'
+TIPOS = {'p': 'producto', 's': 'servicio'}
+MAX_CANTIDAD_SERVICIO = 10
+# Vida máxima del bloqueo de aeditar(), por si el proceso que lo tenía murió
+BLOQUEO_SEGUNDOS = 5
+
+
+def clave_item(tipo, pk):
+    """Clave de una línea, también usada en las URLs del carrito: p-12, s-3"""
+    return f"{tipo[0]}-{pk}"
+
+
+def partir_clave(clave):
+    """(tipo, pk) de una clave válida; None si no lo es"""
+    coincidencia = re.fullmatch(r'([ps])-(\d+)', clave or '')
+    if not coincidencia:
+        return None
+    return TIPOS[coincidencia[1]], int(coincidencia[2])
+
+
+def maximo(objeto, apartadas=0):
+    """
+    Unidades que se pueden pedir de un servicio, o de un producto: lo disponible más lo
+    que este carrito ya tiene apartado
+    """
+    return objeto.disponible() + apartadas if isinstance(objeto, Productos) else MAX_CANTIDAD_SERVICIO
+
+
+def totales(items):
+    subtotal = sum((item.subtotal() for item in items), Decimal('0.00'))
+    iva = (subtotal * IVA).quantize(Decimal('0.01'))
+    return {'subtotal': subtotal, 'iva': iva, 'total': subtotal + iva}
+
+
+def _llave_anonima(token):
+    return f"carrito_temporal:{token}"
+
+
+def _token(request):
+    token = request.COOKIES.get(COOKIE, '')
+    return token if re.fullmatch(r'[\w-]{16,64}', token) else None
+
+
+async def _abloquear(llave):
+    """Tomar el bloqueo de un carrito; False si no se liberó en BLOQUEO_SEGUNDOS"""
+    limite = time.monotonic() + BLOQUEO_SEGUNDOS
+    while not await cache_carritos.aadd(f"{llave}:bloqueo", True, BLOQUEO_SEGUNDOS):
+        if time.monotonic() > limite:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+class CarritoTemporal:
+    """lineas: {clave: {'cantidad', 'precio', 'nombre'}} en orden de inserción"""
+
+    def __init__(self, llave, lineas=None, token_nuevo=None):
+        self.llave = llave
+        self.lineas = lineas or {}
+        self.token_nuevo = token_nuevo
+        # {producto_id: unidades} que el carrito tiene reservadas; se lee junto con el catálogo
+        self.apartadas = {}
+
+    @staticmethod
+    def _origen(request, usuario):
+        """(llave de caché, token a enviar en la cookie si el visitante aún no tiene)"""
+        if usuario.is_authenticated:
+            return carrito_cache_key(usuario.pk), None
+        token = _token(request)
+        if token:
+            return _llave_anonima(token), None
+        token = secrets.token_urlsafe(16)
+        return _llave_anonima(token), token
+
+    @staticmethod
+    def _filas_persistidas(usuario_id):
+        return CarritoItem.objects.filter(
+            carrito__usuario_id=usuario_id, carrito__activo=True
+        ).order_by('pk').values_list(
+            'tipo', 'producto_id', 'servicio_id', 'cantidad',
+            'producto__precio', 'servicio__precio', 'producto__nombre', 'servicio__nombre',
+        )
+
+    @staticmethod
+    def _lineas(filas):
+        lineas = {}
+        for tipo, producto_id, servicio_id, cantidad, precio_p, precio_s, nombre_p, nombre_s in filas:
+            es_producto = tipo == 'producto'
+            lineas[clave_item(tipo, producto_id if es_producto else servicio_id)] = {
+                'cantidad': cantidad,
+                'precio': str(precio_p if es_producto else precio_s),
+                'nombre': nombre_p if es_producto else nombre_s,
+            }
+        return lineas
+
+    @classmethod
+    def cargar(cls, request, usuario):
+        llave, token_nuevo = cls._origen(request, usuario)
+        lineas = None if token_nuevo else cache_carritos.get(llave)
+        if lineas is None and usuario.is_authenticated:
+            lineas = cls._lineas(cls._filas_persistidas(usuario.pk))
+            cache_carritos.set(llave, lineas, CARRITO_CACHE_TIMEOUT)
+        return cls(llave, lineas, token_nuevo)
+
+    @classmethod
+    async def acargar(cls, request, usuario):
+        llave, token_nuevo = cls._origen(request, usuario)
+        return await cls._acargar(llave, token_nuevo, usuario)
+
+    @classmethod
+    async def _acargar(cls, llave, token_nuevo, usuario):
+        lineas = None if token_nuevo else await cache_carritos.aget(llave)
+        if lineas is None and usuario.is_authenticated:
+            lineas = cls._lineas([fila async for fila in cls._filas_persistidas(usuario.pk)])
+            await cache_carritos.aset(llave, lineas, CARRITO_CACHE_TIMEOUT)
+        return cls(llave, lineas, token_nuevo)
+
+    @classmethod
+    @asynccontextmanager
+    async def aeditar(cls, request, usuario):
+        """
+        acargar() para cambiar el carrito: su llave queda bloqueada hasta salir del bloque,
+        así que lo que se guarde dentro parte de lo que guardó la petición anterior
+        """
+        llave, token_nuevo = cls._origen(request, usuario)
+        # Un carrito recién creado todavía no lo ve nadie más
+        propio = token_nuevo is None and await _abloquear(llave)
+        try:
+            yield await cls._acargar(llave, token_nuevo, usuario)
+        finally:
+            if propio:
+                await cache_carritos.adelete(f"{llave}:bloqueo")
+
+    def guardar(self):
+        cache_carritos.set(self.llave, self.lineas, CARRITO_CACHE_TIMEOUT)
+
+    async def aguardar(self):
+        await cache_carritos.aset(self.llave, self.lineas, CARRITO_CACHE_TIMEOUT)
+
+    def poner_cookie(self, respuesta):
+        """Enviar la cookie del visitante anónimo la primera vez que su carrito se guarda"""
+        if self.token_nuevo:
+            respuesta.set_cookie(
+                COOKIE, self.token_nuevo, max_age=CARRITO_CACHE_TIMEOUT, httponly=True,
+                samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return respuesta
+
+    def cantidad(self, clave):
+        return self.lineas.get(clave, {}).get('cantidad', 0)
+
+    def agregar(self, objeto, cantidad=1):
+        """Agregar un producto o servicio, sumando si ya estaba; guarda el precio que vio el cliente"""
+        tipo = 'producto' if isinstance(objeto, Productos) else 'servicio'
+        linea = self.lineas.setdefault(clave_item(tipo, objeto.pk), {'cantidad': 0})
+        linea.update(cantidad=linea['cantidad'] + cantidad, precio=str(objeto.precio), nombre=objeto.nombre)
+
+    def actualizar(self, clave, cantidad):
+        if clave not in self.lineas:
+            return False
+        self.lineas[clave]['cantidad'] = cantidad
+        return True
+
+    def eliminar(self, clave):
+        return self.lineas.pop(clave, None) is not None
+
+    def total_items(self):
+        return sum(linea['cantidad'] for linea in self.lineas.values())
+
+    def tiene_servicios(self):
+        return any(clave.startswith('s-') for clave in self.lineas)
+
+    def tiene_productos(self):
+        return any(clave.startswith('p-') for clave in self.lineas)
+
+    def _consultas(self, extra=()):
+        ids = {'producto': set(), 'servicio': set()}
+        for tipo, pk in [partir_clave(clave) for clave in self.lineas] + list(extra):
+            ids[tipo].add(pk)
+        return (
+            Productos.objects.select_related('proveedor').filter(pk__in=ids['producto']),
+            Servicios.objects.filter(pk__in=ids['servicio']),
+            # Sin productos no hay nada apartado que consultar
+            reservas.de_carrito(self.llave) if ids['producto'] else ReservaStock.objects.none(),
+        )
+
+    async def _acatalogo(self, extra=()):
+        productos, servicios, apartadas = self._consultas(extra)
+        return (
+            {producto.pk: producto async for producto in productos},
+            {servicio.pk: servicio async for servicio in servicios},
+            {producto_id: cantidad async for producto_id, cantidad in apartadas},
+        )
+
+    def resolver(self):
+        """
+        Revalidar las líneas contra el catálogo actual. Devuelve (items, avisos): items son
+        CarritoItem sin guardar, con la clave en item.clave y el máximo pedible en
+        item.maximo (los usa carrito.html), y avisos los cambios que el cliente debe ver.
+        Las líneas quedan ajustadas.
+        """
+        productos, servicios, apartadas = self._consultas()
+        return self._revalidar({p.pk: p for p in productos}, {s.pk: s for s in servicios}, dict(apartadas))
+
+    async def aresolver(self):
+        return self._revalidar(*await self._acatalogo())
+
+    async def aaplicar(self, operaciones):
+        """
+        Aplicar un lote de operaciones, todas o ninguna:
+        {"op": "agregar", "tipo": "producto", "id": 12, "cantidad": 1}
+        {"op": "fijar", "clave": "p-12", "cantidad": 3}   (0 quita la línea)
+        {"op": "quitar", "clave": "s-3"}
+        El catálogo se lee una vez para todo el lote. Si no hay errores se apartan las
+        unidades de los productos (apartar). Devuelve (items, avisos, errores); si hay
+        errores las líneas no cambian.
+        """
+        referencias = []
+        for operacion in operaciones:
+            if isinstance(operacion, dict):
+                if operacion.get('op') == 'agregar' and operacion.get('tipo') in TIPOS.values():
+                    if isinstance(operacion.get('id'), int):
+                        referencias.append((operacion['tipo'], operacion['id']))
+                elif partir_clave(operacion.get('clave')):
+                    referencias.append(partir_clave(operacion['clave']))
+        productos, servicios, self.apartadas = await self._acatalogo(referencias)
+        errores = self._aplicar_lote(operaciones, productos, servicios)
+        if errores and any(producto.reservado for producto in productos.values()):
+            # Puede faltar stock solo por reservas vencidas que el barrido aún no suelta
+            if await sync_to_async(reservas.liberar_vencidas)(productos=list(productos), excepto=self.llave):
+                productos, servicios, self.apartadas = await self._acatalogo(referencias)
+                errores = self._aplicar_lote(operaciones, productos, servicios)
+        if errores:
+            return [], [], errores
+        items, avisos = self._revalidar(productos, servicios, self.apartadas)
+        ajustes = await sync_to_async(self.apartar)()
+        if ajustes:
+            # Otro carrito apartó primero: releer para mostrar el máximo real
+            items, _ = self._revalidar(*await self._acatalogo())
+        return items, avisos + ajustes, []
+
+    def apartar(self):
+        """
+        Reservar las unidades de las líneas de producto y soltar las que ya no están;
+        las líneas que no alcanzan se ajustan a lo apartado. Devuelve los avisos.
+        """
+        pedidas = {}
+        for clave, linea in self.lineas.items():
+            tipo, pk = partir_clave(clave)
+            if tipo == 'producto':
+                pedidas[pk] = linea['cantidad']
+        if not pedidas and not self.apartadas:
+            return []
+        self.apartadas = reservas.sincronizar(self.llave, pedidas)
+        avisos = []
+        for pk, cantidad in pedidas.items():
+            apartada = self.apartadas.get(pk, 0)
+            if apartada >= cantidad:
+                continue
+            clave = clave_item('producto', pk)
+            nombre = self.lineas[clave]['nombre']
+            if apartada:
+                self.lineas[clave]['cantidad'] = apartada
+                avisos.append(f"Solo quedan {apartada} de {nombre}; se ajustó la cantidad")
+            else:
+                del self.lineas[clave]
+                avisos.append(f"{nombre} se agotó y se quitó del carrito")
+        return avisos
+
+    def _aplicar_lote(self, operaciones, productos, servicios):
+        """Errores de aplicar todas las operaciones; si hay alguno las líneas quedan como estaban"""
+        originales = {clave: dict(linea) for clave, linea in self.lineas.items()}
+        errores = [
+            {'operacion': indice, 'error': error}
+            for indice, operacion in enumerate(operaciones)
+            if (error := self._aplicar(operacion, productos, servicios))
+        ]
+        if errores:
+            self.lineas = originales
+        return errores
+
+    def _aplicar(self, operacion, productos, servicios):
+        """Aplicar una operación; devuelve el mensaje de error o None"""
+        if not isinstance(operacion, dict):
+            return "Cada operación debe ser un objeto"
+        cantidad = operacion.get('cantidad', 1)
+        if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad < 0:
+            return "La cantidad debe ser un entero positivo"
+        op = operacion.get('op')
+        if op == 'agregar':
+            tipo = operacion.get('tipo')
+            catalogo = {'producto': productos, 'servicio': servicios}.get(tipo)
+            if catalogo is None:
+                return "El tipo debe ser producto o servicio"
+            objeto = catalogo.get(operacion.get('id'))
+            if objeto is None:
+                return f"No existe el {tipo} {operacion.get('id')}"
+            clave = clave_item(tipo, objeto.pk)
+            tope = self.maximo(objeto)
+            if cantidad < 1 or self.cantidad(clave) + cantidad > tope:
+                return f"Puedes tener entre 1 y {tope} de {objeto.nombre}"
+            self.agregar(objeto, cantidad)
+            return None
+        if op not in ('fijar', 'quitar'):
+            return "op debe ser agregar, fijar o quitar"
+        clave = operacion.get('clave')
+        referencia = partir_clave(clave)
+        if referencia is None:
+            return "Clave de línea inválida"
+        if op == 'quitar' or cantidad == 0:
+            self.eliminar(clave)
+            return None
+        if clave not in self.lineas:
+            return "La línea ya no está en el carrito"
+        tipo, pk = referencia
+        objeto = (productos if tipo == 'producto' else servicios).get(pk)
+        if objeto is not None and not 1 <= cantidad <= self.maximo(objeto):
+            return f"Puedes tener entre 1 y {self.maximo(objeto)} de {objeto.nombre}"
+        self.actualizar(clave, cantidad)
+        return None
+
+    def maximo(self, objeto):
+        return maximo(objeto, self.apartadas.get(objeto.pk, 0) if isinstance(objeto, Productos) else 0)
+
+    def _revalidar(self, productos, servicios, apartadas):
+        self.apartadas = apartadas
+        items, avisos = [], []
+        for clave, linea in list(self.lineas.items()):
+            tipo, pk = partir_clave(clave)
+            objeto = (productos if tipo == 'producto' else servicios).get(pk)
+            if objeto is None:
+                del self.lineas[clave]
+                avisos.append(f"{linea['nombre']} ya no está disponible y se quitó del carrito")
+                continue
+            tope = self.maximo(objeto)
+            if tipo == 'producto':
+                if tope < 1:
+                    del self.lineas[clave]
+                    avisos.append(f"{objeto.nombre} se agotó y se quitó del carrito")
+                    continue
+                if linea['cantidad'] > tope:
+                    linea['cantidad'] = tope
+                    avisos.append(f"Solo quedan {tope} de {objeto.nombre}; se ajustó la cantidad")
+            if Decimal(linea['precio']) != objeto.precio:
+                avisos.append(f"El precio de {objeto.nombre} cambió de ${linea['precio']} a ${objeto.precio}")
+                linea['precio'] = str(objeto.precio)
+            linea['nombre'] = objeto.nombre
+            item = CarritoItem(tipo=tipo, cantidad=linea['cantidad'], **{tipo: objeto})
+            item.clave = clave
+            item.maximo = tope
+            items.append(item)
+        return items, avisos
+
+
+def _persistir(usuario_id, lineas):
+    """Dejar el Carrito activo del usuario igual a `lineas`: un upsert por tipo y un DELETE"""
+    carrito, _ = Carrito.objects.get_or_create(usuario_id=usuario_id, activo=True)
+    filas = {'producto': [], 'servicio': []}
+    for clave, linea in lineas.items():
+        tipo, pk = partir_clave(clave)
+        filas[tipo].append(
+            CarritoItem(carrito=carrito, tipo=tipo, cantidad=linea['cantidad'], **{f'{tipo}_id': pk})
+        )
+    for tipo, items in filas.items():
+        if items:
+            # Cada tipo tiene su propia restricción única, que es el destino del ON CONFLICT
+            CarritoItem.objects.bulk_create(
+                items, update_conflicts=True, unique_fields=['carrito', tipo], update_fields=['cantidad'],
+            )
+    conservar = Q(pk__in=[])
+    for tipo, items in filas.items():
+        conservar |= Q(tipo=tipo, **{f'{tipo}_id__in': [getattr(item, f'{tipo}_id') for item in items]})
+    carrito.items.exclude(conservar).delete()
+    carrito.recalcular_totales()
+    return carrito
+
+
+def fusionar_al_iniciar_sesion(request, usuario):
+    """
+    Sumar el carrito anónimo del navegador al del usuario y guardar el resultado en
+    Carrito. Devuelve los avisos de la revalidación.
+    """
+    token = _token(request)
+    anonimo = cache_carritos.get(_llave_anonima(token)) if token else None
+    if not anonimo:
+        return []
+    temporal = CarritoTemporal.cargar(request, usuario)
+    for clave, linea in anonimo.items():
+        if clave in temporal.lineas:
+            temporal.lineas[clave]['cantidad'] += linea['cantidad']
+        else:
+            temporal.lineas[clave] = dict(linea)
+    with transaction.atomic():
+        # Lo apartado como anónimo cuenta como propio al revalidar
+        reservas.transferir(_llave_anonima(token), temporal.llave)
+        _, avisos = temporal.resolver()
+        avisos += temporal.apartar()
+        _persistir(usuario.pk, temporal.lineas)
+    # Después de confirmar: el commit invalida la copia cacheada del usuario
+    temporal.guardar()
+    cache_carritos.delete(_llave_anonima(token))
+    return avisos
+
+
+def confirmar_pedido(request, usuario, **datos):
+    """
+    Checkout desde el carrito temporal. Si el catálogo cambió desde que el cliente armó el
+    carrito, guarda la copia ajustada y lanza CheckoutError con los avisos para que la
+    revise. Si no, guarda el carrito y genera el pedido en una sola transacción.
+    `datos` son los argumentos de Carrito.generar_pedido().
+    """
+    temporal = CarritoTemporal.cargar(request, usuario)
+    if not temporal.lineas:
+        raise CheckoutError("El carrito está vacío")
+    _, avisos = temporal.resolver()
+    if avisos:
+        temporal.guardar()
+        raise CheckoutError(" ".join(avisos))
+    with transaction.atomic():
+        pedido = _persistir(usuario.pk, temporal.lineas).generar_pedido(**datos)
+    cache_carritos.delete(temporal.llave)
+    return pedido
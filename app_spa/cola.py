@@ -0,0 +1,229 @@
+"""
+Cola de tareas en la base de datos para el trabajo lento que no debe alargar la petición:
+derivadas de imágenes, acumulados de ventas y resúmenes de clientes (ver tareas.py).
+
+encolar() inserta la Tarea dentro de la transacción de quien la pide: si se revierte la
+tarea tampoco existe y los workers no la ven antes del commit. Con `llave` solo puede
+haber una pendiente por llave (índice único parcial), así que cien cambios a un mismo
+día dejan un solo recálculo. Una tarea que falla se reintenta con espera exponencial
+hasta su máximo de intentos, y una que quedó en curso porque su worker murió vuelve a
+pendiente; por eso las funciones de tarea deben poder repetirse sin daño.
+
+`manage.py run_workers` reclama tareas con un UPDATE condicional (como el stock en el
+checkout: dos workers nunca toman la misma) y las ejecuta en un pool de hilos o procesos.
+Sin workers (settings.TAREAS_EN_LINEA, el valor por defecto) la tarea se ejecuta al
+confirmar la transacción en el mismo proceso, como antes de la cola, y solo esa: los
+reintentos y las tareas con retraso esperan a `manage.py run_workers --una-vez`, que
+conviene correr desde cron, para no cargarle trabajo ajeno a la petición que encola.
+panel_tareas (admin-spa/tareas/) muestra profundidad, latencia y tareas fallidas.
+"""
+import datetime
+import logging
+import random
+import statistics
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 5
+ESPERA_BASE = 10  # segundos antes del primer reintento; se duplica en cada uno
+ESPERA_MAXIMA = 60 * 60
+TIEMPO_MAXIMO = 15 * 60  # una tarea en curso por más tiempo se da por abandonada
+RETENCION_DIAS = 7
+VENTANA_LATENCIA = datetime.timedelta(hours=1)
+MAX_MUESTRAS = 5000
+FALLIDAS_EN_PANEL = 20
+
+# nombre: (función, máximo de intentos)
+_tareas = {}
+
+
+def tarea(nombre, intentos=MAX_INTENTOS):
+    """Decorador: registrar la función como la tarea `nombre`; sus argumentos deben ser JSON"""
+    def registrar(funcion):
+        _tareas[nombre] = (funcion, intentos)
+        return funcion
+    return registrar
+
+
+def encolar(nombre, /, llave=None, retraso=0, **argumentos):
+    """
+    Agregar una tarea. Con `llave`, si ya hay una pendiente con esa llave no se agrega
+    otra. `retraso` en segundos aplaza la primera ejecución.
+    """
+    if nombre not in _tareas:
+        raise LookupError(f"Tarea desconocida: {nombre}")
+    nueva = Tarea(
+        nombre=nombre, argumentos=argumentos, llave=llave, max_intentos=_tareas[nombre][1],
+        disponible_en=timezone.now() + datetime.timedelta(seconds=retraso),
+    )
+    if llave:
+        # INSERT ... ON CONFLICT DO NOTHING contra el índice único parcial
+        Tarea.objects.bulk_create([nueva], ignore_conflicts=True)
+        pendiente = Tarea.objects.filter(nombre=nombre, llave=llave)
+    else:
+        nueva.save()
+        pendiente = Tarea.objects.filter(pk=nueva.pk)
+    if settings.TAREAS_EN_LINEA and not retraso:
+        transaction.on_commit(lambda: _en_linea(pendiente))
+
+
+def _en_linea(tareas):
+    """
+    Sin workers la pedida corre ya, aunque su llave esperara un reintento: el nuevo pedido
+    es motivo para intentar otra vez. Las demás pendientes no se tocan.
+    """
+    tareas.filter(estado='pendiente').update(disponible_en=timezone.now())
+    for pk in reclamar(1, 'en-linea', tareas):
+        ejecutar(pk)
+
+
+def reclamar(limite, trabajador, tareas=None):
+    """Tomar hasta `limite` tareas pendientes cuyo momento ya llegó; devuelve sus pk"""
+    ahora = timezone.now()
+    candidatas = list(
+        (Tarea.objects.all() if tareas is None else tareas)
+        .filter(estado='pendiente', disponible_en__lte=ahora)
+        .order_by('disponible_en', 'pk').values_list('pk', flat=True)[:limite]
+    )
+    tomadas = []
+    for pk in candidatas:
+        # Si otro worker la tomó primero el UPDATE no encuentra la fila pendiente
+        if Tarea.objects.filter(pk=pk, estado='pendiente').update(
+            estado='en_curso', iniciada=ahora, trabajador=trabajador, intentos=F('intentos') + 1,
+        ):
+            tomadas.append(pk)
+    return tomadas
+
+
+def ejecutar(pk):
+    """
+    Correr una tarea ya reclamada y registrar el resultado; True si terminó bien.
+    La función corre en una transacción: si falla, sus escrituras se revierten.
+    """
+    tarea = Tarea.objects.get(pk=pk)
+    try:
+        funcion, _ = _tareas[tarea.nombre]
+        with transaction.atomic():
+            funcion(**tarea.argumentos)
+    except Exception:
+        logger.exception("La tarea %s #%s falló (intento %s de %s)", tarea.nombre, pk, tarea.intentos, tarea.max_intentos)
+        _fallo(tarea, traceback.format_exc())
+        return False
+    Tarea.objects.filter(pk=pk, estado='en_curso').update(estado='hecha', terminada=timezone.now(), error='')
+    return True
+
+
+def espera(intentos):
+    """Segundos hasta el siguiente intento: exponencial con un poco de azar para no reintentar en bloque"""
+    return min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA) * random.uniform(0.75, 1.0)
+
+
+def _fallo(tarea, error):
+    ahora = timezone.now()
+    en_curso = Tarea.objects.filter(pk=tarea.pk, estado='en_curso')
+    if tarea.intentos >= tarea.max_intentos:
+        en_curso.update(estado='fallida', terminada=ahora, error=error)
+    else:
+        _a_pendiente(en_curso, ahora, disponible_en=ahora + datetime.timedelta(seconds=espera(tarea.intentos)), error=error)
+
+
+def _a_pendiente(tareas, ahora, **campos):
+    """
+    Volver tareas a pendiente. Si mientras tanto se encoló otra con la misma llave, esa
+    hará el trabajo y estas se descartan (solo puede haber una pendiente por llave).
+    """
+    gemelas = Tarea.objects.filter(estado='pendiente', llave=OuterRef('llave'))
+    with transaction.atomic():
+        tareas.filter(Exists(gemelas)).update(estado='descartada', terminada=ahora)
+        return tareas.update(estado='pendiente', **campos)
+
+
+def recuperar_abandonadas():
+    """Tareas en curso desde hace más de TIEMPO_MAXIMO (su worker murió) vuelven a pendiente"""
+    ahora = timezone.now()
+    abandonadas = Tarea.objects.filter(
+        estado='en_curso', iniciada__lt=ahora - datetime.timedelta(seconds=TIEMPO_MAXIMO),
+    )
+    return _a_pendiente(abandonadas, ahora, disponible_en=ahora, error='El worker se detuvo a mitad de la tarea')
+
+
+def purgar(dias=RETENCION_DIAS):
+    """Borrar las tareas terminadas bien hace más de `dias`; las fallidas se quedan para revisarlas"""
+    limite = timezone.now() - datetime.timedelta(days=dias)
+    borradas, _ = Tarea.objects.filter(estado__in=['hecha', 'descartada'], terminada__lt=limite).delete()
+    return borradas
+
+
+def _percentiles(segundos):
+    if not segundos:
+        return None, None
+    segundos.sort()
+    p95 = statistics.quantiles(segundos, n=20)[-1] if len(segundos) > 1 else segundos[0]
+    return round(statistics.median(segundos), 2), round(p95, 2)
+
+
+def resumen():
+    """Por nombre de tarea: cuántas hay en cada estado, la pendiente más vieja y la latencia reciente"""
+    ahora = timezone.now()
+    filas = defaultdict(lambda: {'estados': defaultdict(int), 'espera': [], 'duracion': []})
+    for nombre, estado, total in Tarea.objects.values_list('nombre', 'estado').annotate(total=Count('pk')).order_by():
+        filas[nombre]['estados'][estado] = total
+    for nombre, primera in Tarea.objects.filter(
+        estado='pendiente', disponible_en__lte=ahora,
+    ).values_list('nombre').annotate(primera=Min('creada')).order_by():
+        filas[nombre]['mas_vieja'] = (ahora - primera).total_seconds()
+    recientes = Tarea.objects.filter(
+        estado='hecha', terminada__gte=ahora - VENTANA_LATENCIA,
+    ).order_by('-terminada').values_list('nombre', 'creada', 'iniciada', 'terminada')[:MAX_MUESTRAS]
+    for nombre, creada, iniciada, terminada in recientes:
+        filas[nombre]['espera'].append(max((iniciada - creada).total_seconds(), 0))
+        filas[nombre]['duracion'].append((terminada - iniciada).total_seconds())
+
+    resultado = []
+    for nombre, fila in sorted(filas.items()):
+        espera_p50, espera_p95 = _percentiles(fila['espera'])
+        duracion_p50, duracion_p95 = _percentiles(fila['duracion'])
+        resultado.append({
+            'nombre': nombre,
+            'pendientes': fila['estados']['pendiente'],
+            'en_curso': fila['estados']['en_curso'],
+            'fallidas': fila['estados']['fallida'],
+            'hechas': len(fila['duracion']),
+            'mas_vieja': fila.get('mas_vieja'),
+            'espera_p50': espera_p50,
+            'espera_p95': espera_p95,
+            'duracion_p50': duracion_p50,
+            'duracion_p95': duracion_p95,
+        })
+    return resultado
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def panel_tareas(request):
+    """Profundidad y latencia de la cola por tarea y las últimas fallidas; POST las reintenta"""
+    if request.method == 'POST':
+        fallidas = Tarea.objects.filter(estado='fallida')
+        if request.POST.get('tarea', '').isdigit():
+            fallidas = fallidas.filter(pk=request.POST['tarea'])
+        ahora = timezone.now()
+        _a_pendiente(fallidas, ahora, disponible_en=ahora, intentos=0, terminada=None)
+        return redirect('panel_tareas')
+    return render(request, 'admin/tareas/panel.html', {
+        'tareas': resumen(),
+        'fallidas': Tarea.objects.filter(estado='fallida').order_by('-terminada')[:FALLIDAS_EN_PANEL],
+        'en_linea': settings.TAREAS_EN_LINEA,
+        'ventana_minutos': int(VENTANA_LATENCIA.total_seconds() // 60),
+    })
@@ -1,10 +1,7 @@
-from .models import Carrito
+from .carrito_temporal import CarritoTemporal
 
 def carrito_counter(request):
-    if request.user.is_authenticated:
-        try:
-            carrito = Carrito.objects.get(usuario=request.user, activo=True)
-            return {'carrito_count': carrito.total_items()}
-        except Carrito.DoesNotExist:
-            return {'carrito_count': 0}
-    return {'carrito_count': 0}
\ No newline at end of file
+    # Las vistas async dejan el contador resuelto: el render es síncrono y no puede consultar
+    if hasattr(request, 'carrito_count'):
+        return {'carrito_count': request.carrito_count}
+    return {'carrito_count': CarritoTemporal.cargar(request, request.user).total_items()}
@@ -0,0 +1,243 @@
+"""
+Pipeline de archivos estáticos.
+
+- Bootstrap y Bootstrap Icons se vendorizan en static/vendor (comando vendorizar_assets);
+  mientras no estén descargados, {% asset_vendor %} sigue apuntando al CDN.
+- SpaStaticStorage (collectstatic) purga del CSS vendorizado los selectores de clases que
+  no aparecen en plantillas ni en el código, nombra cada archivo con el hash de su
+  contenido y deja junto a cada uno sus variantes .gz y .br precomprimidas.
+- servir() entrega esos archivos cuando Django sirve los estáticos sin DEBUG: elige la
+  variante comprimida según Accept-Encoding y marca los nombres con hash como inmutables.
+"""
+import gzip
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete solo se generan variantes .gz
+    brotli = None
+
+VERSION_BOOTSTRAP = '5.1.3'
+VERSION_ICONOS = '1.8.0'
+CDN = 'https://cdn.jsdelivr.net/npm'
+
+# nombre: (ruta local bajo static/, url en el CDN)
+ASSETS_VENDOR = {
+    'bootstrap_css': (
+        f'vendor/bootstrap-{VERSION_BOOTSTRAP}/css/bootstrap.min.css',
+        f'{CDN}/bootstrap@{VERSION_BOOTSTRAP}/dist/css/bootstrap.min.css',
+    ),
+    'bootstrap_css_map': (
+        f'vendor/bootstrap-{VERSION_BOOTSTRAP}/css/bootstrap.min.css.map',
+        f'{CDN}/bootstrap@{VERSION_BOOTSTRAP}/dist/css/bootstrap.min.css.map',
+    ),
+    'bootstrap_js': (
+        f'vendor/bootstrap-{VERSION_BOOTSTRAP}/js/bootstrap.bundle.min.js',
+        f'{CDN}/bootstrap@{VERSION_BOOTSTRAP}/dist/js/bootstrap.bundle.min.js',
+    ),
+    'bootstrap_js_map': (
+        f'vendor/bootstrap-{VERSION_BOOTSTRAP}/js/bootstrap.bundle.min.js.map',
+        f'{CDN}/bootstrap@{VERSION_BOOTSTRAP}/dist/js/bootstrap.bundle.min.js.map',
+    ),
+    'bootstrap_icons': (
+        f'vendor/bootstrap-icons-{VERSION_ICONOS}/bootstrap-icons.css',
+        f'{CDN}/bootstrap-icons@{VERSION_ICONOS}/font/bootstrap-icons.css',
+    ),
+    'bootstrap_icons_woff2': (
+        f'vendor/bootstrap-icons-{VERSION_ICONOS}/fonts/bootstrap-icons.woff2',
+        f'{CDN}/bootstrap-icons@{VERSION_ICONOS}/font/fonts/bootstrap-icons.woff2',
+    ),
+    'bootstrap_icons_woff': (
+        f'vendor/bootstrap-icons-{VERSION_ICONOS}/fonts/bootstrap-icons.woff',
+        f'{CDN}/bootstrap-icons@{VERSION_ICONOS}/font/fonts/bootstrap-icons.woff',
+    ),
+}
+
+# Clases que el JavaScript de Bootstrap agrega en tiempo de ejecución
+CLASES_SEGURAS = {
+    'show', 'showing', 'hiding', 'hide', 'fade', 'collapse', 'collapsing', 'collapsed', 'active',
+    'disabled', 'modal-open', 'modal-backdrop', 'modal-static', 'offcanvas-backdrop',
+    'dropdown-menu-end', 'dropdown-menu-start', 'was-validated', 'is-valid', 'is-invalid',
+    'tooltip', 'tooltip-inner', 'tooltip-arrow', 'popover', 'popover-arrow', 'popover-header',
+    'popover-body', 'bs-tooltip-auto', 'bs-tooltip-top', 'bs-tooltip-bottom', 'bs-tooltip-start',
+    'bs-tooltip-end', 'bs-popover-auto', 'bs-popover-top', 'bs-popover-bottom', 'bs-popover-start',
+    'bs-popover-end', 'carousel-item-next', 'carousel-item-prev', 'carousel-item-start',
+    'carousel-item-end', 'pointer-event', 'alert-success', 'alert-info', 'alert-warning',
+    'alert-danger', 'alert-error', 'alert-debug',
+}
+EXTENSIONES_COMPRIMIBLES = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml'}
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _bloques(css):
+    """
+    Partir CSS en sentencias de primer nivel: (preludio, cuerpo) para reglas y bloques @,
+    (sentencia, None) para @charset/@import. Respeta cadenas y descarta comentarios.
+    """
+    inicio, profundidad, i, preludio = 0, 0, 0, None
+    limpio = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    while i < len(limpio):
+        caracter = limpio[i]
+        if caracter in '"\'':
+            i = limpio.index(caracter, i + 1) + 1
+            continue
+        if caracter == '{':
+            if profundidad == 0:
+                preludio, inicio = limpio[inicio:i].strip(), i + 1
+            profundidad += 1
+        elif caracter == '}':
+            profundidad -= 1
+            if profundidad == 0:
+                yield preludio, limpio[inicio:i]
+                inicio = i + 1
+        elif caracter == ';' and profundidad == 0:
+            yield limpio[inicio:i].strip() + ';', None
+            inicio = i + 1
+        i += 1
+
+
+def _separar_selectores(preludio):
+    """Separar por comas de primer nivel (no las de :not(.a, .b))"""
+    partes, nivel, actual = [], 0, ''
+    for caracter in preludio:
+        if caracter == ',' and nivel == 0:
+            partes.append(actual)
+            actual = ''
+            continue
+        nivel += caracter == '('
+        nivel -= caracter == ')'
+        actual += caracter
+    return partes + [actual]
+
+
+def _clases_requeridas(selector):
+    # Lo que está dentro de :not()/:is()/:where() no hace falta para que el selector aplique
+    sin_argumentos = re.sub(r'\([^()]*\)', '', selector)
+    return set(re.findall(r'\.(-?[_a-zA-Z][\w-]*)', sin_argumentos))
+
+
+def purgar_css(css, usadas):
+    """Quitar las reglas cuyos selectores usan alguna clase que no está en `usadas`"""
+    salida = []
+    for preludio, cuerpo in _bloques(css):
+        if cuerpo is None:
+            salida.append(preludio)
+        elif preludio.startswith(('@media', '@supports', '@layer')):
+            interior = purgar_css(cuerpo, usadas)
+            if interior:
+                salida.append(f'{preludio}{{{interior}}}')
+        elif preludio.startswith('@'):
+            salida.append(f'{preludio}{{{cuerpo}}}')
+        else:
+            selectores = [
+                selector.strip() for selector in _separar_selectores(preludio)
+                if _clases_requeridas(selector) <= usadas
+            ]
+            if selectores:
+                salida.append(f"{','.join(selectores)}{{{cuerpo}}}")
+    return ''.join(salida)
+
+
+def clases_usadas():
+    """
+    Todos los identificadores que aparecen en plantillas y código Python del proyecto
+    (mismo criterio que el extractor por defecto de PurgeCSS): cubre clases armadas con
+    {% if %} o definidas en los widgets de forms.py.
+    """
+    fuentes = [Path(directorio) for directorio in settings.TEMPLATES[0]['DIRS']]
+    for app in apps.get_app_configs():
+        if Path(app.path).is_relative_to(settings.BASE_DIR):
+            fuentes.append(Path(app.path))
+    usadas = set(CLASES_SEGURAS)
+    for fuente in fuentes:
+        for archivo in fuente.rglob('*'):
+            if archivo.suffix in ('.html', '.py', '.js', '.txt'):
+                usadas.update(re.findall(r'[\w-]+', archivo.read_text(encoding='utf-8', errors='ignore')))
+    return usadas
+
+
+class SpaStaticStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que además purga el CSS vendorizado y precomprime"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.purgar(paths)
+        for original, procesado, modificado in super().post_process(paths, dry_run, **options):
+            if procesado and not dry_run and not isinstance(modificado, Exception):
+                self.comprimir(procesado)
+            yield original, procesado, modificado
+
+    def purgar(self, paths):
+        usadas = None
+        for nombre in getattr(settings, 'SPA_PURGAR_CSS', []):
+            if nombre not in paths:
+                continue
+            usadas = usadas or clases_usadas()
+            origen, ruta = paths[nombre]
+            with origen.open(ruta) as archivo:
+                css = archivo.read().decode('utf-8')
+            self.delete(nombre)
+            self._save(nombre, ContentFile(purgar_css(css, usadas).encode('utf-8')))
+            # El hash se calcula sobre la copia purgada, no sobre el original
+            paths[nombre] = (self, nombre)
+
+    def comprimir(self, nombre):
+        if Path(nombre).suffix not in EXTENSIONES_COMPRIMIBLES:
+            return
+        with self.open(nombre) as archivo:
+            contenido = archivo.read()
+        variantes = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+        if brotli:
+            variantes['.br'] = brotli.compress(contenido, quality=11)
+        for extension, comprimido in variantes.items():
+            if len(comprimido) < len(contenido):
+                if self.exists(nombre + extension):
+                    self.delete(nombre + extension)
+                self._save(nombre + extension, ContentFile(comprimido))
+
+
+@lru_cache(maxsize=None)
+def _nombres_con_hash():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+@require_safe
+def servir(request, ruta):
+    """Servir STATIC_ROOT con variantes precomprimidas y caché inmutable para nombres con hash"""
+    try:
+        completa = Path(safe_join(settings.STATIC_ROOT, ruta))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not completa.is_file():
+        raise Http404
+
+    aceptadas = request.headers.get('Accept-Encoding', '')
+    archivo, codificacion = completa, None
+    for extension, nombre in (('.br', 'br'), ('.gz', 'gzip')):
+        variante = completa.with_name(completa.name + extension)
+        if nombre in aceptadas and variante.is_file():
+            archivo, codificacion = variante, nombre
+            break
+
+    tipo, _ = mimetypes.guess_type(completa.name)
+    respuesta = FileResponse(archivo.open('rb'), content_type=tipo or 'application/octet-stream')
+    if codificacion:
+        respuesta['Content-Encoding'] = codificacion
+    respuesta['Vary'] = 'Accept-Encoding'
+    if ruta in _nombres_con_hash():
+        respuesta['Cache-Control'] = CACHE_INMUTABLE
+    else:
+        respuesta['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return respuesta
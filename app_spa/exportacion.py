@@ -0,0 +1,168 @@
+"""
+Exportación en streaming de pedidos, items de pedido y clientes (CSV o NDJSON).
+
+Cada conjunto es una sola consulta con values_list() recorrida con iterator(), así que
+no se instancian modelos ni se carga el resultado completo: la memoria no depende del
+número de filas. Las filas se agrupan en bloques de ~64 KiB y opcionalmente se
+comprimen con gzip al vuelo. Lo usan la vista api.exportar y el comando export_spa.
+"""
+import csv
+import datetime
+import json
+import zlib
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+
+from .models import Clientes, Pedido, PedidoItem
+
+FORMATOS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+TAMANO_BLOQUE = 64 * 1024
+FILAS_POR_LOTE = 2000
+CENTAVOS = Decimal('0.01')
+
+# conjunto: [(columna, expresión de values_list)]
+COLUMNAS = {
+    'pedidos': [
+        ('pedido', 'id'),
+        ('fecha', 'fecha_pedido'),
+        ('estado', 'estado'),
+        ('usuario', 'usuario__username'),
+        ('cliente', 'usuario__cliente__id_clientes'),
+        ('nombre', 'usuario__cliente__nombre'),
+        ('apellido', 'usuario__cliente__apellido'),
+        ('email', 'usuario__cliente__email'),
+        ('subtotal', 'subtotal'),
+        ('iva', 'iva'),
+        ('total', 'total'),
+        ('direccion_entrega', 'direccion_entrega'),
+        ('telefono_contacto', 'telefono_contacto'),
+    ],
+    'items': [
+        ('pedido', 'pedido_id'),
+        ('fecha', 'pedido__fecha_pedido'),
+        ('estado', 'pedido__estado'),
+        ('usuario', 'pedido__usuario__username'),
+        ('cliente', 'pedido__usuario__cliente__id_clientes'),
+        ('nombre', 'pedido__usuario__cliente__nombre'),
+        ('apellido', 'pedido__usuario__cliente__apellido'),
+        ('email', 'pedido__usuario__cliente__email'),
+        ('item', 'id'),
+        ('producto', 'producto__nombre'),
+        ('servicio', 'servicio__nombre'),
+        ('cantidad', 'cantidad'),
+        ('precio', 'precio'),
+        ('importe', 'importe'),
+        ('total_pedido', 'pedido__total'),
+    ],
+    'clientes': [
+        ('cliente', 'id_clientes'),
+        ('usuario', 'usuario__username'),
+        ('nombre', 'nombre'),
+        ('apellido', 'apellido'),
+        ('email', 'email'),
+        ('telefono', 'telefono'),
+        ('fecha_registro', 'fecha_registro'),
+        ('pedidos', 'resumen__pedidos'),
+        ('total_gastado', 'resumen__total_gastado'),
+        ('ultimo_pedido', 'resumen__ultimo_pedido'),
+    ],
+}
+
+
+class ErrorExportacion(ValueError):
+    pass
+
+
+def _rango_fechas(queryset, campo, desde, hasta):
+    """
+    desde/hasta son fechas locales inclusivas; se comparan como datetimes para que el
+    índice sobre fecha_pedido siga sirviendo (un lookup __date lo impediría)
+    """
+    zona = timezone.get_current_timezone()
+    if desde:
+        inicio = datetime.datetime.combine(desde, datetime.time.min, tzinfo=zona)
+        queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    if hasta:
+        fin = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min, tzinfo=zona)
+        queryset = queryset.filter(**{f'{campo}__lt': fin})
+    return queryset
+
+
+def consulta(conjunto, desde=None, hasta=None, estado=None):
+    if conjunto not in COLUMNAS:
+        raise ErrorExportacion(f"Conjunto desconocido: {conjunto}")
+    if estado and estado not in dict(Pedido.ESTADO_CHOICES):
+        raise ErrorExportacion(f"Estado desconocido: {estado}")
+
+    if conjunto == 'pedidos':
+        queryset = _rango_fechas(Pedido.objects.all(), 'fecha_pedido', desde, hasta)
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        queryset = queryset.order_by('id')
+    elif conjunto == 'items':
+        queryset = _rango_fechas(PedidoItem.objects.all(), 'pedido__fecha_pedido', desde, hasta)
+        if estado:
+            queryset = queryset.filter(pedido__estado=estado)
+        importe = ExpressionWrapper(F('cantidad') * F('precio'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        queryset = queryset.annotate(importe=importe).order_by('pedido_id', 'id')
+    else:
+        queryset = Clientes.objects.order_by('id_clientes')
+        if desde:
+            queryset = queryset.filter(fecha_registro__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha_registro__lte=hasta)
+    return queryset.values_list(*(expresion for _, expresion in COLUMNAS[conjunto]))
+
+
+def _valor(valor):
+    if isinstance(valor, datetime.datetime):
+        return timezone.localtime(valor).isoformat()
+    if isinstance(valor, Decimal):
+        # Los importes calculados en SQLite llegan con precisión de float
+        return str(valor.quantize(CENTAVOS))
+    if isinstance(valor, datetime.date):
+        return valor.isoformat()
+    return valor
+
+
+class _Linea:
+    """Destino de csv.writer que devuelve la línea en lugar de escribirla"""
+    def write(self, texto):
+        return texto
+
+
+def lineas(conjunto, formato, **filtros):
+    nombres = [nombre for nombre, _ in COLUMNAS[conjunto]]
+    filas = consulta(conjunto, **filtros).iterator(chunk_size=FILAS_POR_LOTE)
+    if formato == 'csv':
+        escritor = csv.writer(_Linea())
+        yield escritor.writerow(nombres)
+        for fila in filas:
+            yield escritor.writerow([_valor(valor) for valor in fila])
+    elif formato == 'ndjson':
+        for fila in filas:
+            yield json.dumps(dict(zip(nombres, map(_valor, fila))), ensure_ascii=False) + '\n'
+    else:
+        raise ErrorExportacion(f"Formato desconocido: {formato}")
+
+
+def bloques(conjunto, formato='csv', comprimir=False, **filtros):
+    """Bytes listos para enviar o escribir: líneas agrupadas y, si se pide, en gzip"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if comprimir else None
+    pendiente, tamano = [], 0
+    for linea in lineas(conjunto, formato, **filtros):
+        pendiente.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            datos = ''.join(pendiente).encode('utf-8')
+            pendiente, tamano = [], 0
+            datos = compresor.compress(datos) if compresor else datos
+            if datos:
+                yield datos
+    datos = ''.join(pendiente).encode('utf-8')
+    if compresor:
+        datos = compresor.compress(datos) + compresor.flush()
+    if datos:
+        yield datos
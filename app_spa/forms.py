@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Clientes
+from .models import Clientes, Empleados, Productos, Proveedores, Servicios
 
 class RegistroForm(UserCreationForm):
     # Campos adicionales para el registro
@@ -83,4 +83,53 @@ class RegistroForm(UserCreationForm):
                 }
             )
         
-        return user
\ No newline at end of file
+        return user
+
+
+# Formularios de admin-spa: las plantillas escriben el HTML de cada campo a mano, así
+# que solo validan y guardan los nombres que envían.
+class ServicioForm(forms.ModelForm):
+    # La relación vive en Productos.servicios; el formulario del servicio también la edita
+    productos = forms.ModelMultipleChoiceField(Productos.objects.all(), required=False)
+
+    class Meta:
+        model = Servicios
+        fields = ['nombre', 'descripcion', 'precio', 'duracion', 'tipo_servicio', 'imagen']
+
+    def save(self, commit=True):
+        servicio = super().save(commit=commit)
+        if commit:
+            servicio.productos_utilizados.set(self.cleaned_data['productos'])
+        return servicio
+
+
+class EmpleadoForm(forms.ModelForm):
+    class Meta:
+        model = Empleados
+        fields = ['nombre', 'apellido', 'especialidad', 'telefono', 'cargo', 'servicio']
+
+
+class ClienteForm(forms.ModelForm):
+    class Meta:
+        model = Clientes
+        fields = [
+            'nombre', 'apellido', 'email', 'telefono', 'alergias', 'preferencias', 'servicios', 'productos_interes',
+        ]
+
+
+class ProveedorForm(forms.ModelForm):
+    class Meta:
+        model = Proveedores
+        fields = ['nombre_empresa', 'contacto', 'telefono', 'email', 'direccion', 'especialidad']
+
+
+class ProductoForm(forms.ModelForm):
+    class Meta:
+        model = Productos
+        fields = ['nombre', 'descripcion', 'precio', 'stock', 'tipo_producto', 'imagen', 'proveedor', 'servicios']
+
+
+class CheckoutForm(forms.Form):
+    direccion_entrega = forms.CharField(required=False, widget=forms.Textarea)
+    telefono_contacto = forms.CharField(max_length=20, required=False)
+    notas = forms.CharField(required=False, widget=forms.Textarea)
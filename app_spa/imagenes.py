@@ -0,0 +1,98 @@
+"""
+Derivadas de las imágenes de Productos y Servicios.
+
+Al subir una imagen se generan variantes de tamaño fijo (VARIANTES) en WebP y JPEG.
+Las rutas dependen solo del contenido del original (sha256), así que dos subidas
+del mismo archivo comparten derivadas, una derivada nunca cambia de contenido y
+puede servirse con caché de larga duración. El modelo guarda el hash en imagen_hash;
+con él las plantillas arman srcset sin tocar el disco.
+"""
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DIRECTORIO = 'derivadas'
+# nombre: (ancho en px, recorte cuadrado)
+VARIANTES = {
+    'thumb': (160, True),
+    'card': (480, False),
+    'detail': (1200, False),
+}
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def hash_contenido(archivo):
+    sha = hashlib.sha256()
+    for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+        sha.update(bloque)
+    return sha.hexdigest()
+
+
+def ruta_derivada(hash_imagen, variante, formato):
+    return f"{DIRECTORIO}/{hash_imagen[:2]}/{hash_imagen}/{variante}.{formato}"
+
+
+def url_derivada(hash_imagen, variante, formato):
+    return default_storage.url(ruta_derivada(hash_imagen, variante, formato))
+
+
+def _redimensionar(imagen, ancho, cuadrada):
+    if cuadrada:
+        lado = min(ancho, imagen.width, imagen.height)
+        return ImageOps.fit(imagen, (lado, lado), Image.Resampling.LANCZOS)
+    if imagen.width <= ancho:
+        return imagen.copy()
+    alto = round(imagen.height * ancho / imagen.width)
+    return imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+
+def _codificar(imagen, formato):
+    salida = BytesIO()
+    if formato == 'jpg' and imagen.mode != 'RGB':
+        imagen = imagen.convert('RGB')
+    imagen.save(salida, **FORMATOS[formato])
+    return salida.getvalue()
+
+
+def generar_derivadas(nombre, storage=None, forzar=False):
+    """
+    Generar las derivadas del archivo `nombre` del storage y devolver su hash.
+    Si ya existen (mismo contenido subido antes) no se recalculan.
+    Es una función de módulo para poder ejecutarse en un ProcessPoolExecutor.
+    """
+    storage = storage or default_storage
+    with storage.open(nombre, 'rb') as archivo:
+        hash_imagen = hash_contenido(archivo)
+        # La última derivada escrita funciona como marca de "completo"
+        ultima = ruta_derivada(hash_imagen, list(VARIANTES)[-1], list(FORMATOS)[-1])
+        if storage.exists(ultima) and not forzar:
+            return hash_imagen
+        archivo.seek(0)
+        with Image.open(archivo) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+            for variante, (ancho, cuadrada) in VARIANTES.items():
+                imagen = _redimensionar(original, ancho, cuadrada)
+                for formato in FORMATOS:
+                    ruta = ruta_derivada(hash_imagen, variante, formato)
+                    if storage.exists(ruta):
+                        storage.delete(ruta)
+                    storage.save(ruta, ContentFile(_codificar(imagen, formato)))
+    return hash_imagen
+
+
+def srcset(hash_imagen, variante, formato):
+    """Candidatos para srcset: la variante pedida y las mayores con el mismo recorte"""
+    ancho, cuadrada = VARIANTES[variante]
+    return ", ".join(
+        f"{url_derivada(hash_imagen, nombre, formato)} {otro_ancho}w"
+        for nombre, (otro_ancho, otra_cuadrada) in VARIANTES.items()
+        if otra_cuadrada == cuadrada and otro_ancho >= ancho
+    )
@@ -0,0 +1,184 @@
+"""
+Importación masiva de clientes desde CSV o NDJSON (manage.py import_clientes).
+
+Registrar un cliente con RegistroForm cuesta varias consultas (User, la señal
+crear_cliente_desde_usuario y el update_or_create de Clientes) y un hash PBKDF2
+completo, uno por uno. Aquí la entrada se lee en streaming y se procesa por lotes: las
+filas se validan en memoria contra los usuarios existentes, los hashes del lote se
+calculan con la función `mapear` que recibe importar() (el comando le pasa el map de un
+pool de procesos) y cada lote entra con dos bulk_create en una transacción, sin
+señales por fila. Una fila inválida se reporta con su número de línea y el resto sigue.
+Sin contraseña, el usuario queda con una contraseña inutilizable y puede recibir un
+token de restablecimiento (token_restablecimiento).
+"""
+import csv
+import gzip
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth import password_validation
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import Clientes
+
+FORMATOS = ('csv', 'ndjson')
+TAMANO_LOTE = 500
+COLUMNAS = ['username', 'email', 'nombre', 'apellido', 'telefono', 'password', 'alergias', 'preferencias']
+OBLIGATORIAS = ['username', 'email', 'nombre', 'apellido', 'telefono']
+# Los límites de Clientes, más estrictos que los de User
+LIMITES = {'username': 150, 'email': 100, 'nombre': 100, 'apellido': 100, 'telefono': 15}
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+def abrir(ruta):
+    """Archivo de texto, descomprimido al vuelo si termina en .gz"""
+    if str(ruta).endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(ruta, 'rb'), encoding='utf-8-sig', newline='')
+    return open(ruta, encoding='utf-8-sig', newline='')
+
+
+def leer(archivo, formato):
+    """(número de línea, fila) por registro; una línea ilegible llega como FilaInvalida"""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        faltan = [columna for columna in OBLIGATORIAS if columna not in (lector.fieldnames or [])]
+        if faltan:
+            raise FilaInvalida(f"Al encabezado le faltan columnas: {', '.join(faltan)}")
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == 'ndjson':
+        for numero, linea in enumerate(archivo, 1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except ValueError as error:
+                yield numero, FilaInvalida(f"JSON inválido: {error}")
+    else:
+        raise FilaInvalida(f"Formato desconocido: {formato}")
+
+
+def limpiar(fila):
+    """Los campos de COLUMNAS como texto validado; FilaInvalida con el motivo si no sirve"""
+    if isinstance(fila, FilaInvalida):
+        raise fila
+    if not isinstance(fila, dict):
+        raise FilaInvalida("Cada registro debe ser un objeto")
+    datos = {columna: str(fila.get(columna) or '').strip() for columna in COLUMNAS}
+    faltan = [columna for columna in OBLIGATORIAS if not datos[columna]]
+    if faltan:
+        raise FilaInvalida(f"Faltan datos: {', '.join(faltan)}")
+    for columna, maximo in LIMITES.items():
+        if len(datos[columna]) > maximo:
+            raise FilaInvalida(f"{columna} tiene más de {maximo} caracteres")
+    try:
+        User.username_validator(datos['username'])
+        validate_email(datos['email'])
+        if datos['password']:
+            password_validation.validate_password(datos['password'])
+    except ValidationError as error:
+        raise FilaInvalida(' '.join(error.messages))
+    datos['email'] = BaseUserManager.normalize_email(datos['email'])
+    return datos
+
+
+def token_restablecimiento(usuario):
+    """(uid, token) para el enlace de restablecer contraseña de un usuario importado"""
+    return urlsafe_base64_encode(force_bytes(usuario.pk)), default_token_generator.make_token(usuario)
+
+
+def importar(filas, mapear=map, tamano=TAMANO_LOTE, sin_contrasenas=False):
+    """
+    Importar `filas` (pares de leer()) por lotes. Por cada lote devuelve (creados,
+    rechazos): creados son los User insertados, con usuario.sin_contrasena marcado, y
+    rechazos pares (número de línea, motivo). Un nombre de usuario que ya existe, sin
+    distinguir mayúsculas como RegistroForm, se rechaza.
+    """
+    vistos = set(User.objects.annotate(clave=Lower('username')).values_list('clave', flat=True).iterator())
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano)):
+        validas, rechazos = [], []
+        for numero, fila in lote:
+            try:
+                datos = limpiar(fila)
+            except FilaInvalida as error:
+                rechazos.append((numero, str(error)))
+                continue
+            if sin_contrasenas:
+                datos['password'] = ''
+            if datos['username'].lower() in vistos:
+                rechazos.append((numero, f"El usuario {datos['username']} ya existe"))
+                continue
+            vistos.add(datos['username'].lower())
+            validas.append((numero, datos))
+
+        # Solo los hashes van al pool: son lo único caro del lote
+        hashes = iter(mapear(make_password, [datos['password'] for _, datos in validas if datos['password']]))
+        usuarios = []
+        for numero, datos in validas:
+            usuario = User(
+                username=datos['username'], email=datos['email'],
+                first_name=datos['nombre'], last_name=datos['apellido'],
+                password=next(hashes) if datos['password'] else make_password(None),
+            )
+            usuario.sin_contrasena = not datos['password']
+            usuario.linea, usuario.datos = numero, datos
+            usuarios.append(usuario)
+        yield _insertar(usuarios, rechazos), rechazos
+
+
+def _insertar(usuarios, rechazos):
+    """
+    Dos bulk_create en una transacción. Si otro proceso registró alguno de los usuarios
+    mientras tanto, esas filas se rechazan y el resto del lote se intenta de nuevo
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(usuarios)
+                if usuarios and usuarios[0].pk is None:
+                    # Sin INSERT ... RETURNING los pk se leen de vuelta
+                    pks = dict(User.objects.filter(
+                        username__in=[usuario.username for usuario in usuarios],
+                    ).values_list('username', 'pk'))
+                    for usuario in usuarios:
+                        usuario.pk = pks[usuario.username]
+                Clientes.objects.bulk_create([
+                    Clientes(
+                        usuario_id=usuario.pk,
+                        nombre=usuario.datos['nombre'],
+                        apellido=usuario.datos['apellido'],
+                        email=usuario.datos['email'],
+                        telefono=usuario.datos['telefono'],
+                        alergias=usuario.datos['alergias'],
+                        preferencias=usuario.datos['preferencias'],
+                    )
+                    for usuario in usuarios
+                ])
+            return usuarios
+        except IntegrityError:
+            existentes = set(User.objects.filter(
+                username__in=[usuario.username for usuario in usuarios],
+            ).values_list('username', flat=True))
+            if not existentes:
+                raise
+            rechazos.extend(
+                (usuario.linea, f"El usuario {usuario.username} ya existe")
+                for usuario in usuarios if usuario.username in existentes
+            )
+            usuarios = [usuario for usuario in usuarios if usuario.username not in existentes]
+            for usuario in usuarios:
+                usuario.pk = None
@@ -0,0 +1,139 @@
+import datetime
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_spa import agenda
+from app_spa.models import AgendaDia, Cita, Empleados, Servicios
+
+
+class Command(BaseCommand):
+    help = (
+        "Disponibilidad de un servicio con muchos empleados y días ocupados: bitsets de "
+        "AgendaDia contra recorrer las citas. Todo corre en una transacción que se revierte"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empleados', type=int, default=200)
+        parser.add_argument('--dias', type=int, default=30)
+        parser.add_argument('--citas', type=int, default=8, help='Máximo de citas por empleado y día')
+        parser.add_argument('--duracion', type=int, default=60, help='Duración del servicio buscado (min)')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=7)
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        desde = timezone.localdate() + datetime.timedelta(days=1)
+        with transaction.atomic():
+            servicio = self.poblar(azar, desde, options)
+            self.medir(servicio, desde, options)
+            transaction.set_rollback(True)
+
+    def poblar(self, azar, desde, options):
+        inicio = time.perf_counter()
+        servicio = Servicios.objects.create(
+            nombre='Servicio benchmark agenda', precio=1, duracion=options['duracion'], tipo_servicio='benchmark',
+        )
+        Empleados.objects.bulk_create([
+            Empleados(
+                nombre=f'Empleado {i}', apellido='Benchmark', especialidad='-', telefono='-', cargo='-',
+                servicio=servicio,
+            )
+            for i in range(options['empleados'])
+        ])
+        citas, ocupacion = [], defaultdict(int)
+        for empleado_id in servicio.empleados.values_list('pk', flat=True):
+            for dia in range(options['dias']):
+                fecha = desde + datetime.timedelta(days=dia)
+                bloque = 0
+                for _ in range(options['citas']):
+                    bloque += azar.randint(0, 6)
+                    bloques = azar.choice((6, 9, 12, 18))
+                    if bloque + bloques > agenda.BLOQUES:
+                        break
+                    citas.append(Cita(
+                        empleado_id=empleado_id, servicio=servicio, fecha=fecha,
+                        inicio=agenda.hora(bloque), fin=agenda.hora(bloque + bloques),
+                    ))
+                    ocupacion[empleado_id, fecha] |= agenda.mascara(bloque, bloques)
+                    bloque += bloques
+        Cita.objects.bulk_create(citas, batch_size=2000)
+        AgendaDia.objects.bulk_create([
+            AgendaDia(empleado_id=empleado_id, fecha=fecha, ocupacion=agenda.a_bytes(bits))
+            for (empleado_id, fecha), bits in ocupacion.items()
+        ], batch_size=2000)
+        self.stdout.write(
+            f"{options['empleados']} empleados x {options['dias']} días, {len(citas)} citas "
+            f"(preparado en {time.perf_counter() - inicio:.1f}s)"
+        )
+        return servicio
+
+    def medir(self, servicio, desde, options):
+        # Mañana a medianoche: ningún horario queda descartado por haber pasado
+        ahora = timezone.make_aware(datetime.datetime.combine(desde, datetime.time.min))
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            resultado = agenda.disponibilidad(servicio, desde, options['dias'], ahora=ahora)
+            tiempos.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        esperado = self.recorriendo_citas(servicio, desde, options['dias'])
+        ingenuo = time.perf_counter() - inicio
+
+        horarios = sum(len(horas) for _, horas in resultado)
+        self.stdout.write(
+            f"bitsets:          mediana {statistics.median(tiempos) * 1000:7.2f} ms   "
+            f"máx {max(tiempos) * 1000:7.2f} ms   ({horarios} horarios ofrecidos)"
+        )
+        self.stdout.write(f"recorriendo citas:        {ingenuo * 1000:7.2f} ms")
+        if resultado == esperado:
+            self.stdout.write(self.style.SUCCESS("Mismos horarios con ambos métodos"))
+        else:
+            self.stdout.write(self.style.ERROR("Los métodos difieren"))
+
+        fecha = desde + datetime.timedelta(days=options['dias'] // 2)
+        reservadas, inicio = 0, time.perf_counter()
+        for hora in dict(resultado)[fecha][:20]:
+            try:
+                agenda.reservar(servicio, fecha, hora, ahora=ahora)
+                reservadas += 1
+            except agenda.HorarioNoDisponible:
+                pass
+        if reservadas:
+            self.stdout.write(
+                f"reservar:         {(time.perf_counter() - inicio) * 1000 / reservadas:7.2f} ms por cita "
+                f"({reservadas} reservadas)"
+            )
+
+    @staticmethod
+    def recorriendo_citas(servicio, desde, dias):
+        """La alternativa sin bitsets: por cada inicio ofrecido, buscar un empleado sin traslapes"""
+        hasta = desde + datetime.timedelta(days=dias - 1)
+        empleados = list(servicio.empleados.values_list('pk', flat=True))
+        citas = defaultdict(list)
+        for empleado_id, fecha, inicio, fin in Cita.objects.filter(
+            servicio=servicio, fecha__gte=desde, fecha__lte=hasta, estado='reservada',
+        ).values_list('empleado_id', 'fecha', 'inicio', 'fin'):
+            citas[empleado_id, fecha].append((inicio, fin))
+        duracion = datetime.timedelta(minutes=agenda.bloques_servicio(servicio.duracion) * agenda.RESOLUCION)
+        inicios = agenda.horarios(agenda.OFRECIDOS)
+        resultado = []
+        for dia in range(dias):
+            fecha = desde + datetime.timedelta(days=dia)
+            libres = []
+            for hora in inicios:
+                fin = datetime.datetime.combine(fecha, hora) + duracion
+                if fin.date() != fecha or fin.time() > agenda.CIERRE:
+                    continue
+                if any(
+                    all(fin.time() <= inicio or hora >= termino for inicio, termino in citas[empleado_id, fecha])
+                    for empleado_id in empleados
+                ):
+                    libres.append(hora)
+            resultado.append((fecha, libres))
+        return resultado
@@ -0,0 +1,141 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from app_spa.models import Pedido
+
+# ruta: requiere sesión
+RUTAS = {'inicio': False, 'tienda': False, 'carrito': True, 'mis_pedidos': True}
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        "Throughput de las vistas de la tienda con peticiones concurrentes servidas por el "
+        "handler WSGI (un hilo por petición) y por el ASGI (event loop), contra la misma base "
+        "de datos configurada; poblarla antes con seed_spa"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=400, help='Peticiones por ruta y modo')
+        parser.add_argument('--concurrencia', type=int, default=16, help='Peticiones simultáneas')
+        parser.add_argument('--rutas', nargs='+', choices=list(RUTAS), default=list(RUTAS))
+        parser.add_argument(
+            '--con-cache', action='store_true',
+            help='Dejar activa la caché de páginas del catálogo (por defecto se mide la vista)',
+        )
+
+    def handle(self, *args, **options):
+        usuario_id = Pedido.objects.values_list('usuario_id', flat=True).first()
+        if usuario_id is None:
+            raise CommandError("La base de datos no tiene pedidos; ejecuta seed_spa primero")
+
+        cliente = Client()
+        cliente.force_login(Pedido.objects.select_related('usuario').filter(usuario_id=usuario_id).first().usuario)
+        cookie_sesion = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+        aplicaciones = {'WSGI': get_wsgi_application(), 'ASGI': get_asgi_application()}
+        self.stdout.write(
+            f"{options['peticiones']} peticiones por ruta, concurrencia {options['concurrencia']}"
+        )
+        try:
+            with override_settings(CACHE_CATALOGO=options['con_cache'], ALLOWED_HOSTS=[HOST]):
+                for nombre in options['rutas']:
+                    ruta = reverse(nombre)
+                    cookie = cookie_sesion if RUTAS[nombre] else ''
+                    resultados = {}
+                    for modo, aplicacion in aplicaciones.items():
+                        medir = self.medir_wsgi if modo == 'WSGI' else self.medir_asgi
+                        medir(aplicacion, ruta, cookie, 1, 1)
+                        resultados[modo] = medir(
+                            aplicacion, ruta, cookie, options['peticiones'], options['concurrencia']
+                        )
+                    self.reportar(nombre, resultados)
+        finally:
+            cliente.logout()
+
+    def reportar(self, nombre, resultados):
+        partes = []
+        for modo, (por_segundo, latencias, errores) in resultados.items():
+            cuantiles = statistics.quantiles(latencias, n=20)
+            partes.append(
+                f"{modo} {por_segundo:>7.1f} req/s p50 {statistics.median(latencias) * 1000:>6.1f} ms "
+                f"p95 {cuantiles[-1] * 1000:>6.1f} ms" + (f" ({errores} errores)" if errores else "")
+            )
+        relacion = resultados['ASGI'][0] / resultados['WSGI'][0]
+        self.stdout.write(f"{nombre:<12} " + "   ".join(partes) + f"   ASGI/WSGI x{relacion:.2f}")
+
+    @staticmethod
+    def _resumen(resultados, transcurrido):
+        latencias = [latencia for _, latencia in resultados]
+        errores = sum(1 for estado, _ in resultados if estado != 200)
+        return len(resultados) / transcurrido, latencias, errores
+
+    def medir_wsgi(self, aplicacion, ruta, cookie, peticiones, concurrencia):
+        def peticion(_):
+            inicio = time.perf_counter()
+            estado = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': ruta, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            respuesta = aplicacion(environ, lambda status, headers, exc_info=None: estado.append(status))
+            try:
+                b''.join(respuesta)
+            finally:
+                respuesta.close()
+            return int(estado[0].split()[0]), time.perf_counter() - inicio
+
+        with ThreadPoolExecutor(concurrencia) as hilos:
+            inicio = time.perf_counter()
+            resultados = list(hilos.map(peticion, range(peticiones)))
+            return self._resumen(resultados, time.perf_counter() - inicio)
+
+    def medir_asgi(self, aplicacion, ruta, cookie, peticiones, concurrencia):
+        async def peticion(semaforo):
+            async with semaforo:
+                inicio = time.perf_counter()
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                    'method': 'GET', 'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(),
+                    'query_string': b'', 'root_path': '',
+                    'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+                    'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+                }
+                mensajes = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+                estado = []
+
+                async def recibir():
+                    if mensajes:
+                        return mensajes.pop()
+                    # El cliente nunca se desconecta; Django cancela esta espera al responder
+                    await asyncio.Event().wait()
+
+                async def enviar(mensaje):
+                    if mensaje['type'] == 'http.response.start':
+                        estado.append(mensaje['status'])
+
+                await aplicacion(scope, recibir, enviar)
+                return estado[0], time.perf_counter() - inicio
+
+        async def correr():
+            semaforo = asyncio.Semaphore(concurrencia)
+            inicio = time.perf_counter()
+            resultados = await asyncio.gather(*(peticion(semaforo) for _ in range(peticiones)))
+            return self._resumen(resultados, time.perf_counter() - inicio)
+
+        return asyncio.run(correr())
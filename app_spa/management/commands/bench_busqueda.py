@@ -0,0 +1,63 @@
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test.utils import setup_databases, teardown_databases
+
+from app_spa import busqueda
+from app_spa.models import Productos
+
+CONSULTAS = ['lavanda', 'crema', 'aceite euca', 'sales de bano', 'mascarilla rosa', 'te verde', 'vela 123']
+
+
+class Command(BaseCommand):
+    help = "Compara la búsqueda FTS5 contra icontains sobre un catálogo sintético de productos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=100000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--limite', type=int, default=20, help='Resultados por página')
+
+    def handle(self, *args, **options):
+        bases = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write(f"Generando {options['productos']} productos...")
+            call_command(
+                'seed_spa', productos=options['productos'], servicios=20, proveedores=50,
+                empleados=0, clientes=0, pedidos=0, stdout=StringIO(),
+            )
+            self.comparar(options['repeticiones'], options['limite'])
+        finally:
+            teardown_databases(bases, verbosity=0)
+
+    def medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), resultado
+
+    def comparar(self, repeticiones, limite):
+        self.stdout.write(
+            f"{'consulta':<18} {'icontains ms':>12} {'fts ms':>8} {'icontains #':>11} {'fts #':>8} {'conteo ms':>10} {'fts conteo ms':>14}"
+        )
+        for texto in CONSULTAS:
+            filtro = Productos.objects.filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto))
+            ms_like, pagina_like = self.medir(lambda: list(filtro[:limite]), repeticiones)
+            ms_fts, pagina_fts = self.medir(
+                lambda: busqueda.buscar(texto, 'producto', Productos.objects.all(), limite), repeticiones
+            )
+            ms_conteo_like, total_like = self.medir(filtro.count, repeticiones)
+            ms_conteo_fts, ids = self.medir(lambda: busqueda.buscar_ids(texto, 'producto'), repeticiones)
+            self.stdout.write(
+                f"{texto:<18} {ms_like:>12.2f} {ms_fts:>8.2f} {total_like:>11} {len(ids):>8} "
+                f"{ms_conteo_like:>10.2f} {ms_conteo_fts:>14.2f}"
+            )
+        self.stdout.write(
+            "icontains no ignora acentos ni ordena por relevancia; "
+            "FTS5 ordena por bm25 y acepta prefijos"
+        )
@@ -0,0 +1,58 @@
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from app_spa import cache_catalogo
+
+RUTAS = ['inicio', 'tienda', 'servicios_lista', 'productos_lista']
+
+
+class Command(BaseCommand):
+    help = "Peticiones por segundo de las páginas del catálogo con y sin la caché versionada"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por ruta y modo')
+        parser.add_argument('--productos', type=int, default=2000)
+        parser.add_argument('--servicios', type=int, default=200)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        bases = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command(
+                'seed_spa', productos=options['productos'], servicios=options['servicios'],
+                empleados=options['servicios'] * 2, clientes=200, pedidos=0, stdout=StringIO(),
+            )
+            staff = User.objects.create(username='bench_cache_staff', is_staff=True)
+            for rol, usuario in (('anónimo', None), ('staff', staff)):
+                for nombre in RUTAS:
+                    sin_cache = self.medir(nombre, usuario, options['peticiones'], activo=False)
+                    con_cache = self.medir(nombre, usuario, options['peticiones'], activo=True)
+                    self.stdout.write(
+                        f"{rol:<8} {nombre:<16} sin caché {sin_cache:>8.1f} req/s   "
+                        f"con caché {con_cache:>8.1f} req/s   x{con_cache / sin_cache:.1f}"
+                    )
+            self.stdout.write(f"Contadores: {cache_catalogo.estadisticas()}")
+        finally:
+            teardown_databases(bases, verbosity=0)
+            teardown_test_environment()
+
+    def medir(self, nombre, usuario, peticiones, activo):
+        cliente = Client()
+        if usuario is not None:
+            cliente.force_login(usuario)
+        url = reverse(nombre)
+        with override_settings(CACHE_CATALOGO=activo):
+            cliente.get(url)
+            inicio = time.perf_counter()
+            for _ in range(peticiones):
+                cliente.get(url)
+            return peticiones / (time.perf_counter() - inicio)
@@ -0,0 +1,118 @@
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from app_spa.models import Carrito, CarritoItem, CheckoutError, Productos, Proveedores
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de concurrencia: muchos checkouts simultáneos compitiendo por las "
+        "últimas unidades de un producto. Reporta throughput y ventas de más (debe ser 0). "
+        "Corre en una base de datos de prueba que se crea y se destruye: la configurada no se toca"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compradores', type=int, default=50, help='Checkouts simultáneos')
+        parser.add_argument('--stock', type=int, default=10, help='Unidades disponibles del producto')
+        parser.add_argument('--cantidad', type=int, default=1, help='Unidades por carrito')
+        parser.add_argument(
+            '--espera', type=float, default=30,
+            help='Segundos que un comprador espera a los demás en la salida antes de abandonar',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Borrar sin preguntar la base de prueba que haya dejado una ejecución anterior',
+        )
+
+    def handle(self, *args, **options):
+        # Los hilos necesitan datos confirmados, así que no basta una transacción que se revierte.
+        # SQLite en memoria bloquearía tablas enteras en lugar de esperar como un archivo
+        if connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+            nombre = Path(connection.settings_dict['NAME'])
+            connection.settings_dict['TEST']['NAME'] = str(nombre.with_name(f'{nombre.stem}_bench_checkout.sqlite3'))
+        setup_test_environment()
+        bases = setup_databases(verbosity=0, interactive=options['interactive'])
+        try:
+            self.medir(options)
+        finally:
+            teardown_databases(bases, verbosity=0)
+            teardown_test_environment()
+
+    def medir(self, options):
+        compradores = options['compradores']
+        cantidad = options['cantidad']
+
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Benchmark checkout', contacto='-', telefono='-',
+            email='bench@example.com', direccion='-', especialidad='-',
+        )
+        producto = Productos.objects.create(
+            nombre='Producto benchmark', precio=Decimal('100.00'), stock=options['stock'],
+            tipo_producto='otros', proveedor=proveedor,
+        )
+        usuarios = User.objects.bulk_create([User(username=f'bench_checkout_{i}') for i in range(compradores)])
+        carritos = Carrito.objects.bulk_create([Carrito(usuario=u) for u in usuarios])
+        CarritoItem.objects.bulk_create([
+            CarritoItem(carrito=c, producto=producto, tipo='producto', cantidad=cantidad)
+            for c in carritos
+        ])
+
+        resultados = {'ok': 0, 'sin_stock': 0, 'bloqueos': 0, 'abandonos': 0}
+        candado = threading.Lock()
+        # Con timeout: si un hilo no llega a la salida, los demás no esperan para siempre
+        salida = threading.Barrier(compradores, timeout=options['espera'])
+
+        def comprar(carrito_id):
+            try:
+                carrito = Carrito.objects.get(pk=carrito_id)
+                try:
+                    salida.wait()
+                    carrito.generar_pedido()
+                    clave = 'ok'
+                except threading.BrokenBarrierError:
+                    clave = 'abandonos'
+                except CheckoutError:
+                    clave = 'sin_stock'
+                except OperationalError:
+                    clave = 'bloqueos'
+                with candado:
+                    resultados[clave] += 1
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=comprar, args=(c.pk,)) for c in carritos]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        producto.refresh_from_db()
+        vendidas = resultados['ok'] * cantidad
+        de_mas = max(0, vendidas - options['stock']) + max(0, -producto.stock)
+
+        self.stdout.write(f"Checkouts: {compradores} en {duracion:.3f}s ({compradores / duracion:.1f}/s)")
+        self.stdout.write(
+            f"Exitosos: {resultados['ok']} - Sin stock: {resultados['sin_stock']} - "
+            f"Bloqueos de BD: {resultados['bloqueos']}"
+        )
+        if resultados['abandonos']:
+            self.stdout.write(self.style.WARNING(
+                f"Abandonos: {resultados['abandonos']} compradores no arrancaron juntos en {options['espera']}s"
+            ))
+        self.stdout.write(f"Stock final: {producto.stock}")
+
+        if de_mas:
+            self.stdout.write(self.style.ERROR(f"Ventas de más: {de_mas}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Ventas de más: 0"))
@@ -0,0 +1,165 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from itertools import accumulate, chain
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from app_spa import recomendaciones
+from app_spa.carrito_temporal import clave_item
+from app_spa.models import Pedido, PedidoItem, Productos, Proveedores, Servicios
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrucción de las recomendaciones sobre un historial sintético grande (5M items "
+        "por defecto): lectura, conteo con NumPy/SciPy y con Python, escritura, actualización "
+        "incremental y consulta. Todo corre en una transacción que se revierte"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5_000_000, help='Items de pedido a generar')
+        parser.add_argument('--productos', type=int, default=500)
+        parser.add_argument('--servicios', type=int, default=50)
+        parser.add_argument('--max-items', type=int, default=6, help='Máximo de items por pedido')
+        parser.add_argument('--lote', type=int, default=20000, help='Pedidos por bulk_create')
+        parser.add_argument('--semilla', type=int, default=11)
+        parser.add_argument(
+            '--sin-python',
+            action='store_true',
+            help='No medir el conteo en Python puro (lento con millones de items)',
+        )
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        with transaction.atomic():
+            catalogo = self.poblar(azar, options)
+            self.medir(azar, catalogo, options)
+            transaction.set_rollback(True)
+
+    def poblar(self, azar, options):
+        inicio = time.perf_counter()
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Benchmark recomendaciones', contacto='-', telefono='-',
+            email='bench@example.com', direccion='-', especialidad='-',
+        )
+        productos = list(Productos.objects.bulk_create([
+            Productos(nombre=f'Producto {i}', precio=Decimal('100.00'), stock=10, tipo_producto='otros', proveedor=proveedor)
+            for i in range(options['productos'])
+        ]))
+        servicios = list(Servicios.objects.bulk_create([
+            Servicios(nombre=f'Servicio {i}', precio=Decimal('300.00'), duracion=60, tipo_servicio='benchmark')
+            for i in range(options['servicios'])
+        ]))
+        usuario = User.objects.create(username='bench_recomendaciones')
+
+        # Popularidad tipo Zipf y paquetes: cada servicio suele llevarse con unos productos
+        catalogo = [('producto', p.pk) for p in productos] + [('servicio', s.pk) for s in servicios]
+        azar.shuffle(catalogo)
+        acumulados = list(accumulate(1 / (i + 1) for i in range(len(catalogo))))
+        paquetes = {s.pk: azar.sample([p.pk for p in productos], min(3, len(productos))) for s in servicios}
+
+        total, pedidos_creados = 0, 0
+        while total < options['items']:
+            canastas = []
+            for _ in range(options['lote']):
+                canasta = set(azar.choices(catalogo, cum_weights=acumulados, k=azar.randint(1, options['max_items'])))
+                if servicios and azar.random() < 0.3:
+                    servicio = azar.choice(servicios).pk
+                    canasta.add(('servicio', servicio))
+                    canasta.update(('producto', pk) for pk in paquetes[servicio] if azar.random() < 0.6)
+                canastas.append(canasta)
+                total += len(canasta)
+                if total >= options['items']:
+                    break
+            pedidos = Pedido.objects.bulk_create([Pedido(usuario=usuario, total=0) for _ in canastas])
+            PedidoItem.objects.bulk_create([
+                PedidoItem(
+                    pedido_id=pedido.pk, cantidad=1, precio=0,
+                    producto_id=pk if tipo == 'producto' else None,
+                    servicio_id=pk if tipo == 'servicio' else None,
+                )
+                for pedido, canasta in zip(pedidos, canastas)
+                for tipo, pk in canasta
+            ], batch_size=10000)
+            pedidos_creados += len(pedidos)
+        self.stdout.write(
+            f"Historial: {pedidos_creados} pedidos, {total} items, {len(catalogo)} productos y servicios "
+            f"({time.perf_counter() - inicio:.1f}s)"
+        )
+        return catalogo
+
+    def medir(self, azar, catalogo, options):
+        items = PedidoItem.objects.all()
+        inicio = time.perf_counter()
+        if recomendaciones.numpy is not None:
+            datos = recomendaciones.numpy.fromiter(
+                chain.from_iterable(recomendaciones.filas_de(items)), dtype=recomendaciones.numpy.int64,
+            ).reshape(-1, 3)
+        else:
+            datos = list(recomendaciones.filas_de(items))
+        self.stdout.write(f"lectura:           {time.perf_counter() - inicio:7.2f} s   ({len(datos)} filas)")
+
+        matrices = []
+        if recomendaciones.sparse is not None:
+            inicio = time.perf_counter()
+            matrices.append(recomendaciones.contar_scipy(datos))
+            self.stdout.write(f"conteo SciPy:      {time.perf_counter() - inicio:7.2f} s")
+        else:
+            self.stdout.write("conteo SciPy:      (NumPy/SciPy no instalados)")
+        if not options['sin_python']:
+            filas = datos.tolist() if recomendaciones.numpy is not None else datos
+            inicio = time.perf_counter()
+            matrices.append(recomendaciones.contar_python(filas))
+            self.stdout.write(f"conteo Python:     {time.perf_counter() - inicio:7.2f} s")
+            del filas
+        del datos
+        if len(matrices) == 2:
+            if matrices[0] == matrices[1]:
+                self.stdout.write(self.style.SUCCESS("Misma matriz con ambos conteos"))
+            else:
+                self.stdout.write(self.style.ERROR("Los conteos difieren"))
+        del matrices
+
+        inicio = time.perf_counter()
+        pedidos, pares, guardadas = recomendaciones.reconstruir()
+        self.stdout.write(
+            f"reconstruir:       {time.perf_counter() - inicio:7.2f} s   "
+            f"({pedidos} pedidos, {pares} pares, {guardadas} recomendaciones)"
+        )
+
+        # Pedidos nuevos como los de un checkout
+        usuario = User.objects.get(username='bench_recomendaciones')
+        nuevos = Pedido.objects.bulk_create([Pedido(usuario=usuario, total=0) for _ in range(100)])
+        PedidoItem.objects.bulk_create([
+            PedidoItem(
+                pedido_id=pedido.pk, cantidad=1, precio=0,
+                producto_id=pk if tipo == 'producto' else None,
+                servicio_id=pk if tipo == 'servicio' else None,
+            )
+            for pedido in nuevos
+            for tipo, pk in set(azar.sample(catalogo, min(3, len(catalogo))))
+        ])
+        inicio = time.perf_counter()
+        sumados = recomendaciones.actualizar()
+        self.stdout.write(
+            f"actualizar:        {(time.perf_counter() - inicio) * 1000:7.2f} ms  ({sumados} pedidos nuevos)"
+        )
+
+        # Con DEBUG el registro de consultas ya está lleno y CaptureQueriesContext no contaría nada
+        reset_queries()
+        tiempos, consultas = [], 0
+        for tipo, pk in azar.sample(catalogo, min(200, len(catalogo))):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                recomendaciones.para([clave_item(tipo, pk)])
+                tiempos.append(time.perf_counter() - inicio)
+            consultas = max(consultas, len(capturadas))
+        self.stdout.write(
+            f"para():            mediana {statistics.median(tiempos) * 1000:.2f} ms   "
+            f"máx {max(tiempos) * 1000:.2f} ms   ({consultas} consulta(s))"
+        )
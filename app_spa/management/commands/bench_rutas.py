@@ -0,0 +1,255 @@
+import json
+import statistics
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import base as template_base
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, get_resolver, reverse
+
+from app_spa.carrito_temporal import clave_item
+from app_spa.models import Carrito, Clientes, Empleados, Productos, Proveedores, Servicios
+
+# Modelo del que sale el <id> de cada ruta de admin-spa, según el prefijo del nombre
+MODELOS_POR_PREFIJO = {
+    'servicio_': Servicios,
+    'empleado_': Empleados,
+    'cliente_': Clientes,
+    'proveedor_': Proveedores,
+    'producto_': Productos,
+}
+# Rutas que cierran la sesión, consumen el carrito o borran el objeto de prueba: se miden al final
+RUTAS_AL_FINAL = {'logout', 'checkout', 'eliminar_carrito', 'eliminar_pedido'}
+# Rutas que solo aceptan POST (con GET responden 405) y los datos del formulario que envían
+RUTAS_POST = {
+    'agregar_carrito': {},
+    'agregar_servicio_carrito': {},
+    'actualizar_carrito': {'cantidad': 1},
+    'eliminar_carrito': {},
+    'eliminar_pedido': {},
+}
+
+
+class MedidorTemplates:
+    """Acumula el tiempo de render de la plantilla más externa (los include no se suman dos veces)"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.profundidad = 0
+        self.original = template_base.Template.render
+
+    def __enter__(self):
+        medidor = self
+
+        def render(template, context):
+            medidor.profundidad += 1
+            inicio = time.perf_counter()
+            try:
+                return medidor.original(template, context)
+            finally:
+                medidor.profundidad -= 1
+                if medidor.profundidad == 0:
+                    medidor.total += time.perf_counter() - inicio
+
+        template_base.Template.render = render
+        return self
+
+    def __exit__(self, *exc):
+        template_base.Template.render = self.original
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide consultas, tiempo SQL, render de plantillas y tiempo total de cada ruta de "
+        "spa_completo.urls (anónimo, cliente y staff) a dos tamaños de datos; detecta N+1 "
+        "y regresiones contra un baseline JSON"
+    )
+
+    def add_arguments(self, parser):
+        # La escala base cabe en una página de los listados (20 filas la más corta): si ya las
+        # llenara, las dos escalas mostrarían las mismas filas y un N+1 por fila no se notaría
+        parser.add_argument('--clientes', type=int, default=10, help='Clientes en la escala base')
+        parser.add_argument('--pedidos', type=int, default=15, help='Pedidos en la escala base')
+        parser.add_argument('--productos', type=int, default=15, help='Productos en la escala base')
+        parser.add_argument('--servicios', type=int, default=5, help='Servicios en la escala base')
+        parser.add_argument('--factor', type=int, default=10, help='Multiplicador de la segunda escala')
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--salida', default='bench_rutas.json', help='Archivo JSON con los resultados')
+        parser.add_argument('--baseline', help='Baseline JSON contra el cual comparar')
+        parser.add_argument(
+            '--umbral', type=float, default=0.25,
+            help='Regresión de latencia tolerada respecto al baseline (0.25 = 25%%)',
+        )
+        parser.add_argument('--actualizar-baseline', action='store_true')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        bases = setup_databases(verbosity=0, interactive=False)
+        try:
+            resultados = {}
+            for nombre, factor in (('base', 1), ('grande', options['factor'])):
+                self.sembrar(options, factor)
+                self.stdout.write(f"Midiendo escala '{nombre}' (x{factor})...")
+                resultados[nombre] = self.medir(options['repeticiones'])
+        finally:
+            teardown_databases(bases, verbosity=0)
+            teardown_test_environment()
+
+        self.reportar(resultados['grande'])
+        Path(options['salida']).write_text(json.dumps(resultados, indent=2, sort_keys=True))
+        self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        fallas = self.detectar_n_mas_1(resultados['base'], resultados['grande'])
+        if options['baseline']:
+            ruta_baseline = Path(options['baseline'])
+            if ruta_baseline.exists() and not options['actualizar_baseline']:
+                baseline = json.loads(ruta_baseline.read_text())
+                fallas += self.comparar(baseline['grande'], resultados['grande'], options['umbral'])
+            else:
+                ruta_baseline.write_text(json.dumps(resultados, indent=2, sort_keys=True))
+                self.stdout.write(f"Baseline guardado en {ruta_baseline}")
+
+        if fallas:
+            for falla in fallas:
+                self.stdout.write(self.style.ERROR(falla))
+            raise CommandError(f"{len(fallas)} regresión(es) detectada(s)")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones"))
+
+    def sembrar(self, options, factor):
+        call_command(
+            'seed_spa',
+            clientes=options['clientes'] * factor,
+            pedidos=options['pedidos'] * factor,
+            productos=options['productos'] * factor,
+            servicios=options['servicios'] * factor,
+            proveedores=max(1, options['productos'] * factor // 20),
+            empleados=options['servicios'] * factor * 2,
+            semilla=factor,
+            stdout=StringIO(),
+        )
+        # Los carritos y páginas cacheados en la escala anterior no deben llegar a la siguiente
+        for alias in caches:
+            caches[alias].clear()
+
+    def preparar_usuarios(self):
+        staff, _ = User.objects.get_or_create(
+            username='bench_staff', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        cliente = Clientes.objects.filter(usuario__pedidos__isnull=False).select_related('usuario').first()
+        usuario = cliente.usuario
+        carrito, _ = Carrito.objects.get_or_create(usuario=usuario, activo=True)
+        if not carrito.items.exists():
+            carrito.agregar_item(producto=Productos.objects.filter(stock__gt=0).first())
+            carrito.agregar_item(servicio=Servicios.objects.first())
+        return {'anonimo': None, 'cliente': usuario, 'staff': staff}
+
+    def rutas(self, usuario):
+        """(nombre, url) de cada ruta del proyecto, más los changelists del admin de Django"""
+        argumentos = {
+            'producto_id': Productos.objects.values_list('pk', flat=True).first(),
+            'servicio_id': Servicios.objects.values_list('pk', flat=True).first(),
+        }
+        if usuario is not None:
+            carrito = Carrito.objects.filter(usuario=usuario, activo=True).first()
+            argumentos['item_id'] = carrito.items.values_list('pk', flat=True).first() if carrito else None
+            # Las rutas de actualizar y eliminar línea reciben la clave del carrito temporal (p-12)
+            producto_id = None
+            if carrito:
+                producto_id = carrito.items.filter(tipo='producto').values_list('producto_id', flat=True).first()
+            argumentos['clave'] = clave_item('producto', producto_id) if producto_id else None
+            argumentos['pedido_id'] = usuario.pedidos.values_list('pk', flat=True).first()
+
+        rutas = []
+        for patron in get_resolver().url_patterns:
+            if not isinstance(patron, URLPattern) or not patron.name:
+                continue
+            kwargs = {}
+            for parametro in patron.pattern.converters:
+                if parametro == 'id':
+                    modelo = next(
+                        (m for prefijo, m in MODELOS_POR_PREFIJO.items() if patron.name.startswith(prefijo)),
+                        None,
+                    )
+                    kwargs['id'] = modelo.objects.values_list('pk', flat=True).first() if modelo else None
+                else:
+                    kwargs[parametro] = argumentos.get(parametro)
+            if None in kwargs.values():
+                continue
+            rutas.append((patron.name, reverse(patron.name, kwargs=kwargs)))
+
+        for modelo in admin.site._registry:
+            nombre = f"admin:{modelo._meta.app_label}_{modelo._meta.model_name}_changelist"
+            rutas.append((nombre, reverse(nombre)))
+        rutas.sort(key=lambda ruta: ruta[0] in RUTAS_AL_FINAL)
+        return rutas
+
+    def medir(self, repeticiones):
+        resultados = {}
+        for rol, usuario in self.preparar_usuarios().items():
+            cliente_http = Client(raise_request_exception=False)
+            for nombre, url in self.rutas(usuario):
+                datos = RUTAS_POST.get(nombre)
+                muestras = []
+                for _ in range(repeticiones + 1):
+                    if usuario is not None:
+                        cliente_http.force_login(usuario)
+                    with CaptureQueriesContext(connection) as consultas, MedidorTemplates() as plantillas:
+                        inicio = time.perf_counter()
+                        respuesta = cliente_http.get(url) if datos is None else cliente_http.post(url, datos)
+                        total = time.perf_counter() - inicio
+                    muestras.append({
+                        'consultas': len(consultas),
+                        'sql_ms': sum(float(q['time']) for q in consultas.captured_queries) * 1000,
+                        'plantillas_ms': plantillas.total * 1000,
+                        'total_ms': total * 1000,
+                        'status': respuesta.status_code,
+                    })
+                # La primera pasada solo calienta cachés
+                muestras = muestras[1:]
+                resultados[f"{rol} {nombre}"] = {
+                    'url': url,
+                    'status': muestras[-1]['status'],
+                    'consultas': muestras[-1]['consultas'],
+                    'sql_ms': statistics.median(m['sql_ms'] for m in muestras),
+                    'plantillas_ms': statistics.median(m['plantillas_ms'] for m in muestras),
+                    'total_ms': statistics.median(m['total_ms'] for m in muestras),
+                }
+        return resultados
+
+    def reportar(self, resultados):
+        self.stdout.write(f"{'ruta':<60} {'status':>6} {'queries':>7} {'sql ms':>8} {'tpl ms':>8} {'total ms':>9}")
+        for ruta, r in sorted(resultados.items()):
+            self.stdout.write(
+                f"{ruta:<60} {r['status']:>6} {r['consultas']:>7} {r['sql_ms']:>8.1f} "
+                f"{r['plantillas_ms']:>8.1f} {r['total_ms']:>9.1f}"
+            )
+
+    def detectar_n_mas_1(self, base, grande):
+        return [
+            f"N+1: {ruta} pasa de {base[ruta]['consultas']} a {r['consultas']} consultas al crecer los datos"
+            for ruta, r in sorted(grande.items())
+            if ruta in base and r['consultas'] > base[ruta]['consultas']
+        ]
+
+    def comparar(self, baseline, actual, umbral):
+        fallas = []
+        for ruta, r in sorted(actual.items()):
+            previo = baseline.get(ruta)
+            if previo is None:
+                continue
+            if r['consultas'] > previo['consultas']:
+                fallas.append(f"Consultas: {ruta} {previo['consultas']} -> {r['consultas']}")
+            if r['total_ms'] > previo['total_ms'] * (1 + umbral):
+                fallas.append(f"Latencia: {ruta} {previo['total_ms']:.1f}ms -> {r['total_ms']:.1f}ms")
+        return fallas
@@ -0,0 +1,162 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.db.models import Sum
+from django.test.utils import override_settings
+
+from app_spa import basedatos
+from app_spa.models import Carrito, CheckoutError, Productos, VentaDiaria
+
+PERFILES = ('defecto', 'produccion', 'produccion+lectura')
+
+
+class Command(BaseCommand):
+    help = (
+        "Contención en SQLite: lectores de catálogo/reportes y escritores que hacen checkouts "
+        "al mismo tiempo, con la configuración por defecto y con el perfil de producción "
+        "(app_spa/basedatos.py). Trabaja sobre copias de la base configurada"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lectores', type=int, default=8, help='Hilos que leen')
+        parser.add_argument('--escritores', type=int, default=4, help='Hilos que hacen checkouts')
+        parser.add_argument('--segundos', type=float, default=5.0, help='Duración de cada perfil')
+        parser.add_argument('--perfiles', nargs='+', choices=PERFILES, default=list(PERFILES))
+
+    def handle(self, *args, **options):
+        original = connections.settings[basedatos.ESCRITURA]
+        if original['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("La base configurada no es SQLite")
+        if not Productos.objects.filter(stock__gt=0).exists():
+            raise CommandError("No hay productos con stock; ejecuta seed_spa primero")
+
+        self.stdout.write(
+            f"{options['lectores']} lectores, {options['escritores']} escritores, "
+            f"{options['segundos']:.0f} s por perfil"
+        )
+        with tempfile.TemporaryDirectory() as directorio:
+            for perfil in options['perfiles']:
+                copia = Path(directorio) / f"{perfil}.sqlite3"
+                self.copiar(original['NAME'], copia)
+                resultados = self.con_perfil(perfil, copia, options)
+                self.reportar(perfil, resultados, options['segundos'])
+
+    @staticmethod
+    def copiar(origen, destino):
+        """Copia consistente de la base, siempre en modo rollback journal como punto de partida"""
+        with sqlite3.connect(origen) as fuente, sqlite3.connect(destino) as copia:
+            fuente.backup(copia)
+            copia.execute('PRAGMA journal_mode=DELETE')
+
+    @staticmethod
+    def _configurar(bases):
+        """Cambiar las conexiones de este proceso; los hilos nuevos abren las suyas con esto"""
+        connections.close_all()
+        for alias in list(connections.settings):
+            try:
+                del connections[alias]
+            except AttributeError:
+                pass
+        connections.settings.clear()
+        connections.settings.update(connections.configure_settings(bases))
+
+    def con_perfil(self, perfil, copia, options):
+        original = {alias: dict(config) for alias, config in connections.settings.items()}
+        if perfil == 'defecto':
+            bases = {basedatos.ESCRITURA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': copia}}
+        else:
+            bases = basedatos.perfil_produccion(copia, lectura=perfil == 'produccion+lectura')
+        routers = ['app_spa.basedatos.EnrutadorLectura'] if basedatos.LECTURA in bases else []
+        self._configurar(bases)
+        try:
+            with override_settings(DATABASE_ROUTERS=routers):
+                return self.correr(options)
+        finally:
+            self._configurar(original)
+
+    def correr(self, options):
+        producto = Productos.objects.filter(stock__gt=0).order_by('pk').first()
+        Productos.objects.filter(pk=producto.pk).update(stock=10 ** 9)
+        User.objects.bulk_create([
+            User(username=f'bench_sqlite_{i}') for i in range(options['escritores'])
+        ], ignore_conflicts=True)
+        usuarios = list(User.objects.filter(username__startswith='bench_sqlite_').values_list('pk', flat=True))
+        connections.close_all()
+
+        resultados = {'lectura': [], 'escritura': [], 'bloqueos': 0, 'sin_stock': 0}
+        candado = threading.Lock()
+        fin = threading.Event()
+        salida = threading.Barrier(options['lectores'] + options['escritores'] + 1)
+
+        def leer():
+            list(Productos.objects.select_related('proveedor').filter(stock__gt=0).order_by('nombre')[:50])
+            VentaDiaria.objects.aggregate(total=Sum('total'))
+
+        def escribir(usuario_id):
+            # agregar_item lee y luego escribe en la misma transacción, como el carrito real
+            carrito, _ = Carrito.objects.get_or_create(usuario_id=usuario_id, activo=True)
+            carrito.agregar_item(producto=producto)
+            carrito.generar_pedido()
+
+        def trabajar(tipo, operacion, *argumentos):
+            latencias, bloqueos, sin_stock = [], 0, 0
+            try:
+                salida.wait()
+                while not fin.is_set():
+                    # Como una petición: request_started/finished llaman a close_old_connections
+                    close_old_connections()
+                    inicio = time.perf_counter()
+                    try:
+                        operacion(*argumentos)
+                        latencias.append(time.perf_counter() - inicio)
+                    except OperationalError:
+                        bloqueos += 1
+                    except CheckoutError:
+                        sin_stock += 1
+                    finally:
+                        close_old_connections()
+            finally:
+                connections.close_all()
+                with candado:
+                    resultados[tipo].extend(latencias)
+                    resultados['bloqueos'] += bloqueos
+                    resultados['sin_stock'] += sin_stock
+
+        hilos = [threading.Thread(target=trabajar, args=('lectura', leer)) for _ in range(options['lectores'])]
+        hilos += [
+            threading.Thread(target=trabajar, args=('escritura', escribir, usuarios[i % len(usuarios)]))
+            for i in range(options['escritores'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        salida.wait()
+        time.sleep(options['segundos'])
+        fin.set()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def reportar(self, perfil, resultados, segundos):
+        partes = []
+        for tipo in ('lectura', 'escritura'):
+            latencias = resultados[tipo]
+            if len(latencias) < 2:
+                partes.append(f"{tipo} {len(latencias) / segundos:>7.1f} op/s")
+                continue
+            cuantiles = statistics.quantiles(latencias, n=20)
+            partes.append(
+                f"{tipo} {len(latencias) / segundos:>7.1f} op/s p50 {statistics.median(latencias) * 1000:>6.1f} ms "
+                f"p95 {cuantiles[-1] * 1000:>7.1f} ms"
+            )
+        errores = f"bloqueos {resultados['bloqueos']}"
+        if resultados['sin_stock']:
+            errores += f", checkouts fallidos {resultados['sin_stock']}"
+        linea = f"{perfil:<19} " + "   ".join(partes) + f"   {errores}"
+        self.stdout.write(self.style.ERROR(linea) if resultados['bloqueos'] else linea)
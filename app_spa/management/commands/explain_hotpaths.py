@@ -0,0 +1,97 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from app_spa import paginacion
+from app_spa.models import Carrito, CarritoItem, Clientes, Pedido, PedidoItem, Productos
+
+
+def rutas_calientes():
+    """Consultas ORM de las rutas más frecuentes; los valores son de muestra, el plan no depende de ellos"""
+    hace_un_mes = timezone.now() - timedelta(days=30)
+    return [
+        ('carrito activo (context processor)',
+         Carrito.objects.filter(usuario_id=1, activo=True).values_list('cantidad_items', flat=True)),
+        ('carrito activo (vistas de carrito)',
+         Carrito.objects.filter(usuario_id=1, activo=True)),
+        ('item de carrito por producto',
+         CarritoItem.objects.filter(carrito_id=1, producto_id=1, tipo='producto')),
+        ('item de carrito por servicio',
+         CarritoItem.objects.filter(carrito_id=1, servicio_id=1, tipo='servicio')),
+        ('mis pedidos',
+         Pedido.objects.filter(usuario_id=1).order_by('-fecha_pedido')),
+        ('items de un pedido',
+         PedidoItem.objects.filter(pedido_id=1)),
+        ('admin pedidos por estado',
+         Pedido.objects.filter(estado='pendiente').order_by('-fecha_pedido')),
+        ('pedidos por rango de fechas',
+         Pedido.objects.filter(fecha_pedido__gte=hace_un_mes)),
+        ('admin productos por tipo',
+         Productos.objects.filter(tipo_producto='cosmetico')),
+        ('admin clientes por fecha de registro',
+         Clientes.objects.filter(fecha_registro__gte=hace_un_mes.date())),
+        ('cliente de un usuario',
+         Clientes.objects.filter(usuario_id=1)),
+        ('mis pedidos (página por cursor)',
+         pagina_cursor(paginacion.PEDIDOS, 'recientes', Pedido.objects.filter(usuario_id=1), [hace_un_mes, 1])),
+        ('admin clientes (página por cursor)',
+         pagina_cursor(paginacion.CLIENTES, 'recientes', Clientes.objects.all(), [hace_un_mes.date(), 1])),
+    ]
+
+
+def pagina_cursor(listado, orden, queryset, valores):
+    """La consulta que arma Listado.paginar() para una página posterior a `valores`"""
+    llave = [listado._nombre_pk(campo) for campo in listado.ordenes[orden][1]]
+    return queryset.filter(listado._despues_de(llave, valores)).order_by(*llave)[:listado.por_pagina + 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN QUERY PLAN sobre las consultas calientes y falla si alguna "
+        "recorre una tabla completa u ordena sin índice"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--advertir',
+            action='store_true',
+            help='Reportar los hallazgos sin terminar con error',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("explain_hotpaths interpreta planes de SQLite (EXPLAIN QUERY PLAN)")
+
+        hallazgos = []
+        for nombre, queryset in rutas_calientes():
+            plan = queryset.explain()
+            pasos = [self.detalle(linea) for linea in plan.splitlines()]
+            problemas = [
+                paso for paso in pasos
+                if (paso.startswith('SCAN') and 'USING' not in paso) or 'USE TEMP B-TREE' in paso
+            ]
+            estilo = self.style.ERROR if problemas else self.style.SUCCESS
+            self.stdout.write(estilo(f"{'FALLA' if problemas else 'OK':<6}{nombre}"))
+            for paso in pasos:
+                self.stdout.write(f"      {paso}")
+            hallazgos += [f"{nombre}: {problema}" for problema in problemas]
+
+        if hallazgos:
+            mensaje = f"{len(hallazgos)} consulta(s) caliente(s) sin índice adecuado"
+            if options['advertir']:
+                self.stdout.write(self.style.WARNING(mensaje))
+            else:
+                raise CommandError(mensaje)
+        else:
+            self.stdout.write(self.style.SUCCESS("Todas las consultas calientes usan índices"))
+
+    @staticmethod
+    def detalle(linea):
+        """
+        Quitar las columnas id/parent/notused que Django antepone a cada paso del plan.
+        "SCAN tabla" sin índice es un recorrido completo; "SCAN ... USING INDEX" solo recorre el índice.
+        """
+        return re.sub(r'^\s*(\d+\s+){3}', '', linea).strip()
@@ -0,0 +1,58 @@
+import resource
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app_spa import exportacion
+
+
+def fecha(texto):
+    valor = parse_date(texto)
+    if valor is None:
+        raise ValueError(texto)
+    return valor
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta pedidos, items de pedido o clientes en CSV o NDJSON, en streaming y con "
+        "memoria constante (opcionalmente comprimido con gzip)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('conjunto', choices=list(exportacion.COLUMNAS))
+        parser.add_argument('--formato', choices=list(exportacion.FORMATOS), default='csv')
+        parser.add_argument('--desde', type=fecha, help='Fecha inicial inclusiva (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=fecha, help='Fecha final inclusiva (AAAA-MM-DD)')
+        parser.add_argument('--estado', help='Solo pedidos en este estado')
+        parser.add_argument('--gzip', action='store_true', help='Comprimir la salida con gzip')
+        parser.add_argument('--salida', help='Archivo de salida; por defecto la salida estándar')
+
+    def handle(self, *args, **options):
+        filtros = {clave: options[clave] for clave in ('desde', 'hasta', 'estado')}
+        try:
+            # Validar antes de crear el archivo de salida
+            exportacion.consulta(options['conjunto'], **filtros)
+        except exportacion.ErrorExportacion as error:
+            raise CommandError(error)
+        inicio = time.perf_counter()
+        escritos = 0
+        salida = open(options['salida'], 'wb') if options['salida'] else sys.stdout.buffer
+        try:
+            for bloque in exportacion.bloques(options['conjunto'], options['formato'], options['gzip'], **filtros):
+                salida.write(bloque)
+                escritos += len(bloque)
+        finally:
+            if options['salida']:
+                salida.close()
+            else:
+                salida.flush()
+
+        # ru_maxrss está en KiB en Linux
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stderr.write(
+            f"{escritos / 1024 / 1024:.1f} MiB escritos en {time.perf_counter() - inicio:.1f}s, "
+            f"RSS máximo {rss:.0f} MiB"
+        )
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from app_spa import cache_catalogo, imagenes
+from app_spa.models import Productos, Servicios
+
+
+def procesar(nombre, forzar):
+    """Trabajo de cada proceso: decodificar, redimensionar y codificar es CPU pura"""
+    try:
+        return nombre, imagenes.generar_derivadas(nombre, forzar=forzar), None
+    except (OSError, ValueError) as error:
+        return nombre, None, str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las derivadas (thumb, card, detail en WebP y JPEG) de las imágenes "
+        "existentes de Productos y Servicios, repartiendo el trabajo entre los núcleos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count(), help='Procesos en paralelo')
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Procesar también las imágenes que ya tienen hash',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Regenerar aunque las derivadas ya existan en disco',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        pendientes = {}
+        for modelo in (Productos, Servicios):
+            queryset = modelo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+            if not options['todas']:
+                queryset = queryset.filter(imagen_hash='')
+            for pk, nombre in queryset.values_list('pk', 'imagen'):
+                pendientes.setdefault(nombre, []).append((modelo, pk))
+
+        if not pendientes:
+            self.stdout.write("No hay imágenes pendientes")
+            return
+        self.stdout.write(f"Procesando {len(pendientes)} imágenes con {options['procesos']} procesos...")
+
+        hashes = {Productos: {}, Servicios: {}}
+        errores = 0
+        # Los procesos hijos necesitan Django configurado para usar el storage
+        with ProcessPoolExecutor(max_workers=options['procesos'], initializer=django.setup) as pool:
+            tareas = [pool.submit(procesar, nombre, options['forzar']) for nombre in pendientes]
+            for tarea in as_completed(tareas):
+                nombre, hash_imagen, error = tarea.result()
+                if error:
+                    errores += 1
+                    self.stderr.write(f"{nombre}: {error}")
+                    continue
+                for modelo, pk in pendientes[nombre]:
+                    hashes[modelo][pk] = hash_imagen
+
+        for modelo, por_pk in hashes.items():
+            objetos = [modelo(pk=pk, imagen_hash=hash_imagen) for pk, hash_imagen in por_pk.items()]
+            modelo.objects.bulk_update(objetos, ['imagen_hash'], batch_size=500)
+        # bulk_update no dispara señales: las páginas cacheadas deben ver los nuevos srcset
+        cache_catalogo.incrementar_version()
+
+        estilo = self.style.WARNING if errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{len(pendientes) - errores} imágenes procesadas, {errores} con error, "
+            f"{time.perf_counter() - inicio:.1f}s"
+        ))
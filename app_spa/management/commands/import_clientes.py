@@ -0,0 +1,103 @@
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from app_spa import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa clientes (User y Clientes) desde un CSV o NDJSON, opcionalmente .gz. "
+        "Los hashes de contraseña se calculan en un pool de procesos y las filas inválidas "
+        "se reportan sin detener la importación"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV o NDJSON')
+        parser.add_argument(
+            '--formato',
+            choices=importacion.FORMATOS,
+            help='Por defecto según la extensión (.csv, .ndjson, .jsonl, con o sin .gz)',
+        )
+        parser.add_argument('--procesos', type=int, default=os.cpu_count(), help='Procesos para los hashes')
+        parser.add_argument('--lote', type=int, default=importacion.TAMANO_LOTE, help='Filas por transacción')
+        parser.add_argument(
+            '--sin-contrasenas',
+            action='store_true',
+            help='Ignorar las contraseñas del archivo: todos quedan sin contraseña utilizable',
+        )
+        parser.add_argument('--rechazos', help='CSV donde escribir línea y motivo de cada fila rechazada')
+        parser.add_argument(
+            '--tokens',
+            help='CSV con uid y token de restablecimiento para los usuarios sin contraseña',
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or self.formato(options['archivo'])
+        if options['lote'] < 1 or options['procesos'] < 1:
+            raise CommandError("--lote y --procesos deben ser mayores que cero")
+        try:
+            archivo = importacion.abrir(options['archivo'])
+        except OSError as error:
+            raise CommandError(str(error))
+
+        salida_rechazos = open(options['rechazos'], 'w', newline='', encoding='utf-8') if options['rechazos'] else None
+        salida_tokens = open(options['tokens'], 'w', newline='', encoding='utf-8') if options['tokens'] else None
+        rechazos_csv = csv.writer(salida_rechazos or sys.stderr)
+        rechazos_csv.writerow(['linea', 'motivo'])
+        tokens_csv = csv.writer(salida_tokens) if salida_tokens else None
+        if tokens_csv:
+            tokens_csv.writerow(['username', 'email', 'uid', 'token'])
+
+        inicio = time.perf_counter()
+        importados = rechazados = hasheados = 0
+        # Los procesos hijos necesitan Django configurado para leer PASSWORD_HASHERS
+        pool = ProcessPoolExecutor(max_workers=options['procesos'], initializer=django.setup)
+        mapear = partial(pool.map, chunksize=max(1, options['lote'] // (options['procesos'] * 4)))
+        try:
+            with archivo, pool:
+                lotes = importacion.importar(
+                    importacion.leer(archivo, formato), mapear=mapear, tamano=options['lote'],
+                    sin_contrasenas=options['sin_contrasenas'],
+                )
+                for creados, rechazos in lotes:
+                    for linea, motivo in rechazos:
+                        rechazos_csv.writerow([linea, motivo])
+                    for usuario in creados:
+                        if usuario.sin_contrasena:
+                            if tokens_csv:
+                                tokens_csv.writerow([usuario.username, usuario.email, *importacion.token_restablecimiento(usuario)])
+                        else:
+                            hasheados += 1
+                    importados += len(creados)
+                    rechazados += len(rechazos)
+                    self.stdout.write(f"{importados} importados, {rechazados} rechazados...")
+        except importacion.FilaInvalida as error:
+            # Solo el encabezado o el formato detienen la importación
+            raise CommandError(str(error))
+        finally:
+            for salida in (salida_rechazos, salida_tokens):
+                if salida:
+                    salida.close()
+
+        segundos = time.perf_counter() - inicio
+        estilo = self.style.WARNING if rechazados else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{importados} clientes importados ({importados - hasheados} sin contraseña), "
+            f"{rechazados} filas rechazadas, {segundos:.1f}s, {hasheados / segundos:.0f} hashes/s"
+        ))
+
+    def formato(self, ruta):
+        nombre = ruta[:-3] if ruta.endswith('.gz') else ruta
+        extension = os.path.splitext(nombre)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.ndjson', '.jsonl'):
+            return 'ndjson'
+        raise CommandError("No se reconoce el formato por la extensión; use --formato")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_spa import reservas
+
+
+class Command(BaseCommand):
+    help = (
+        "Libera en bloque las reservas de stock vencidas de los carritos. Pensado para cron, "
+        "p. ej. cada minuto; --reconstruir recalcula además Productos.reservado desde las reservas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconstruir', action='store_true', help='Recalcular el total apartado de cada producto')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        liberadas = reservas.liberar_vencidas()
+        self.stdout.write(f"{liberadas} reserva(s) vencida(s) liberadas")
+        if options['reconstruir']:
+            corregidos = reservas.reconstruir()
+            self.stdout.write(f"{corregidos} producto(s) con el total apartado corregido")
+        self.stdout.write(self.style.SUCCESS(f"Listo en {time.perf_counter() - inicio:.2f}s"))
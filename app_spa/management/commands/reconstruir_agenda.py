@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_spa import agenda
+from app_spa.management.commands.reconstruir_ventas import fecha
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la ocupación por empleado y día (AgendaDia) desde las citas reservadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=fecha, help='Primer día a reconstruir (AAAA-MM-DD); por defecto el primero')
+        parser.add_argument('--hasta', type=fecha, help='Último día a reconstruir (AAAA-MM-DD); por defecto el último')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = agenda.reconstruir(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} día(s) de agenda reconstruidos en {time.perf_counter() - inicio:.1f}s"
+        ))
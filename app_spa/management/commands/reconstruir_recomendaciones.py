@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_spa import recomendaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye la matriz de coocurrencia y las recomendaciones desde todos los pedidos. "
+        "Los pedidos nuevos se suman solos en la cola de tareas; esto corrige lo que no resta "
+        "(pedidos borrados, items eliminados) y actualiza todos los puntajes"
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        motor = 'NumPy/SciPy' if recomendaciones.sparse is not None else 'Python'
+        pedidos, pares, guardadas = recomendaciones.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"{pedidos} pedidos, {pares} pares de items, {guardadas} recomendaciones "
+            f"({motor}) en {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app_spa.models import Clientes, ResumenCliente
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los resúmenes de compras (ResumenCliente) desde los pedidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            action='append',
+            dest='clientes',
+            help='ID de cliente a reconstruir (se puede repetir); por defecto todos',
+        )
+
+    def handle(self, *args, **options):
+        clientes = Clientes.objects.all()
+        if options['clientes']:
+            clientes = clientes.filter(pk__in=options['clientes'])
+        total = ResumenCliente.reconstruir(clientes)
+        self.stdout.write(self.style.SUCCESS(f"{total} resumen(es) de cliente reconstruido(s)"))
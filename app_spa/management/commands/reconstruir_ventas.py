@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from app_spa.models import VentaDiaria, VentaDiariaItem
+
+
+def fecha(texto):
+    valor = parse_date(texto)
+    if valor is None:
+        raise ValueError(texto)
+    return valor
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los acumulados diarios de ventas (VentaDiaria, VentaDiariaItem) desde los pedidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=fecha, help='Primer día a reconstruir (AAAA-MM-DD); por defecto el primero')
+        parser.add_argument('--hasta', type=fecha, help='Último día a reconstruir (AAAA-MM-DD); por defecto el último')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = VentaDiaria.reconstruir(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} acumulado(s) diario(s) y {VentaDiariaItem.objects.count()} de items "
+            f"reconstruidos en {time.perf_counter() - inicio:.1f}s"
+        ))
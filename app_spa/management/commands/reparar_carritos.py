@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_spa.models import Carrito
+
+
+class Command(BaseCommand):
+    help = "Recalcula cantidad_items y monto_total de los carritos a partir de sus items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Incluir también los carritos inactivos',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reportar los carritos desincronizados, sin corregirlos',
+        )
+
+    def handle(self, *args, **options):
+        carritos = Carrito.objects.all() if options['todos'] else Carrito.objects.filter(activo=True)
+        esperados = carritos.annotate(
+            esperado_items=Carrito.totales_actualizados()['cantidad_items'],
+            esperado_monto=Carrito.totales_actualizados()['monto_total'],
+        ).values_list('pk', 'usuario_id', 'cantidad_items', 'monto_total', 'esperado_items', 'esperado_monto')
+
+        desincronizados = []
+        for pk, usuario_id, items, monto, esperado_items, esperado_monto in esperados.iterator():
+            if items != esperado_items or monto != esperado_monto:
+                desincronizados.append((pk, usuario_id))
+                self.stdout.write(
+                    f"Carrito #{pk}: {items} items / ${monto} -> {esperado_items} items / ${esperado_monto}"
+                )
+
+        if desincronizados and not options['dry_run']:
+            with transaction.atomic():
+                Carrito.objects.filter(
+                    pk__in=[pk for pk, _ in desincronizados]
+                ).update(**Carrito.totales_actualizados())
+
+        accion = "encontrados" if options['dry_run'] else "reparados"
+        self.stdout.write(self.style.SUCCESS(f"{len(desincronizados)} carrito(s) {accion}"))
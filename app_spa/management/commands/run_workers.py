@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_spa import cola
+
+PURGAR_CADA = 60 * 60
+
+
+def correr(pk):
+    """Trabajo de cada hilo o proceso; las conexiones se renuevan como entre peticiones"""
+    close_old_connections()
+    try:
+        return cola.ejecutar(pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta las tareas de la cola (app_spa/cola.py) en un pool de hilos o procesos. "
+        "Requiere SPA_WORKERS=1 en la web para que las tareas esperen aquí en lugar de correr en línea"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajadores', type=int, default=4, help='Tareas en paralelo')
+        parser.add_argument(
+            '--procesos',
+            action='store_true',
+            help='Pool de procesos en lugar de hilos, para tareas de CPU como las derivadas de imágenes',
+        )
+        parser.add_argument('--espera', type=float, default=1.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Salir cuando no quede nada pendiente')
+
+    def handle(self, *args, **options):
+        trabajador = f"{socket.gethostname()}:{os.getpid()}"
+        self.detener = False
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, self.pedir_detener)
+
+        if options['procesos']:
+            # spawn: un hijo creado con fork heredaría la conexión abierta a la base de datos
+            pool = ProcessPoolExecutor(
+                max_workers=options['trabajadores'], mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=options['trabajadores'], thread_name_prefix='tarea')
+        self.stdout.write(
+            f"{trabajador}: {options['trabajadores']} {'procesos' if options['procesos'] else 'hilos'}"
+        )
+
+        en_vuelo, hechas, fallidas, ultima_purga = set(), 0, 0, 0.0
+        with pool:
+            while not self.detener:
+                if time.monotonic() - ultima_purga > PURGAR_CADA:
+                    recuperadas, purgadas = cola.recuperar_abandonadas(), cola.purgar()
+                    if recuperadas or purgadas:
+                        self.stdout.write(f"{recuperadas} tarea(s) abandonada(s) recuperadas, {purgadas} purgadas")
+                    ultima_purga = time.monotonic()
+
+                libres = options['trabajadores'] - len(en_vuelo)
+                nuevas = cola.reclamar(libres, trabajador) if libres else []
+                en_vuelo.update(pool.submit(correr, pk) for pk in nuevas)
+                if not en_vuelo:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['espera'])
+                    continue
+
+                # Con cupo y tareas recién tomadas se vuelve a reclamar enseguida
+                listas, en_vuelo = wait(
+                    en_vuelo, timeout=0 if nuevas and len(en_vuelo) < options['trabajadores'] else options['espera'],
+                    return_when=FIRST_COMPLETED,
+                )
+                for futuro in listas:
+                    if futuro.result():
+                        hechas += 1
+                    else:
+                        fallidas += 1
+            # Al detenerse se terminan las tareas en curso; las pendientes quedan para el siguiente
+            for futuro in en_vuelo:
+                if futuro.result():
+                    hechas += 1
+                else:
+                    fallidas += 1
+
+        estilo = self.style.WARNING if fallidas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{hechas} tarea(s) hechas, {fallidas} con error"))
+
+    def pedir_detener(self, senal, marco):
+        self.detener = True
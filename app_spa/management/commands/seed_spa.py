@@ -0,0 +1,279 @@
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_spa import busqueda
+from app_spa.models import (
+    IVA, Clientes, Empleados, Pedido, PedidoItem, Productos, Proveedores, ResumenCliente, Servicios,
+)
+
+TIPOS_SERVICIO = ['Masaje', 'Facial', 'Corporal', 'Terapia', 'Manicure', 'Pedicure', 'Aromaterapia']
+TIPOS_PRODUCTO = [clave for clave, _ in Productos.TIPO_PRODUCTO]
+ESTADOS = [clave for clave, _ in Pedido.ESTADO_CHOICES]
+PESOS_ESTADO = [10, 10, 5, 65, 10]
+BASES_PRODUCTO = ['Crema', 'Aceite', 'Loción', 'Sales de baño', 'Vela', 'Mascarilla', 'Exfoliante', 'Piedras']
+AROMAS = ['lavanda', 'eucalipto', 'rosa', 'sándalo', 'menta', 'jazmín', 'coco', 'té verde', 'vainilla']
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Sofía', 'Carlos', 'Lucía', 'Miguel', 'Valeria', 'Jorge']
+APELLIDOS = ['García', 'Martínez', 'López', 'Hernández', 'González', 'Pérez', 'Sánchez', 'Ramírez']
+
+
+@contextmanager
+def fechas_manuales(*campos):
+    """Desactivar auto_now_add temporalmente para poder repartir fechas en el tiempo"""
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos para pruebas de carga: catálogo, clientes con usuario, "
+        "pedidos e items, en lotes con bulk_create y semilla reproducible"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servicios', type=int, default=50)
+        parser.add_argument('--proveedores', type=int, default=20)
+        parser.add_argument('--productos', type=int, default=500)
+        parser.add_argument('--empleados', type=int, default=100)
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--pedidos', type=int, default=5000)
+        parser.add_argument('--max-items', type=int, default=4, help='Máximo de items por pedido')
+        parser.add_argument('--dias', type=int, default=365, help='Antigüedad máxima de los pedidos')
+        parser.add_argument('--lote', type=int, default=5000, help='Tamaño de lote para bulk_create')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--prefijo', default='seed', help='Prefijo de los usernames generados')
+        parser.add_argument('--password', default='spa12345', help='Contraseña común de los usuarios')
+        parser.add_argument(
+            '--sin-password',
+            action='store_true',
+            help='No calcular ningún hash: los usuarios quedan con contraseña inutilizable',
+        )
+        parser.add_argument(
+            '--sin-resumenes',
+            action='store_true',
+            help='No reconstruir ResumenCliente al terminar',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.ahora = timezone.now()
+        inicio = time.perf_counter()
+
+        servicios = self.crear_servicios(options['servicios'])
+        proveedores = self.crear_proveedores(options['proveedores'])
+        productos = self.crear_productos(options['productos'], proveedores, servicios)
+        self.crear_empleados(options['empleados'], servicios)
+        usuarios = self.crear_clientes(options, servicios, productos)
+        self.crear_pedidos(options, usuarios, servicios, productos)
+
+        # bulk_create no pasa por las señales del índice de búsqueda
+        self.paso("Reconstruyendo índice de búsqueda")
+        busqueda.reconstruir_indice()
+
+        if not options['sin_resumenes']:
+            self.paso("Reconstruyendo resúmenes de clientes")
+            # Por lotes de clientes: con cientos de miles no cabe un solo IN (...)
+            clientes = ResumenCliente.reconstruir()
+            self.stdout.write(f"{clientes} clientes revisados")
+
+        self.stdout.write(self.style.SUCCESS(f"Datos generados en {time.perf_counter() - inicio:.1f}s"))
+
+    def paso(self, mensaje):
+        self.stdout.write(f"{mensaje}...")
+
+    def lotes(self, total):
+        for inicio in range(0, total, self.lote):
+            yield range(inicio, min(inicio + self.lote, total))
+
+    def precio(self, minimo, maximo):
+        return Decimal(self.rng.randrange(minimo * 100, maximo * 100)) / 100
+
+    def crear_servicios(self, total):
+        self.paso(f"Creando {total} servicios")
+        creados = Servicios.objects.bulk_create([
+            Servicios(
+                nombre=f"{self.rng.choice(TIPOS_SERVICIO)} {i}",
+                descripcion="Servicio generado para pruebas de carga",
+                precio=self.precio(200, 2000),
+                duracion=self.rng.choice([30, 45, 60, 90, 120]),
+                tipo_servicio=self.rng.choice(TIPOS_SERVICIO),
+            )
+            for i in range(total)
+        ], batch_size=self.lote)
+        return {s.pk: s.precio for s in creados}
+
+    def crear_proveedores(self, total):
+        self.paso(f"Creando {total} proveedores")
+        creados = Proveedores.objects.bulk_create([
+            Proveedores(
+                nombre_empresa=f"Proveedor {i}",
+                contacto=f"{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)}",
+                telefono=f"55{self.rng.randrange(10 ** 7, 10 ** 8)}",
+                email=f"proveedor{i}@example.com",
+                direccion="Dirección de prueba",
+                especialidad=self.rng.choice(TIPOS_SERVICIO),
+            )
+            for i in range(total)
+        ], batch_size=self.lote)
+        return [p.pk for p in creados]
+
+    def crear_productos(self, total, proveedores, servicios):
+        self.paso(f"Creando {total} productos")
+        ids_servicios = list(servicios)
+        precios = {}
+        Relacion = Productos.servicios.through
+        for rango in self.lotes(total):
+            creados = Productos.objects.bulk_create([
+                Productos(
+                    nombre=f"{self.rng.choice(BASES_PRODUCTO)} de {self.rng.choice(AROMAS)} {i}",
+                    descripcion=f"Producto relajante con aroma a {self.rng.choice(AROMAS)}",
+                    precio=self.precio(50, 1500),
+                    stock=self.rng.randrange(0, 200),
+                    tipo_producto=self.rng.choice(TIPOS_PRODUCTO),
+                    proveedor_id=self.rng.choice(proveedores),
+                )
+                for i in rango
+            ])
+            relaciones = []
+            for producto in creados:
+                precios[producto.pk] = producto.precio
+                for servicio_id in self.muestra(ids_servicios, 3):
+                    relaciones.append(Relacion(productos_id=producto.pk, servicios_id=servicio_id))
+            Relacion.objects.bulk_create(relaciones)
+        return precios
+
+    def crear_empleados(self, total, servicios):
+        self.paso(f"Creando {total} empleados")
+        ids_servicios = list(servicios)
+        Empleados.objects.bulk_create([
+            Empleados(
+                nombre=self.rng.choice(NOMBRES),
+                apellido=self.rng.choice(APELLIDOS),
+                especialidad=self.rng.choice(TIPOS_SERVICIO),
+                telefono=f"55{self.rng.randrange(10 ** 7, 10 ** 8)}",
+                cargo=self.rng.choice(['Terapeuta', 'Masajista', 'Cosmetóloga', 'Recepción']),
+                servicio_id=self.rng.choice(ids_servicios),
+            )
+            for _ in range(total)
+        ], batch_size=self.lote)
+
+    def crear_clientes(self, options, servicios, productos):
+        total = options['clientes']
+        self.paso(f"Creando {total} usuarios y clientes")
+        prefijo = options['prefijo']
+        desde = User.objects.filter(username__startswith=f"{prefijo}_").count()
+        if options['sin_password']:
+            password = make_password(None)
+        else:
+            # Un solo hash para todos: el costo de PBKDF2 se paga una vez, no por usuario
+            password = make_password(options['password'])
+
+        ids_servicios, ids_productos = list(servicios), list(productos)
+        RelServicio = Clientes.servicios.through
+        RelProducto = Clientes.productos_interes.through
+        fecha_registro = Clientes._meta.get_field('fecha_registro')
+        usuarios = array('q')
+
+        with fechas_manuales(fecha_registro):
+            for rango in self.lotes(total):
+                with transaction.atomic():
+                    # bulk_create no dispara crear_cliente_desde_usuario; el cliente se crea aquí
+                    nuevos = User.objects.bulk_create([
+                        User(
+                            username=f"{prefijo}_{desde + i}",
+                            email=f"{prefijo}_{desde + i}@example.com",
+                            first_name=self.rng.choice(NOMBRES),
+                            last_name=self.rng.choice(APELLIDOS),
+                            password=password,
+                            date_joined=self.ahora,
+                        )
+                        for i in rango
+                    ])
+                    clientes = Clientes.objects.bulk_create([
+                        Clientes(
+                            usuario_id=u.pk,
+                            nombre=u.first_name,
+                            apellido=u.last_name,
+                            email=u.email,
+                            telefono=f"55{self.rng.randrange(10 ** 7, 10 ** 8)}",
+                            fecha_registro=(self.ahora - timedelta(days=self.rng.randrange(options['dias'] + 1))).date(),
+                            alergias="",
+                            preferencias="",
+                        )
+                        for u in nuevos
+                    ])
+                    RelServicio.objects.bulk_create([
+                        RelServicio(clientes_id=c.pk, servicios_id=s)
+                        for c in clientes for s in self.muestra(ids_servicios, 2)
+                    ])
+                    RelProducto.objects.bulk_create([
+                        RelProducto(clientes_id=c.pk, productos_id=p)
+                        for c in clientes for p in self.muestra(ids_productos, 2)
+                    ])
+                usuarios.extend(u.pk for u in nuevos)
+        return usuarios
+
+    def crear_pedidos(self, options, usuarios, servicios, productos):
+        total = options['pedidos']
+        if not total or not usuarios:
+            return
+        self.paso(f"Creando {total} pedidos")
+        catalogo = [('producto', pk, precio) for pk, precio in productos.items()]
+        catalogo += [('servicio', pk, precio) for pk, precio in servicios.items()]
+        segundos = options['dias'] * 24 * 3600
+        fecha_pedido = Pedido._meta.get_field('fecha_pedido')
+
+        with fechas_manuales(fecha_pedido):
+            for rango in self.lotes(total):
+                with transaction.atomic():
+                    lineas_por_pedido = []
+                    pedidos = []
+                    for _ in rango:
+                        lineas = [
+                            (tipo, pk, precio, self.rng.randint(1, 3))
+                            for tipo, pk, precio in self.muestra(catalogo, options['max_items'], minimo=1)
+                        ]
+                        subtotal = sum(precio * cantidad for _, _, precio, cantidad in lineas)
+                        iva = (subtotal * IVA).quantize(Decimal('0.01'))
+                        lineas_por_pedido.append(lineas)
+                        pedidos.append(Pedido(
+                            usuario_id=self.rng.choice(usuarios),
+                            fecha_pedido=self.ahora - timedelta(seconds=self.rng.randrange(segundos or 1)),
+                            subtotal=subtotal,
+                            iva=iva,
+                            total=subtotal + iva,
+                            estado=self.rng.choices(ESTADOS, PESOS_ESTADO)[0],
+                        ))
+                    # bulk_create tampoco dispara las señales del resumen: se reconstruye al final
+                    Pedido.objects.bulk_create(pedidos)
+                    PedidoItem.objects.bulk_create([
+                        PedidoItem(
+                            pedido_id=pedido.pk,
+                            producto_id=pk if tipo == 'producto' else None,
+                            servicio_id=pk if tipo == 'servicio' else None,
+                            cantidad=cantidad,
+                            precio=precio,
+                        )
+                        for pedido, lineas in zip(pedidos, lineas_por_pedido)
+                        for tipo, pk, precio, cantidad in lineas
+                    ])
+
+    def muestra(self, elementos, maximo, minimo=0):
+        if not elementos:
+            return []
+        return self.rng.sample(elementos, self.rng.randint(minimo, min(maximo, len(elementos))))
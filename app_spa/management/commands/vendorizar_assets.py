@@ -0,0 +1,62 @@
+import base64
+import hashlib
+import json
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app_spa.estaticos import ASSETS_VENDOR
+
+
+class Command(BaseCommand):
+    help = (
+        "Descarga Bootstrap y Bootstrap Icons a static/vendor para no depender del CDN. "
+        "Los hashes sha384 se registran en static/vendor/assets.lock.json y se verifican en "
+        "cada descarga posterior"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Descargar de nuevo aunque el archivo ya exista',
+        )
+        parser.add_argument(
+            '--actualizar-lock',
+            action='store_true',
+            help='Aceptar hashes distintos a los registrados (al cambiar de versión)',
+        )
+
+    def handle(self, *args, **options):
+        destino = Path(settings.STATICFILES_DIRS[0])
+        archivo_lock = destino / 'vendor' / 'assets.lock.json'
+        lock = json.loads(archivo_lock.read_text()) if archivo_lock.exists() else {}
+
+        for ruta, url in ASSETS_VENDOR.values():
+            local = destino / ruta
+            if local.exists() and not options['forzar']:
+                contenido = local.read_bytes()
+            else:
+                self.stdout.write(f"Descargando {url}")
+                try:
+                    with urlopen(url, timeout=30) as respuesta:
+                        contenido = respuesta.read()
+                except OSError as error:
+                    raise CommandError(f"No se pudo descargar {url}: {error}")
+
+            integridad = 'sha384-' + base64.b64encode(hashlib.sha384(contenido).digest()).decode()
+            registrado = lock.get(ruta)
+            if registrado and registrado != integridad and not options['actualizar_lock']:
+                raise CommandError(f"{ruta}: el hash {integridad} no coincide con el registrado {registrado}")
+            lock[ruta] = integridad
+            local.parent.mkdir(parents=True, exist_ok=True)
+            local.write_bytes(contenido)
+            self.stdout.write(f"{ruta}  {len(contenido) / 1024:.1f} KiB  {integridad}")
+
+        archivo_lock.parent.mkdir(parents=True, exist_ok=True)
+        archivo_lock.write_text(json.dumps(lock, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            "Assets vendorizados; ejecuta collectstatic para purgar, versionar y comprimir"
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:16
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    Carrito = apps.get_model('app_spa', 'Carrito')
+    CarritoItem = apps.get_model('app_spa', 'CarritoItem')
+    items = CarritoItem.objects.filter(carrito=OuterRef('pk')).order_by().values('carrito')
+    precio = Case(
+        When(tipo='producto', then=F('producto__precio')),
+        default=F('servicio__precio'),
+    )
+    decimal = models.DecimalField(max_digits=10, decimal_places=2)
+    Carrito.objects.update(
+        cantidad_items=Coalesce(Subquery(items.annotate(c=Sum('cantidad')).values('c')), 0),
+        monto_total=Coalesce(
+            Subquery(items.annotate(t=Sum(F('cantidad') * precio, output_field=decimal)).values('t')),
+            Value(Decimal('0')),
+            output_field=decimal,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0007_pedido_direccion_entrega_pedido_telefono_contacto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='cantidad_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='carrito',
+            name='monto_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calcular_resumenes(apps, schema_editor):
+    Clientes = apps.get_model('app_spa', 'Clientes')
+    Pedido = apps.get_model('app_spa', 'Pedido')
+    PedidoItem = apps.get_model('app_spa', 'PedidoItem')
+    ResumenCliente = apps.get_model('app_spa', 'ResumenCliente')
+
+    clientes = dict(Clientes.objects.filter(usuario__isnull=False).values_list('usuario_id', 'pk'))
+    validos = Pedido.objects.filter(usuario_id__in=clientes).exclude(estado='cancelado')
+    estadisticas = validos.order_by().values('usuario_id').annotate(
+        num=models.Count('id'),
+        gastado=models.Sum('total'),
+        ultimo=models.Max('fecha_pedido'),
+    )
+    ResumenCliente.objects.bulk_create([
+        ResumenCliente(
+            cliente_id=clientes[fila['usuario_id']],
+            pedidos=fila['num'],
+            total_gastado=fila['gastado'] or 0,
+            ultimo_pedido=fila['ultimo'],
+        )
+        for fila in estadisticas
+    ])
+    items = PedidoItem.objects.filter(pedido__in=validos).order_by()
+    for campo, through in (('servicio', ResumenCliente.servicios.through),
+                           ('producto', ResumenCliente.productos.through)):
+        pares = items.filter(**{f'{campo}__isnull': False}).values_list(
+            'pedido__usuario_id', f'{campo}_id'
+        ).distinct()
+        through.objects.bulk_create([
+            through(**{'resumencliente_id': clientes[usuario_id], f'{campo}s_id': item_id})
+            for usuario_id, item_id in pares
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0008_carrito_cantidad_items_carrito_monto_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='app_spa.clientes')),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('total_gastado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ultimo_pedido', models.DateTimeField(blank=True, null=True)),
+                ('productos', models.ManyToManyField(blank=True, related_name='+', to='app_spa.productos')),
+                ('servicios', models.ManyToManyField(blank=True, related_name='+', to='app_spa.servicios')),
+            ],
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS app_spa_busqueda USING fts5(
+            nombre, descripcion, categoria, proveedor,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    schema_editor.execute("""
+        INSERT INTO app_spa_busqueda (rowid, nombre, descripcion, categoria, proveedor)
+        SELECT p.id_productos * 2, p.nombre, COALESCE(p.descripcion, ''), p.tipo_producto, pr.nombre_empresa
+        FROM app_spa_productos p JOIN app_spa_proveedores pr ON pr.id_proveedores = p.proveedor_id
+        UNION ALL
+        SELECT s.id_servicios * 2 + 1, s.nombre, COALESCE(s.descripcion, ''), s.tipo_servicio, ''
+        FROM app_spa_servicios s
+    """)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS app_spa_busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0009_resumencliente'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def desactivar_carritos_duplicados(apps, schema_editor):
+    """Dejar activo solo el carrito más reciente de cada usuario antes de crear la restricción"""
+    Carrito = apps.get_model('app_spa', 'Carrito')
+    duplicados = (
+        Carrito.objects.filter(activo=True).values('usuario')
+        .annotate(ultimo=models.Max('id'), n=models.Count('id')).filter(n__gt=1)
+    )
+    for fila in duplicados:
+        Carrito.objects.filter(usuario=fila['usuario'], activo=True).exclude(pk=fila['ultimo']).update(activo=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0010_busqueda_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(desactivar_carritos_duplicados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='carritoitem',
+            index=models.Index(fields=['carrito', 'producto'], name='carritoitem_producto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carritoitem',
+            index=models.Index(fields=['carrito', 'servicio'], name='carritoitem_servicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientes',
+            index=models.Index(fields=['fecha_registro'], name='clientes_fecha_registro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', '-fecha_pedido'], name='pedido_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', '-fecha_pedido'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido'], name='pedido_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productos',
+            index=models.Index(fields=['tipo_producto'], name='productos_tipo_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='carrito',
+            constraint=models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('usuario',), name='un_carrito_activo_por_usuario'),
+        ),
+    ]
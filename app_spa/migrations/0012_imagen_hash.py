@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0011_indices_rutas_calientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productos',
+            name='imagen_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='servicios',
+            name='imagen_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
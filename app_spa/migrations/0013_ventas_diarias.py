@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0012_imagen_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('iva', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'estado'), name='venta_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('tipo_producto', models.CharField(blank=True, default='', max_length=20)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('importe', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_spa.productos')),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_spa.proveedores')),
+                ('servicio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_spa.servicios')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha', 'estado'], name='venta_item_fecha_idx')],
+            },
+        ),
+    ]
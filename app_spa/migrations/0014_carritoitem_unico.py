@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+def fusionar_items_duplicados(apps, schema_editor):
+    """Sumar en un solo renglón los items repetidos de un carrito antes de crear las restricciones"""
+    CarritoItem = apps.get_model('app_spa', 'CarritoItem')
+    for campo in ('producto', 'servicio'):
+        duplicados = (
+            CarritoItem.objects.filter(**{f'{campo}__isnull': False}).values('carrito', campo)
+            .annotate(primero=models.Min('id'), total=models.Sum('cantidad'), n=models.Count('id'))
+            .filter(n__gt=1)
+        )
+        for fila in duplicados:
+            CarritoItem.objects.filter(pk=fila['primero']).update(cantidad=fila['total'])
+            CarritoItem.objects.filter(carrito=fila['carrito'], **{campo: fila[campo]}).exclude(
+                pk=fila['primero']
+            ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0013_ventas_diarias'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_items_duplicados, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='carritoitem',
+            name='carritoitem_producto_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='carritoitem',
+            name='carritoitem_servicio_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='carritoitem',
+            constraint=models.UniqueConstraint(fields=('carrito', 'producto'), name='carritoitem_producto_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='carritoitem',
+            constraint=models.UniqueConstraint(fields=('carrito', 'servicio'), name='carritoitem_servicio_unico'),
+        ),
+    ]
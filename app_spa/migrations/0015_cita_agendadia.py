@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0014_carritoitem_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('ocupacion', models.BinaryField(default=b'')),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agenda', to='app_spa.empleados')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('empleado', 'fecha'), name='agenda_dia_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Cita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('inicio', models.TimeField()),
+                ('fin', models.TimeField()),
+                ('estado', models.CharField(choices=[('reservada', 'Reservada'), ('completada', 'Completada'), ('cancelada', 'Cancelada')], default='reservada', max_length=20)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='citas', to='app_spa.empleados')),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='citas', to='app_spa.pedido')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='citas', to='app_spa.servicios')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['empleado', 'fecha'], name='cita_empleado_fecha_idx')],
+            },
+        ),
+    ]
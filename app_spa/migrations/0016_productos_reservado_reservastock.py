@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0015_cita_agendadia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productos',
+            name='reservado',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('llave', models.CharField(max_length=100)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('expira', models.DateTimeField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app_spa.productos')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expira'], name='reserva_stock_expira_idx')],
+                'constraints': [models.UniqueConstraint(fields=('llave', 'producto'), name='reserva_stock_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0016_productos_reservado_reservastock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('argumentos', models.JSONField(default=dict)),
+                ('llave', models.CharField(blank=True, max_length=200, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('hecha', 'Hecha'), ('fallida', 'Fallida'), ('descartada', 'Descartada')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=5)),
+                ('disponible_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('trabajador', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'disponible_en'], name='tarea_estado_disponible_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado', 'pendiente')), fields=('llave',), name='tarea_pendiente_unica')],
+            },
+        ),
+    ]
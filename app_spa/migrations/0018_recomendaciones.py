@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_spa', '0017_tarea'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Coocurrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item', models.CharField(max_length=12)),
+                ('vecino', models.CharField(max_length=12)),
+                ('pedidos', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Recomendacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item', models.CharField(max_length=12)),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('pedidos', models.PositiveIntegerField()),
+                ('puntaje', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='en_recomendaciones',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(condition=models.Q(('en_recomendaciones', False)), fields=['id'], name='pedido_sin_recomendar_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='coocurrencia',
+            constraint=models.UniqueConstraint(fields=('item', 'vecino'), name='coocurrencia_unica'),
+        ),
+        migrations.AddField(
+            model_name='recomendacion',
+            name='producto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_spa.productos'),
+        ),
+        migrations.AddField(
+            model_name='recomendacion',
+            name='servicio',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_spa.servicios'),
+        ),
+        migrations.AddConstraint(
+            model_name='recomendacion',
+            constraint=models.UniqueConstraint(fields=('item', 'posicion'), name='recomendacion_unica'),
+        ),
+    ]
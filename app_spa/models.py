@@ -1,5 +1,36 @@
-from django.db import models
+import datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.db import models, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+from . import cache_catalogo
+
+# QuerySets de catálogo: cada para_listado() precarga todo lo que usan las
+# tablas de admin-spa y del admin de Django en un número fijo de consultas.
+class ServiciosQuerySet(models.QuerySet):
+    def para_listado(self):
+        return self.prefetch_related(
+            'productos_utilizados', 'empleados', 'clientes'
+        ).annotate(num_productos=models.Count('productos_utilizados', distinct=True))
+
+class EmpleadosQuerySet(models.QuerySet):
+    def para_listado(self):
+        return self.select_related('servicio')
+
+class ProveedoresQuerySet(models.QuerySet):
+    def para_listado(self):
+        return self.prefetch_related('productos')
+
+class ProductosQuerySet(models.QuerySet):
+    def para_listado(self):
+        return self.select_related('proveedor').prefetch_related('servicios', 'clientes_interes')
 
 class Servicios(models.Model):
     id_servicios = models.AutoField(primary_key=True)
@@ -9,6 +40,10 @@ class Servicios(models.Model):
     duracion = models.IntegerField(help_text="Duración en minutos")
     tipo_servicio = models.CharField(max_length=100)
     imagen = models.ImageField(upload_to='servicios/', blank=True, null=True)
+    # sha256 del original: ubica sus derivadas (ver imagenes.py)
+    imagen_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    
+    objects = ServiciosQuerySet.as_manager()
     
     def __str__(self):
         return self.nombre
@@ -29,6 +64,8 @@ class Servicios(models.Model):
     
     def total_productos_utilizados(self):
         """Cantidad total de productos utilizados"""
+        if hasattr(self, 'num_productos'):
+            return self.num_productos
         return self.productos_utilizados.count()
 
 class Empleados(models.Model):
@@ -40,6 +77,8 @@ class Empleados(models.Model):
     cargo = models.CharField(max_length=100)
     servicio = models.ForeignKey(Servicios, on_delete=models.CASCADE, related_name='empleados')
     
+    objects = EmpleadosQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
     
@@ -59,6 +98,8 @@ class Proveedores(models.Model):
     especialidad = models.CharField(max_length=100)
     fecha_registro = models.DateField(auto_now_add=True)
     
+    objects = ProveedoresQuerySet.as_manager()
+    
     def __str__(self):
         return self.nombre_empresa
     
@@ -79,17 +120,41 @@ class Productos(models.Model):
     descripcion = models.TextField(blank=True, null=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
+    # Unidades apartadas por carritos (ReservaStock); lo mantiene app_spa/reservas.py
+    reservado = models.PositiveIntegerField(default=0, editable=False)
     tipo_producto = models.CharField(max_length=20, choices=TIPO_PRODUCTO)
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
+    imagen_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     proveedor = models.ForeignKey(Proveedores, on_delete=models.CASCADE, related_name='productos')
     servicios = models.ManyToManyField(Servicios, blank=True, related_name='productos_utilizados')
     
+    objects = ProductosQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo_producto'], name='productos_tipo_idx'),
+        ]
+    
     def __str__(self):
         return self.nombre
     
+    def save(self, *args, **kwargs):
+        # reservado cambia con UPDATE ... F() en reservas.py: un save completo de un producto
+        # ya existente (admin, formularios) escribiría el valor que tenía al cargarse
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'reservado'
+            ]
+        super().save(*args, **kwargs)
+    
     def nombre_proveedor(self):
         return self.proveedor.nombre_empresa
     
+    def disponible(self):
+        """Stock que ningún carrito tiene apartado"""
+        return max(self.stock - self.reservado, 0)
+    
     def servicios_relacionados(self):
         return ", ".join([serv.nombre for serv in self.servicios.all()])
     
@@ -97,6 +162,13 @@ class Productos(models.Model):
     def clientes_interesados_nombres(self):
         return ", ".join([cli.nombre_completo() for cli in self.clientes_interes.all()])
 
+class ClientesQuerySet(models.QuerySet):
+    def con_resumen(self):
+        """Cargar usuario y resumen de compras en un número fijo de consultas"""
+        return self.select_related('usuario', 'resumen').prefetch_related(
+            'resumen__servicios', 'resumen__productos'
+        )
+
 class Clientes(models.Model):
     id_clientes = models.AutoField(primary_key=True)
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='cliente')
@@ -112,6 +184,13 @@ class Clientes(models.Model):
     servicios = models.ManyToManyField(Servicios, blank=True, related_name='clientes')
     productos_interes = models.ManyToManyField(Productos, blank=True, related_name='clientes_interes')
     
+    objects = ClientesQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_registro'], name='clientes_fecha_registro_idx'),
+        ]
+    
     def __str__(self):
         if self.usuario:
             return f"{self.nombre} {self.apellido} ({self.usuario.username})"
@@ -120,68 +199,312 @@ class Clientes(models.Model):
     def nombre_completo(self):
         return f"{self.nombre} {self.apellido}"
     
+    def resumen_compras(self):
+        """Resumen de compras precalculado, o None si el cliente aún no tiene pedidos"""
+        try:
+            return self.resumen
+        except ResumenCliente.DoesNotExist:
+            return None
+    
     def servicios_contratados(self):
         """Mostrar servicios que realmente ha comprado el cliente"""
-        servicios_pedidos = []
-        if self.usuario:
-            # Buscar en todos los pedidos del usuario
-            for pedido in self.usuario.pedidos.all():
-                for item in pedido.items.all():
-                    if item.servicio and item.servicio not in servicios_pedidos:
-                        servicios_pedidos.append(item.servicio)
-        
-        if servicios_pedidos:
-            return ", ".join([serv.nombre for serv in servicios_pedidos])
+        resumen = self.resumen_compras()
+        if resumen:
+            nombres = [serv.nombre for serv in resumen.servicios.all()]
+            if nombres:
+                return ", ".join(nombres)
         return "Sin servicios contratados"
     
     def productos_interes_nombres(self):
         """Mostrar productos que realmente ha comprado el cliente"""
-        productos_pedidos = []
-        if self.usuario:
-            # Buscar en todos los pedidos del usuario
-            for pedido in self.usuario.pedidos.all():
-                for item in pedido.items.all():
-                    if item.producto and item.producto not in productos_pedidos:
-                        productos_pedidos.append(item.producto)
-        
-        if productos_pedidos:
-            return ", ".join([prod.nombre for prod in productos_pedidos])
+        resumen = self.resumen_compras()
+        if resumen:
+            nombres = [prod.nombre for prod in resumen.productos.all()]
+            if nombres:
+                return ", ".join(nombres)
         return "Sin productos comprados"
     
     def pedidos_realizados(self):
-        if self.usuario:
-            return self.usuario.pedidos.count()
-        return 0
+        resumen = self.resumen_compras()
+        return resumen.pedidos if resumen else 0
     
     def total_gastado(self):
-        if self.usuario:
-            return sum(pedido.total for pedido in self.usuario.pedidos.all())
-        return 0
+        resumen = self.resumen_compras()
+        return resumen.total_gastado if resumen else 0
     
     def ultimo_pedido(self):
         if self.usuario and self.usuario.pedidos.exists():
             return self.usuario.pedidos.latest('fecha_pedido')
         return None
 
+# Clientes por transacción al reconstruir resúmenes: muy por debajo del límite de
+# variables de SQLite en las consultas con IN (...)
+LOTE_RESUMENES = 2000
+
+
+class ResumenCliente(models.Model):
+    """
+    Historial de compras desnormalizado de un cliente.
+    Se recalcula por cliente cuando cambian sus pedidos (ver signals.py)
+    y completo con `manage.py reconstruir_resumenes`. Los pedidos cancelados no cuentan.
+    """
+    cliente = models.OneToOneField(Clientes, on_delete=models.CASCADE, primary_key=True, related_name='resumen')
+    pedidos = models.PositiveIntegerField(default=0)
+    total_gastado = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    ultimo_pedido = models.DateTimeField(blank=True, null=True)
+    servicios = models.ManyToManyField(Servicios, blank=True, related_name='+')
+    productos = models.ManyToManyField(Productos, blank=True, related_name='+')
+    
+    def __str__(self):
+        return f"Resumen de {self.cliente.nombre_completo()}"
+    
+    @classmethod
+    def reconstruir(cls, clientes=None, lote=LOTE_RESUMENES):
+        """
+        Regenerar los resúmenes de `clientes` (queryset; todos si es None) con consultas
+        agregadas y bulk_create, sin recorrer pedidos en Python. Va por lotes de `lote`
+        clientes en orden de pk, cada uno en su transacción: así ninguna consulta lleva más
+        ids de los que SQLite acepta y la memoria no crece con el número de clientes.
+        """
+        if clientes is None:
+            clientes = Clientes.objects.all()
+        clientes = clientes.filter(usuario__isnull=False).order_by('pk')
+        total, ultimo = 0, None
+        while True:
+            siguientes = clientes if ultimo is None else clientes.filter(pk__gt=ultimo)
+            por_usuario = dict(siguientes.values_list('usuario_id', 'pk')[:lote])
+            if not por_usuario:
+                return total
+            cls._reconstruir_lote(por_usuario)
+            total += len(por_usuario)
+            ultimo = max(por_usuario.values())
+    
+    @classmethod
+    def _reconstruir_lote(cls, por_usuario):
+        """Resúmenes de los clientes de `por_usuario` ({usuario_id: cliente_id})"""
+        with transaction.atomic():
+            cls.objects.filter(cliente_id__in=por_usuario.values()).delete()
+            validos = Pedido.objects.filter(usuario_id__in=por_usuario).exclude(estado='cancelado')
+            estadisticas = validos.order_by().values('usuario_id').annotate(
+                num=models.Count('id'),
+                gastado=Sum('total'),
+                ultimo=models.Max('fecha_pedido'),
+            )
+            insertar_en_lotes(cls, (
+                cls(
+                    cliente_id=por_usuario[fila['usuario_id']],
+                    pedidos=fila['num'],
+                    total_gastado=fila['gastado'] or 0,
+                    ultimo_pedido=fila['ultimo'],
+                )
+                for fila in estadisticas.iterator()
+            ))
+            
+            items = PedidoItem.objects.filter(pedido__in=validos).order_by()
+            for campo, through in (('servicio', cls.servicios.through), ('producto', cls.productos.through)):
+                pares = items.filter(**{f'{campo}__isnull': False}).values_list(
+                    'pedido__usuario_id', f'{campo}_id'
+                ).distinct()
+                insertar_en_lotes(through, (
+                    through(**{'resumencliente_id': por_usuario[usuario_id], f'{campo}s_id': item_id})
+                    for usuario_id, item_id in pares.iterator()
+                ))
+    
+    @classmethod
+    def actualizar_usuario(cls, usuario_id):
+        """Recalcular el resumen del cliente asociado a un usuario"""
+        return cls.reconstruir(Clientes.objects.filter(usuario_id=usuario_id))
+    
+    @classmethod
+    def programar_actualizacion(cls, usuario_id):
+        """
+        actualizar_usuario() en la cola de tareas, una vez aunque se pida varias. No es un
+        ajuste con F() desde la fila guardada: se recalcula el historial de ese cliente, que
+        es lo único que cubre cambios de estado, totales editados y borrados sin riesgo de
+        que el resumen se desvíe.
+        """
+        cola.encolar('resumen.actualizar_usuario', llave=f'resumen:{usuario_id}', usuario_id=usuario_id)
+
 # Modelos de Carrito
+# Vida de la copia de trabajo del carrito en caché (app_spa.carrito_temporal)
+CARRITO_CACHE_TIMEOUT = 60 * 60 * 24 * 14
+# Alias propio (settings.CACHES['carritos']): los fragmentos del catálogo no desalojan carritos
+cache_carritos = ConnectionProxy(caches, 'carritos')
+IVA = Decimal('0.08')
+
+
+class CheckoutError(Exception):
+    """El carrito no se pudo convertir en pedido (vacío, ya procesado o sin stock)"""
+
+
+def carrito_cache_key(usuario_id):
+    """Llave de caché de la copia de trabajo del carrito de un usuario (carrito_temporal)"""
+    return f"carrito:{usuario_id}"
+
+
+def invalidar_carrito_cacheado(usuario_id):
+    """Al confirmar la transacción, descartar la copia cacheada: se recarga desde Carrito"""
+    transaction.on_commit(lambda: cache_carritos.delete(carrito_cache_key(usuario_id)))
+
+
 class Carrito(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='carritos')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True)
+    # Totales desnormalizados, mantenidos por recalcular_totales() y las señales de CarritoItem
+    cantidad_items = models.PositiveIntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    
+    class Meta:
+        constraints = [
+            # Un solo carrito activo por usuario; el índice parcial también sirve al contador
+            models.UniqueConstraint(
+                fields=['usuario'], condition=models.Q(activo=True), name='un_carrito_activo_por_usuario'
+            ),
+        ]
     
     def __str__(self):
         return f"Carrito de {self.usuario.username}"
     
+    @staticmethod
+    def totales_actualizados():
+        """Expresiones de UPDATE que recalculan los totales desde las filas de items"""
+        items = CarritoItem.objects.filter(carrito=OuterRef('pk')).order_by().values('carrito')
+        precio = Case(
+            When(tipo='producto', then=F('producto__precio')),
+            default=F('servicio__precio'),
+        )
+        cantidad = items.annotate(c=Sum('cantidad')).values('c')
+        monto = items.annotate(
+            t=Sum(F('cantidad') * precio, output_field=DecimalField(max_digits=10, decimal_places=2))
+        ).values('t')
+        return {
+            'cantidad_items': Coalesce(Subquery(cantidad), 0),
+            'monto_total': Coalesce(
+                Subquery(monto), Value(Decimal('0')),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+        }
+    
+    def recalcular_totales(self):
+        """Recalcular contador y total en una sola sentencia UPDATE"""
+        if Carrito.objects.filter(pk=self.pk).update(**Carrito.totales_actualizados()):
+            self.refresh_from_db(fields=['cantidad_items', 'monto_total'])
+        invalidar_carrito_cacheado(self.usuario_id)
+    
+    def agregar_item(self, producto=None, servicio=None, cantidad=1):
+        """Agregar un producto o servicio, sumando la cantidad si ya estaba en el carrito"""
+        tipo = 'producto' if producto is not None else 'servicio'
+        with transaction.atomic():
+            item, creado = self.items.get_or_create(
+                producto=producto,
+                servicio=servicio,
+                tipo=tipo,
+                defaults={'cantidad': cantidad},
+            )
+            if not creado:
+                CarritoItem.objects.filter(pk=item.pk).update(cantidad=F('cantidad') + cantidad)
+                self.recalcular_totales()
+        return item
+    
+    def actualizar_item(self, item_id, cantidad):
+        """Cambiar la cantidad de un item; devuelve False si no pertenece al carrito"""
+        with transaction.atomic():
+            actualizado = self.items.filter(pk=item_id).update(cantidad=cantidad)
+            if actualizado:
+                self.recalcular_totales()
+        return bool(actualizado)
+    
+    def eliminar_item(self, item_id):
+        """Eliminar un item; la señal post_delete recalcula los totales"""
+        with transaction.atomic():
+            eliminados, _ = self.items.filter(pk=item_id).delete()
+        return bool(eliminados)
+    
+    def generar_pedido(self, direccion_entrega=None, telefono_contacto=None, notas=None, citas=()):
+        """
+        Convertir el carrito en un Pedido dentro de una sola transacción.
+        El stock se descuenta con UPDATE condicionales (reservas.convertir): lo que el
+        carrito tenía apartado ya está garantizado y el resto debe caber en lo disponible,
+        así que checkouts simultáneos nunca venden de más: el que llega tarde recibe CheckoutError.
+        `citas` son tuplas (servicio_id, fecha, hora) de servicios del carrito; cada una
+        toma su horario en la misma transacción (agenda.reservar) o el checkout falla.
+        """
+        with transaction.atomic():
+            # Desactivar primero toma el bloqueo de escritura y evita procesar el carrito dos veces
+            if not Carrito.objects.filter(pk=self.pk, activo=True).update(activo=False):
+                raise CheckoutError("El carrito ya fue procesado")
+            invalidar_carrito_cacheado(self.usuario_id)
+            
+            items = list(self.items.select_related('producto', 'servicio'))
+            if not items:
+                raise CheckoutError("El carrito está vacío")
+            
+            por_producto = {}
+            for item in items:
+                if item.tipo == 'producto':
+                    por_producto[item.producto_id] = por_producto.get(item.producto_id, 0) + item.cantidad
+            reservas.convertir(carrito_cache_key(self.usuario_id), por_producto)
+            if por_producto:
+                # El stock se muestra en el catálogo cacheado
+                transaction.on_commit(cache_catalogo.incrementar_version)
+            
+            subtotal = sum((item.subtotal() for item in items), Decimal('0'))
+            iva = (subtotal * IVA).quantize(Decimal('0.01'))
+            pedido = Pedido.objects.create(
+                usuario_id=self.usuario_id,
+                subtotal=subtotal,
+                iva=iva,
+                total=subtotal + iva,
+                notas=notas,
+                direccion_entrega=direccion_entrega,
+                telefono_contacto=telefono_contacto,
+            )
+            PedidoItem.objects.bulk_create([
+                PedidoItem(
+                    pedido=pedido,
+                    producto_id=item.producto_id if item.tipo == 'producto' else None,
+                    servicio_id=item.servicio_id if item.tipo == 'servicio' else None,
+                    cantidad=item.cantidad,
+                    precio=item.precio_unitario(),
+                )
+                for item in items
+            ])
+            # bulk_create no dispara post_save de PedidoItem
+            ResumenCliente.programar_actualizacion(self.usuario_id)
+            Recomendacion.programar_actualizacion()
+            if citas:
+                self._reservar_citas(pedido, items, citas)
+        self.activo = False
+        return pedido
+    
+    @staticmethod
+    def _reservar_citas(pedido, items, citas):
+        por_servicio = {item.servicio_id: item.cantidad for item in items if item.tipo == 'servicio'}
+        for servicio_id, fecha, hora in citas:
+            if not por_servicio.get(servicio_id):
+                raise CheckoutError("Solo se pueden agendar servicios que están en el carrito")
+            por_servicio[servicio_id] -= 1
+            agenda.reservar(servicio_id, fecha, hora, pedido=pedido)
+    
     def total_carrito(self):
-        return sum(item.subtotal() for item in self.items.all())
+        return self.monto_total
     
     def total_items(self):
-        return sum(item.cantidad for item in self.items.all())
+        return self.cantidad_items
+    
+    def _items_precargados(self):
+        return 'items' in getattr(self, '_prefetched_objects_cache', {})
     
     def tiene_servicios(self):
+        # Con prefetch_related('items') no consulta; las vistas async lo necesitan así
+        if self._items_precargados():
+            return any(item.tipo == 'servicio' for item in self.items.all())
         return self.items.filter(tipo='servicio').exists()
     
     def tiene_productos(self):
+        if self._items_precargados():
+            return any(item.tipo == 'producto' for item in self.items.all())
         return self.items.filter(tipo='producto').exists()
 
 class CarritoItem(models.Model):
@@ -196,6 +519,15 @@ class CarritoItem(models.Model):
     tipo = models.CharField(max_length=10, choices=TIPO_ITEM, default='producto')
     cantidad = models.IntegerField(default=1)
     
+    class Meta:
+        constraints = [
+            # Un renglón por producto o servicio en cada carrito. Sirven de destino del upsert de
+            # carrito_temporal y de índice a las búsquedas por carrito; en SQLite los NULL
+            # no chocan entre sí, así que los items del otro tipo no se estorban
+            models.UniqueConstraint(fields=['carrito', 'producto'], name='carritoitem_producto_unico'),
+            models.UniqueConstraint(fields=['carrito', 'servicio'], name='carritoitem_servicio_unico'),
+        ]
+    
     def __str__(self):
         if self.tipo == 'producto':
             return f"{self.cantidad} x {self.producto.nombre}"
@@ -228,6 +560,7 @@ class Pedido(models.Model):
         ('completado', 'Completado'),
         ('cancelado', 'Cancelado'),
     ]
+    CANCELABLES = ('pendiente', 'confirmado')
     
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pedidos')
     fecha_pedido = models.DateTimeField(auto_now_add=True)
@@ -236,6 +569,19 @@ class Pedido(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)  # Este sería el total con IVA
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
     notas = models.TextField(blank=True, null=True)
+    # Ya sumado a Coocurrencia (app_spa/recomendaciones.py)
+    en_recomendaciones = models.BooleanField(default=False, editable=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_pedido'], name='pedido_usuario_fecha_idx'),
+            models.Index(fields=['estado', '-fecha_pedido'], name='pedido_estado_fecha_idx'),
+            models.Index(fields=['fecha_pedido'], name='pedido_fecha_idx'),
+            # Solo los pedidos que faltan por sumar: se queda pequeño con cualquier historial
+            models.Index(
+                fields=['id'], condition=models.Q(en_recomendaciones=False), name='pedido_sin_recomendar_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Pedido #{self.id} - {self.usuario.username}"
@@ -247,13 +593,54 @@ class Pedido(models.Model):
     def __str__(self):
         return f"Pedido #{self.id} - {self.usuario.username}"
 
+    def cliente_asociado(self):
+        """Cliente ligado al usuario del pedido (usa el join de select_related('usuario__cliente'))"""
+        try:
+            return self.usuario.cliente
+        except Clientes.DoesNotExist:
+            return None
+    
+    def cancelable(self):
+        return self.estado in self.CANCELABLES
+
+    def cancelar(self):
+        """
+        Cancelar el pedido y devolver sus productos al stock; False si ya no estaba
+        pendiente ni confirmado. El UPDATE condicional va primero: dos cancelaciones
+        simultáneas no devuelven el stock dos veces.
+        """
+        with transaction.atomic():
+            if not Pedido.objects.filter(pk=self.pk, estado__in=self.CANCELABLES).update(estado='cancelado'):
+                return False
+            devueltos = (
+                self.items.filter(producto__isnull=False).order_by()
+                .values('producto_id').annotate(unidades=Sum('cantidad'))
+            )
+            for fila in devueltos:
+                Productos.objects.filter(pk=fila['producto_id']).update(stock=F('stock') + fila['unidades'])
+            if devueltos:
+                transaction.on_commit(cache_catalogo.incrementar_version)
+            # save() dispara las señales del cambio de estado: citas, resumen y ventas
+            self.estado = 'cancelado'
+            self.save(update_fields=['estado'])
+        return True
+
+    def items_detallados(self):
+        """Resumen en texto de los items; aprovecha prefetch_related('items') si existe"""
+        items = [f"{item.cantidad}x {item.nombre_item()}" for item in self.items.all()]
+        return ", ".join(items) if items else "Sin items"
+
     # --- MÉTODOS AYUDANTES NUEVOS (Para usar en "Mis Pedidos") ---
     def tiene_productos(self):
         """Devuelve True si el pedido incluye productos físicos"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return any(item.producto_id for item in self.items.all())
         return self.items.filter(producto__isnull=False).exists()
 
     def tiene_servicios(self):
         """Devuelve True si el pedido incluye servicios"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return any(item.servicio_id for item in self.items.all())
         return self.items.filter(servicio__isnull=False).exists()
     
 class PedidoItem(models.Model):
@@ -271,4 +658,298 @@ class PedidoItem(models.Model):
             return self.producto.nombre
         elif self.servicio:
             return self.servicio.nombre
-        return "Item"
\ No newline at end of file
+        return "Item"
+
+# Acumulados de ventas por día
+def rango_dia(fecha):
+    """Inicio y fin (exclusivo) de un día local como datetimes, para usar el índice de fecha_pedido"""
+    zona = timezone.get_current_timezone()
+    inicio = datetime.datetime.combine(fecha, datetime.time.min, tzinfo=zona)
+    return inicio, datetime.datetime.combine(fecha + datetime.timedelta(days=1), datetime.time.min, tzinfo=zona)
+
+
+def insertar_en_lotes(modelo, objetos, tamano=1000):
+    """bulk_create sobre un generador sin materializarlo completo (bulk_create haría list())"""
+    objetos = iter(objetos)
+    while lote := list(islice(objetos, tamano)):
+        modelo.objects.bulk_create(lote)
+
+
+class VentaDiaria(models.Model):
+    """
+    Ventas de un día local por estado de pedido: pedidos, subtotal, IVA y total.
+    Junto con VentaDiariaItem se recalcula por día cuando cambia un pedido del día
+    (ver signals.py) y completo con `manage.py reconstruir_ventas`; los reportes leen
+    de aquí en lugar de sumar Pedido/PedidoItem sobre todo el historial.
+    """
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20)
+    pedidos = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    iva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'estado'], name='venta_diaria_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} {self.estado}: ${self.total}"
+    
+    @classmethod
+    def recalcular_dia(cls, fecha):
+        """Regenerar los acumulados de un día a partir de sus pedidos"""
+        cls.reconstruir(fecha, fecha)
+    
+    @classmethod
+    def programar_recalculo(cls, fecha):
+        """
+        Recalcular el día en la cola de tareas. La llave junta los cambios: borrar un
+        cliente con cien pedidos del mismo día deja una sola tarea pendiente, no cien.
+        """
+        cola.encolar('ventas.recalcular_dia', llave=f'ventas:{fecha}', fecha=fecha.isoformat())
+    
+    @classmethod
+    def reconstruir(cls, desde=None, hasta=None):
+        """
+        Regenerar los acumulados entre las fechas locales `desde` y `hasta` (inclusivas;
+        todo el historial si faltan) con dos consultas agrupadas por día. El filtro se
+        hace como rango de datetimes para usar el índice de fecha_pedido.
+        """
+        pedidos = Pedido.objects.order_by()
+        acumulados = cls.objects.all()
+        items_acumulados = VentaDiariaItem.objects.all()
+        if desde:
+            pedidos = pedidos.filter(fecha_pedido__gte=rango_dia(desde)[0])
+            acumulados = acumulados.filter(fecha__gte=desde)
+            items_acumulados = items_acumulados.filter(fecha__gte=desde)
+        if hasta:
+            pedidos = pedidos.filter(fecha_pedido__lt=rango_dia(hasta)[1])
+            acumulados = acumulados.filter(fecha__lte=hasta)
+            items_acumulados = items_acumulados.filter(fecha__lte=hasta)
+        
+        dia = TruncDate('fecha_pedido', tzinfo=timezone.get_current_timezone())
+        por_dia = pedidos.annotate(dia=dia).values('dia', 'estado').annotate(
+            num=models.Count('id'), suma_subtotal=Sum('subtotal'), suma_iva=Sum('iva'), suma_total=Sum('total'),
+        )
+        importe = Sum(F('cantidad') * F('precio'), output_field=DecimalField(max_digits=14, decimal_places=2))
+        items = PedidoItem.objects.filter(pedido__in=pedidos).order_by().annotate(
+            dia=TruncDate('pedido__fecha_pedido', tzinfo=timezone.get_current_timezone()),
+        ).values(
+            'dia', 'pedido__estado', 'producto_id', 'servicio_id', 'producto__tipo_producto', 'producto__proveedor_id',
+        ).annotate(unidades=Sum('cantidad'), importe=importe)
+        
+        with transaction.atomic():
+            acumulados.delete()
+            items_acumulados.delete()
+            insertar_en_lotes(cls, (
+                cls(
+                    fecha=fila['dia'], estado=fila['estado'], pedidos=fila['num'],
+                    subtotal=fila['suma_subtotal'] or 0, iva=fila['suma_iva'] or 0, total=fila['suma_total'] or 0,
+                )
+                for fila in por_dia.iterator()
+            ))
+            insertar_en_lotes(VentaDiariaItem, (
+                VentaDiariaItem(
+                    fecha=fila['dia'], estado=fila['pedido__estado'],
+                    producto_id=fila['producto_id'], servicio_id=fila['servicio_id'],
+                    tipo_producto=fila['producto__tipo_producto'] or '',
+                    proveedor_id=fila['producto__proveedor_id'],
+                    unidades=fila['unidades'] or 0, importe=fila['importe'] or 0,
+                )
+                for fila in items.iterator()
+            ))
+        return acumulados.count()
+
+
+class VentaDiariaItem(models.Model):
+    """
+    Unidades e importe vendidos de un producto o servicio en un día, por estado.
+    tipo_producto y proveedor se copian del producto para agrupar sin joins.
+    """
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20)
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    servicio = models.ForeignKey(Servicios, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    tipo_producto = models.CharField(max_length=20, blank=True, default='')
+    proveedor = models.ForeignKey(Proveedores, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    unidades = models.PositiveIntegerField(default=0)
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha', 'estado'], name='venta_item_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} {self.producto or self.servicio}: {self.unidades}"
+
+
+class Cita(models.Model):
+    """
+    Turno de un empleado para un servicio, en hora local. Se crea con agenda.reservar(),
+    que también marca los bloques en AgendaDia; editarla o borrarla recalcula ese día.
+    """
+    ESTADO_CHOICES = [
+        ('reservada', 'Reservada'),
+        ('completada', 'Completada'),
+        ('cancelada', 'Cancelada'),
+    ]
+    
+    empleado = models.ForeignKey(Empleados, on_delete=models.CASCADE, related_name='citas')
+    servicio = models.ForeignKey(Servicios, on_delete=models.CASCADE, related_name='citas')
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, null=True, blank=True, related_name='citas')
+    fecha = models.DateField()
+    inicio = models.TimeField()
+    fin = models.TimeField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='reservada')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['empleado', 'fecha'], name='cita_empleado_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.servicio} con {self.empleado} el {self.fecha} a las {self.inicio:%H:%M}"
+
+
+class AgendaDia(models.Model):
+    """
+    Ocupación de un empleado en un día: un bit por bloque de agenda.RESOLUCION minutos,
+    marcado si alguna cita reservada lo cubre. Un día sin fila está libre.
+    """
+    empleado = models.ForeignKey(Empleados, on_delete=models.CASCADE, related_name='agenda')
+    fecha = models.DateField()
+    ocupacion = models.BinaryField(default=b'')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empleado', 'fecha'], name='agenda_dia_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.empleado} {self.fecha}"
+
+
+class ReservaStock(models.Model):
+    """
+    Unidades de un producto apartadas por un carrito hasta `expira`. `llave` es la llave
+    de caché del carrito (carrito_temporal). Productos.reservado es la suma de las reservas
+    de cada producto; app_spa/reservas.py actualiza ambos en la misma transacción.
+    """
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='reservas')
+    llave = models.CharField(max_length=100)
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['llave', 'producto'], name='reserva_stock_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['expira'], name='reserva_stock_expira_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.producto}: {self.cantidad} hasta {self.expira:%H:%M}"
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano de la cola (app_spa/cola.py). Los tiempos guardan la
+    latencia: creada -> iniciada es la espera en la cola, iniciada -> terminada la ejecución.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('hecha', 'Hecha'),
+        ('fallida', 'Fallida'),
+        ('descartada', 'Descartada'),
+    ]
+    
+    nombre = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict)
+    # Idempotencia: solo puede haber una pendiente por llave
+    llave = models.CharField(max_length=200, blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(blank=True, null=True)
+    terminada = models.DateTimeField(blank=True, null=True)
+    trabajador = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['llave'], condition=models.Q(estado='pendiente'), name='tarea_pendiente_unica'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['estado', 'disponible_en'], name='tarea_estado_disponible_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.estado})"
+
+
+class Coocurrencia(models.Model):
+    """
+    Pedidos en los que aparecen juntos dos items, con las claves del carrito (p-12, s-3).
+    Cada par se guarda en los dos sentidos y la fila con item == vecino cuenta los pedidos
+    del item. Es la matriz dispersa item×item de app_spa/recomendaciones.py.
+    """
+    item = models.CharField(max_length=12)
+    vecino = models.CharField(max_length=12)
+    pedidos = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'vecino'], name='coocurrencia_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.item} + {self.vecino}: {self.pedidos}"
+
+
+class Recomendacion(models.Model):
+    """
+    Los items que más se compran junto con `item`, en orden de `posicion`. El vecino es
+    un producto o un servicio, como en PedidoItem, para traerlo con select_related en la
+    misma consulta. Lo escribe app_spa/recomendaciones.py a partir de Coocurrencia.
+    """
+    item = models.CharField(max_length=12)
+    posicion = models.PositiveSmallIntegerField()
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    servicio = models.ForeignKey(Servicios, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    pedidos = models.PositiveIntegerField()
+    puntaje = models.FloatField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'posicion'], name='recomendacion_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.item} -> {self.producto or self.servicio}"
+    
+    @property
+    def objeto(self):
+        return self.producto or self.servicio
+    
+    @property
+    def tipo(self):
+        return 'producto' if self.producto_id else 'servicio'
+    
+    @classmethod
+    def programar_actualizacion(cls):
+        """Sumar los pedidos nuevos en la cola de tareas, una vez aunque se pida varias"""
+        cola.encolar('recomendaciones.actualizar', llave='recomendaciones')
+
+
+# Al final: agenda, cola y reservas importan modelos de este módulo, que ya están definidos
+from . import agenda, cola, reservas  # noqa: E402
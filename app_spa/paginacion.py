@@ -0,0 +1,215 @@
+"""
+Paginación por cursor (keyset) para los listados de admin-spa, la tienda y mis_pedidos.
+
+En lugar de OFFSET, cada página se pide "después de" (o "antes de") los valores de
+la llave de orden de la última (o primera) fila vista. La consulta es un rango sobre
+un índice y cuesta lo mismo en la página 1 que en la 10.000.
+La llave siempre termina en la llave primaria para que el orden sea total y los
+cursores estables aunque se inserten filas; los campos de la llave no deben ser nulos.
+Los cursores son JSON en base64 url-safe; uno inválido simplemente reinicia el listado.
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import Clientes, Empleados, Pedido, Productos, Proveedores, Servicios
+
+PARAMETRO_CURSOR = 'cursor'
+PARAMETRO_ORDEN = 'orden'
+
+
+@dataclass
+class PaginaKeyset:
+    objetos: list
+    siguiente: str = None
+    anterior: str = None
+    orden: str = ''
+    ordenes: dict = field(default_factory=dict)
+    filtros: dict = field(default_factory=dict)
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+class Listado:
+    """
+    ordenes: {clave: (etiqueta, ('-campo', '-pk'))}; la primera es la predeterminada.
+    filtros: {parametro GET: (etiqueta, lookup)}; valores vacíos se ignoran.
+    """
+
+    def __init__(self, modelo, ordenes, filtros=None, por_pagina=50):
+        self.modelo = modelo
+        self.ordenes = ordenes
+        self.filtros = filtros or {}
+        self.por_pagina = por_pagina
+
+    def paginar(self, queryset, parametros):
+        """`parametros` es request.GET: orden, cursor y los filtros declarados"""
+        consulta, estado = self._preparar(queryset, parametros)
+        return self._pagina(list(consulta), **estado)
+
+    async def apaginar(self, queryset, parametros):
+        """paginar() para vistas async: la página se lee con el ORM asíncrono"""
+        consulta, estado = self._preparar(queryset, parametros)
+        return self._pagina([fila async for fila in consulta], **estado)
+
+    def _preparar(self, queryset, parametros):
+        orden = parametros.get(PARAMETRO_ORDEN)
+        if orden not in self.ordenes:
+            orden = next(iter(self.ordenes))
+        llave = [self._nombre_pk(campo) for campo in self.ordenes[orden][1]]
+
+        activos = {}
+        for parametro, (_, lookup) in self.filtros.items():
+            valor = parametros.get(parametro, '').strip()
+            if not valor:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: valor})
+            except (ValueError, ValidationError):
+                # Valor que no corresponde al tipo del campo: se ignora el filtro
+                continue
+            activos[parametro] = valor
+
+        direccion, valores = self._leer_cursor(parametros.get(PARAMETRO_CURSOR), llave)
+        hacia_atras = direccion == 'anterior'
+        orden_sql = [self._invertir(campo) for campo in llave] if hacia_atras else llave
+        if valores is not None:
+            queryset = queryset.filter(self._despues_de(orden_sql, valores))
+
+        # Una fila extra indica si hay otra página en esa dirección
+        consulta = queryset.order_by(*orden_sql)[:self.por_pagina + 1]
+        return consulta, {
+            'orden': orden, 'llave': llave, 'activos': activos,
+            'hacia_atras': hacia_atras, 'con_cursor': valores is not None,
+        }
+
+    def _pagina(self, filas, orden, llave, activos, hacia_atras, con_cursor):
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+        if hacia_atras:
+            filas.reverse()
+
+        pagina = PaginaKeyset(
+            objetos=filas,
+            orden=orden,
+            ordenes={clave: etiqueta for clave, (etiqueta, _) in self.ordenes.items()},
+            filtros={parametro: (etiqueta, activos.get(parametro, '')) for parametro, (etiqueta, _) in self.filtros.items()},
+        )
+        if filas:
+            if hay_mas or (hacia_atras and con_cursor):
+                pagina.siguiente = self._cursor('siguiente', filas[-1], llave)
+            if (not hacia_atras and con_cursor) or (hacia_atras and hay_mas):
+                pagina.anterior = self._cursor('anterior', filas[0], llave)
+        return pagina
+
+    def _nombre_pk(self, campo):
+        descendente = campo.startswith('-')
+        nombre = campo.lstrip('-')
+        if nombre == 'pk':
+            nombre = self.modelo._meta.pk.name
+        return f"-{nombre}" if descendente else nombre
+
+    @staticmethod
+    def _invertir(campo):
+        return campo[1:] if campo.startswith('-') else f"-{campo}"
+
+    @classmethod
+    def _despues_de(cls, orden_sql, valores):
+        """
+        Filas estrictamente posteriores a `valores` en el orden dado, escrito como
+        "a <= v AND NOT (a = v AND NOT <resto posterior>)": el rango sobre el primer
+        campo deja que SQLite recorra el índice en orden, algo que un OR de
+        comparaciones lexicográficas no permite.
+        """
+        campo, valor = orden_sql[0], valores[0]
+        nombre = campo.lstrip('-')
+        descendente = campo.startswith('-')
+        if len(orden_sql) == 1:
+            return Q(**{f"{nombre}__{'lt' if descendente else 'gt'}": valor})
+        resto = cls._despues_de(orden_sql[1:], valores[1:])
+        return Q(**{f"{nombre}__{'lte' if descendente else 'gte'}": valor}) & ~(Q(**{nombre: valor}) & ~resto)
+
+    @staticmethod
+    def _serializar(valor):
+        # isoformat completo: DjangoJSONEncoder recorta a milisegundos y el cursor saltaría filas
+        if isinstance(valor, (datetime.date, datetime.time)):
+            return valor.isoformat()
+        return str(valor)
+
+    def _cursor(self, direccion, objeto, llave):
+        valores = [getattr(objeto, campo.lstrip('-')) for campo in llave]
+        texto = json.dumps([direccion, valores], default=self._serializar, separators=(',', ':'))
+        return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+    def _leer_cursor(self, cursor, llave):
+        if not cursor:
+            return 'siguiente', None
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            direccion, valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            if direccion not in ('siguiente', 'anterior') or len(valores) != len(llave):
+                raise ValueError
+            valores = [
+                self.modelo._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(llave, valores)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return 'siguiente', None
+        return direccion, valores
+
+
+CLIENTES = Listado(
+    Clientes,
+    ordenes={
+        'recientes': ('Registro más reciente', ('-fecha_registro', '-pk')),
+        'antiguos': ('Registro más antiguo', ('fecha_registro', 'pk')),
+        'id': ('ID', ('pk',)),
+    },
+    filtros={'email': ('Email', 'email__istartswith')},
+)
+PRODUCTOS = Listado(
+    Productos,
+    ordenes={'recientes': ('Más recientes', ('-pk',)), 'id': ('ID', ('pk',))},
+    filtros={'tipo': ('Tipo', 'tipo_producto')},
+)
+# Cuatro columnas en la tienda: páginas de filas completas
+TIENDA = Listado(
+    Productos,
+    ordenes={'recientes': ('Más recientes', ('-pk',))},
+    por_pagina=24,
+)
+SERVICIOS = Listado(
+    Servicios,
+    ordenes={'recientes': ('Más recientes', ('-pk',)), 'id': ('ID', ('pk',))},
+)
+EMPLEADOS = Listado(
+    Empleados,
+    ordenes={'recientes': ('Más recientes', ('-pk',)), 'id': ('ID', ('pk',))},
+    filtros={'servicio': ('Servicio (ID)', 'servicio_id')},
+)
+PROVEEDORES = Listado(
+    Proveedores,
+    ordenes={'recientes': ('Más recientes', ('-pk',)), 'id': ('ID', ('pk',))},
+)
+# El desempate por pk va en sentido contrario a la fecha: así coincide con el orden de
+# pedido_usuario_fecha_idx (usuario, -fecha_pedido, rowid) y mis_pedidos no necesita ordenar
+PEDIDOS = Listado(
+    Pedido,
+    ordenes={
+        'recientes': ('Más recientes', ('-fecha_pedido', 'pk')),
+        'antiguos': ('Más antiguos', ('fecha_pedido', '-pk')),
+    },
+    filtros={'estado': ('Estado', 'estado')},
+    por_pagina=20,
+)
@@ -0,0 +1,243 @@
+"""
+"Los clientes también compraron": recomendaciones por coocurrencia en PedidoItem.
+
+Contar en cada página los pedidos que comparten items sería recorrer todo el historial.
+En su lugar:
+- Coocurrencia guarda la matriz dispersa item×item (productos y servicios): en cuántos
+  pedidos aparecen juntos dos items. reconstruir() la calcula desde cero, con
+  NumPy/SciPy si están instalados (X.T @ X sobre la matriz pedido×item); si no, con
+  contadores de Python.
+- actualizar() suma solo los pedidos nuevos (Pedido.en_recomendaciones=False) y lo corre
+  la cola de tareas después de cada checkout.
+- Recomendacion guarda los VECINOS mejores de cada item, ordenados por similitud coseno
+  (pedidos juntos / raíz del producto de los pedidos de cada uno), para que un artículo
+  popular no aparezca en todas partes.
+- para()/apara() sirven las recomendaciones con una consulta al índice único de
+  Recomendacion, que ya trae el producto o servicio.
+Al sumar pedidos nuevos solo se recalculan los vecinos de sus items: el puntaje de los
+demás puede quedar un poco desactualizado hasta la siguiente reconstrucción.
+"""
+import heapq
+import math
+from collections import defaultdict
+from itertools import chain, combinations, groupby
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from .carrito_temporal import clave_item, partir_clave
+from .models import Coocurrencia, Pedido, PedidoItem, Productos, Recomendacion, Servicios, insertar_en_lotes
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:  # Opcional: sin SciPy la matriz se cuenta en Python
+    numpy = sparse = None
+
+VECINOS = 8
+# Pares que coinciden en menos pedidos son ruido
+MINIMO_PEDIDOS = 2
+LOTE_PEDIDOS = 500
+TAMANO_LOTE = 5000
+
+
+def filas_de(items):
+    """(pedido_id, producto_id, servicio_id) de un queryset de PedidoItem, con 0 en lugar de NULL"""
+    return items.order_by('pedido_id').values_list(
+        'pedido_id', Coalesce('producto_id', Value(0)), Coalesce('servicio_id', Value(0)),
+    ).iterator(chunk_size=TAMANO_LOTE)
+
+
+def contar(filas):
+    """
+    Matriz item×item de pedidos en común, como {item: {vecino: pedidos}}; la diagonal
+    son los pedidos de cada item. `filas` como las de filas_de(), ordenadas por pedido.
+    """
+    if sparse is None:
+        return contar_python(filas)
+    return contar_scipy(numpy.fromiter(chain.from_iterable(filas), dtype=numpy.int64).reshape(-1, 3))
+
+
+def contar_python(filas):
+    matriz = defaultdict(lambda: defaultdict(int))
+    for _, lineas in groupby(filas, key=lambda fila: fila[0]):
+        # Un item repetido en el pedido cuenta una vez
+        canasta = sorted({
+            clave_item('producto', producto_id) if producto_id else clave_item('servicio', servicio_id)
+            for _, producto_id, servicio_id in lineas
+        })
+        for item in canasta:
+            matriz[item][item] += 1
+        for item, vecino in combinations(canasta, 2):
+            matriz[item][vecino] += 1
+            matriz[vecino][item] += 1
+    return {item: dict(fila) for item, fila in matriz.items()}
+
+
+def contar_scipy(datos):
+    if not len(datos):
+        return {}
+    # Productos en los códigos pares y servicios en los impares: una sola columna por item
+    codigos = numpy.where(datos[:, 1] > 0, datos[:, 1] * 2, datos[:, 2] * 2 + 1)
+    pedidos, fila = numpy.unique(datos[:, 0], return_inverse=True)
+    codigos, columna = numpy.unique(codigos, return_inverse=True)
+    x = sparse.csr_matrix(
+        (numpy.ones(len(fila), dtype=numpy.int32), (fila, columna)), shape=(len(pedidos), len(codigos)),
+    )
+    x.sum_duplicates()
+    x.data[:] = 1
+    c = (x.T @ x).tocsr()
+
+    claves = [
+        clave_item('servicio' if codigo % 2 else 'producto', codigo // 2) for codigo in codigos.tolist()
+    ]
+    return {
+        claves[i]: dict(zip(
+            (claves[j] for j in c.indices[c.indptr[i]:c.indptr[i + 1]].tolist()),
+            c.data[c.indptr[i]:c.indptr[i + 1]].tolist(),
+        ))
+        for i in range(len(claves))
+    }
+
+
+def vecinos(item, fila, frecuencias, cuantos=VECINOS):
+    """Los `cuantos` mejores vecinos de `item` como (puntaje, pedidos, vecino)"""
+    propios = frecuencias[item]
+    return heapq.nlargest(cuantos, (
+        (pedidos / math.sqrt(propios * frecuencias[vecino]), pedidos, vecino)
+        for vecino, pedidos in fila.items()
+        if vecino != item and pedidos >= MINIMO_PEDIDOS
+    ))
+
+
+def _guardar_recomendaciones(matriz, frecuencias, items, borrar=True):
+    """Reemplazar las filas de Recomendacion de `items`"""
+    mejores = {item: vecinos(item, matriz[item], frecuencias) for item in items}
+    # Coocurrencia puede guardar items ya borrados del catálogo
+    candidatos = {partir_clave(vecino) for fila in mejores.values() for _, _, vecino in fila}
+    existentes = {
+        ('producto', pk) for pk in Productos.objects.filter(
+            pk__in=[pk for tipo, pk in candidatos if tipo == 'producto'],
+        ).values_list('pk', flat=True)
+    } | {
+        ('servicio', pk) for pk in Servicios.objects.filter(
+            pk__in=[pk for tipo, pk in candidatos if tipo == 'servicio'],
+        ).values_list('pk', flat=True)
+    }
+
+    nuevas = []
+    for item, fila in mejores.items():
+        posicion = 0
+        for puntaje, pedidos, vecino in fila:
+            tipo, pk = partir_clave(vecino)
+            if (tipo, pk) not in existentes:
+                continue
+            nuevas.append(Recomendacion(
+                item=item, posicion=posicion, pedidos=pedidos, puntaje=puntaje,
+                producto_id=pk if tipo == 'producto' else None,
+                servicio_id=pk if tipo == 'servicio' else None,
+            ))
+            posicion += 1
+    if borrar:
+        Recomendacion.objects.filter(item__in=items).delete()
+    Recomendacion.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+    return len(nuevas)
+
+
+def reconstruir():
+    """
+    Coocurrencia y Recomendacion desde cero con todos los pedidos. Devuelve
+    (pedidos, pares, recomendaciones).
+    """
+    with transaction.atomic():
+        # Marcar primero: un pedido que se confirme mientras tanto queda para actualizar()
+        Pedido.objects.filter(en_recomendaciones=False).update(en_recomendaciones=True)
+        pedidos = Pedido.objects.filter(en_recomendaciones=True).count()
+        matriz = contar(filas_de(PedidoItem.objects.filter(pedido__en_recomendaciones=True)))
+
+        Coocurrencia.objects.all().delete()
+        insertar_en_lotes(Coocurrencia, (
+            Coocurrencia(item=item, vecino=vecino, pedidos=cuantos)
+            for item, fila in matriz.items()
+            for vecino, cuantos in fila.items()
+        ), TAMANO_LOTE)
+        frecuencias = {item: fila[item] for item, fila in matriz.items()}
+        Recomendacion.objects.all().delete()
+        guardadas = _guardar_recomendaciones(matriz, frecuencias, list(matriz), borrar=False)
+    return pedidos, sum(len(fila) for fila in matriz.values()), guardadas
+
+
+def actualizar(limite=LOTE_PEDIDOS):
+    """
+    Sumar a Coocurrencia hasta `limite` pedidos que faltan y recalcular los vecinos de sus
+    items. Devuelve cuántos pedidos sumó.
+    """
+    with transaction.atomic():
+        # El bloqueo evita que dos workers sumen el mismo pedido
+        pks = list(
+            Pedido.objects.select_for_update().filter(en_recomendaciones=False)
+            .order_by('pk').values_list('pk', flat=True)[:limite]
+        )
+        if not pks:
+            return 0
+        Pedido.objects.filter(pk__in=pks).update(en_recomendaciones=True)
+        nuevos = contar(filas_de(PedidoItem.objects.filter(pedido_id__in=pks)))
+        if not nuevos:
+            return len(pks)
+
+        matriz = defaultdict(dict)
+        existentes = Coocurrencia.objects.filter(item__in=nuevos).values_list('item', 'vecino', 'pedidos')
+        for item, vecino, pedidos in existentes:
+            matriz[item][vecino] = pedidos
+        cambios = []
+        for item, fila in nuevos.items():
+            for vecino, pedidos in fila.items():
+                matriz[item][vecino] = matriz[item].get(vecino, 0) + pedidos
+                cambios.append(Coocurrencia(item=item, vecino=vecino, pedidos=matriz[item][vecino]))
+        Coocurrencia.objects.bulk_create(
+            cambios, update_conflicts=True, unique_fields=['item', 'vecino'], update_fields=['pedidos'],
+            batch_size=TAMANO_LOTE,
+        )
+
+        frecuencias = {item: matriz[item][item] for item in nuevos}
+        faltan = {vecino for item in nuevos for vecino in matriz[item]} - frecuencias.keys()
+        frecuencias.update(
+            Coocurrencia.objects.filter(item__in=faltan, vecino=F('item')).values_list('item', 'pedidos')
+        )
+        _guardar_recomendaciones(matriz, frecuencias, list(nuevos))
+    return len(pks)
+
+
+def _consulta(claves):
+    return Recomendacion.objects.filter(item__in=claves).select_related('producto__proveedor', 'servicio')
+
+
+def _combinar(recomendaciones, claves, limite):
+    """Vecinos de varios items en uno: se suman los puntajes y se quitan los que ya están en `claves`"""
+    puntajes, por_clave = defaultdict(float), {}
+    for recomendacion in recomendaciones:
+        clave = clave_item(recomendacion.tipo, recomendacion.producto_id or recomendacion.servicio_id)
+        if clave in claves:
+            continue
+        if recomendacion.producto_id and recomendacion.producto.disponible() < 1:
+            continue
+        puntajes[clave] += recomendacion.puntaje
+        por_clave.setdefault(clave, recomendacion)
+    mejores = heapq.nlargest(limite, puntajes, key=lambda clave: (puntajes[clave], clave))
+    return [por_clave[clave] for clave in mejores]
+
+
+def para(claves, limite=VECINOS):
+    """Recomendacion (con .objeto y .tipo) para quien tiene o mira los items de `claves`"""
+    claves = set(claves)
+    if not claves:
+        return []
+    return _combinar(_consulta(claves), claves, limite)
+
+
+async def apara(claves, limite=VECINOS):
+    claves = set(claves)
+    if not claves:
+        return []
+    return _combinar([recomendacion async for recomendacion in _consulta(claves)], claves, limite)
@@ -0,0 +1,316 @@
+"""
+Medición por petición: consultas SQL, render de plantillas y tiempo total.
+
+MedicionRendimiento mide una fracción de las peticiones (settings.PERF_MUESTREO) y las
+responde con Server-Timing (db, tpl, app, total y las plantillas más costosas, p. ej.
+navbar.html o footer.html), que el navegador muestra en la pestaña de red. Además
+acumula en la memoria de este proceso las latencias por ruta, las peticiones lentas y
+las consultas agrupadas por huella (el SQL con literales y listas IN normalizados), y
+escribe una línea JSON por petición medida en el logger app_spa.rendimiento.
+La vista panel_rendimiento (admin-spa/perf/) muestra el resumen.
+
+Una petición no muestreada solo paga un random() y la lectura de una ContextVar por
+consulta y por plantilla. La medición viaja en la ContextVar, así que también cubre
+las consultas de las vistas async, que corren en el hilo de sync_to_async.
+"""
+import collections
+import functools
+import json
+import logging
+import random
+import re
+import statistics
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.backends.signals import connection_created
+from django.shortcuts import redirect, render
+from django.template.base import Template
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+logger = logging.getLogger(__name__)
+
+_actual = ContextVar('medicion_rendimiento', default=None)
+
+MUESTRAS_POR_RUTA = 500
+MAX_RUTAS = 300
+MAX_HUELLAS = 500
+PETICIONES_LENTAS = 100
+CONSULTAS_POR_PETICION = 5
+PLANTILLAS_EN_CABECERA = 3
+TOP = 20
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def huella(sql):
+    """SQL normalizado: la misma consulta con otros valores da la misma huella"""
+    sql = _CADENAS.sub('?', sql).replace('%s', '?')
+    sql = _NUMEROS.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 2)
+
+
+class Medicion:
+    __slots__ = ('inicio', 'consultas', 'sql', 'sql_en_plantillas', 'plantillas', 'tpl', 'pila')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = []
+        self.sql = 0.0
+        self.sql_en_plantillas = 0.0
+        self.plantillas = collections.Counter()
+        self.tpl = 0.0
+        # Tiempo de las plantillas hijas de cada plantilla abierta (includes, extends)
+        self.pila = []
+
+    def consulta(self, sql, duracion):
+        self.consultas.append((duracion, sql))
+        self.sql += duracion
+        if self.pila:
+            # Consulta perezosa durante el render: ya cuenta dentro de tpl
+            self.sql_en_plantillas += duracion
+
+    def plantilla(self, nombre, duracion):
+        """duracion es inclusiva; a la plantilla se le atribuye solo lo que no fue de sus hijas"""
+        hijas = self.pila.pop()
+        self.plantillas[nombre or '<cadena>'] += duracion - hijas
+        if self.pila:
+            self.pila[-1] += duracion
+        else:
+            self.tpl += duracion
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consulta(sql, time.perf_counter() - inicio)
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    # connection_created se repite en cada reconexión del mismo DatabaseWrapper
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+def _instalar_en_plantillas():
+    """
+    Envolver Template._render, igual que hace el entorno de pruebas de Django: es el punto
+    por el que pasan la plantilla principal, su {% extends %} y cada {% include %}
+    """
+    original = Template._render
+    if getattr(original, 'medido', False):
+        return
+
+    @functools.wraps(original)
+    def _render(self, context):
+        medicion = _actual.get()
+        if medicion is None:
+            return original(self, context)
+        medicion.pila.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            medicion.plantilla(self.name, time.perf_counter() - inicio)
+
+    _render.medido = True
+    Template._render = _render
+
+
+class Registro:
+    """Acumulados de este proceso; con varios workers cada uno tiene los suyos"""
+
+    def __init__(self):
+        self.candado = threading.Lock()
+        self._vaciar()
+
+    def _vaciar(self):
+        self.desde = timezone.now()
+        self.medidas = 0
+        # ruta: deque de (total, db, consultas)
+        self.rutas = {}
+        # huella: [veces, total, máximo]
+        self.huellas = {}
+        self.lentas = collections.deque(maxlen=PETICIONES_LENTAS)
+
+    def reiniciar(self):
+        with self.candado:
+            self._vaciar()
+
+    def agregar(self, ruta, total, medicion, resumen):
+        consultas = [(huella(sql), duracion) for duracion, sql in medicion.consultas]
+        with self.candado:
+            self.medidas += 1
+            muestras = self.rutas.get(ruta)
+            if muestras is None:
+                if len(self.rutas) >= MAX_RUTAS:
+                    return
+                muestras = self.rutas[ruta] = collections.deque(maxlen=MUESTRAS_POR_RUTA)
+            muestras.append((total, medicion.sql, len(consultas)))
+            for sql, duracion in consultas:
+                acumulado = self.huellas.get(sql)
+                if acumulado is None:
+                    if len(self.huellas) >= MAX_HUELLAS:
+                        continue
+                    acumulado = self.huellas[sql] = [0, 0.0, 0.0]
+                acumulado[0] += 1
+                acumulado[1] += duracion
+                acumulado[2] = max(acumulado[2], duracion)
+            if total * 1000 >= settings.PERF_PETICION_LENTA_MS:
+                self.lentas.append(resumen)
+
+    def rutas_por_p95(self, limite=TOP):
+        with self.candado:
+            copia = {ruta: list(muestras) for ruta, muestras in self.rutas.items()}
+        filas = []
+        for ruta, muestras in copia.items():
+            totales = sorted(total for total, _, _ in muestras)
+            p95 = statistics.quantiles(totales, n=20)[-1] if len(totales) > 1 else totales[0]
+            filas.append({
+                'ruta': ruta,
+                'peticiones': len(totales),
+                'p50': _ms(statistics.median(totales)),
+                'p95': _ms(p95),
+                'maximo': _ms(totales[-1]),
+                'db': _ms(sum(db for _, db, _ in muestras) / len(muestras)),
+                'consultas': round(sum(n for _, _, n in muestras) / len(muestras), 1),
+            })
+        return sorted(filas, key=lambda fila: fila['p95'], reverse=True)[:limite]
+
+    def huellas_por_tiempo(self, limite=TOP):
+        with self.candado:
+            copia = [(sql, *valores) for sql, valores in self.huellas.items()]
+        copia.sort(key=lambda fila: fila[2], reverse=True)
+        return [
+            {'huella': sql, 'veces': veces, 'total': _ms(total), 'promedio': _ms(total / veces), 'maximo': _ms(maximo)}
+            for sql, veces, total, maximo in copia[:limite]
+        ]
+
+    def peticiones_lentas(self):
+        with self.candado:
+            return list(reversed(self.lentas))
+
+
+registro = Registro()
+
+
+class MedicionRendimiento:
+    """Va primero en MIDDLEWARE para que el total incluya al resto de los middleware"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='app_spa.rendimiento')
+        _instalar_en_plantillas()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if random.random() >= settings.PERF_MUESTREO:
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self.terminar(request, respuesta, medicion)
+
+    async def _acall(self, request):
+        if random.random() >= settings.PERF_MUESTREO:
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self.terminar(request, respuesta, medicion)
+
+    def terminar(self, request, respuesta, medicion):
+        total = time.perf_counter() - medicion.inicio
+        app = max(total - medicion.tpl - (medicion.sql - medicion.sql_en_plantillas), 0.0)
+        coincidencia = request.resolver_match
+        ruta = f"{request.method} /{coincidencia.route}" if coincidencia else f"{request.method} (sin ruta)"
+        plantillas = medicion.plantillas.most_common(PLANTILLAS_EN_CABECERA)
+
+        metricas = [
+            f'db;dur={_ms(medicion.sql)};desc="{len(medicion.consultas)} consultas"',
+            f'tpl;dur={_ms(medicion.tpl)}',
+            f'app;dur={_ms(app)}',
+            f'total;dur={_ms(total)}',
+        ]
+        metricas += [f'tpl{i};dur={_ms(duracion)};desc="{nombre}"' for i, (nombre, duracion) in enumerate(plantillas, 1)]
+        respuesta.headers['Server-Timing'] = ', '.join(
+            filter(None, [respuesta.headers.get('Server-Timing'), ', '.join(metricas)])
+        )
+
+        lentas = sorted(medicion.consultas, key=lambda consulta: consulta[0], reverse=True)[:CONSULTAS_POR_PETICION]
+        resumen = {
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'ruta': ruta,
+            'path': request.path,
+            'estado': respuesta.status_code,
+            'total_ms': _ms(total),
+            'db_ms': _ms(medicion.sql),
+            'consultas': len(medicion.consultas),
+            'tpl_ms': _ms(medicion.tpl),
+            'app_ms': _ms(app),
+            'plantillas': {nombre: _ms(duracion) for nombre, duracion in plantillas},
+            'consultas_lentas': [{'ms': _ms(duracion), 'huella': huella(sql)} for duracion, sql in lentas],
+        }
+        registro.agregar(ruta, total, medicion, resumen)
+
+        # Serializar solo si el nivel se va a escribir: por defecto INFO está apagado
+        nivel = logging.WARNING if total * 1000 >= settings.PERF_PETICION_LENTA_MS else logging.INFO
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, json.dumps(resumen, ensure_ascii=False))
+        if not logger.isEnabledFor(logging.WARNING):
+            return respuesta
+        for duracion, sql in lentas:
+            if duracion * 1000 < settings.PERF_CONSULTA_LENTA_MS:
+                break
+            logger.warning(json.dumps(
+                {'consulta_lenta_ms': _ms(duracion), 'ruta': ruta, 'huella': huella(sql)}, ensure_ascii=False,
+            ))
+        return respuesta
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def panel_rendimiento(request):
+    """Rutas por p95, huellas de consultas y peticiones lentas de este proceso; POST reinicia"""
+    if request.method == 'POST':
+        registro.reiniciar()
+        return redirect('panel_rendimiento')
+    return render(request, 'admin/rendimiento/panel.html', {
+        'rutas': registro.rutas_por_p95(),
+        'huellas': registro.huellas_por_tiempo(),
+        'lentas': registro.peticiones_lentas(),
+        'desde': registro.desde,
+        'medidas': registro.medidas,
+        'muestreo': settings.PERF_MUESTREO,
+        'peticion_lenta_ms': settings.PERF_PETICION_LENTA_MS,
+    })
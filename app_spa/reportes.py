@@ -0,0 +1,105 @@
+"""
+Reportes de ventas para staff, calculados solo sobre los acumulados diarios
+(VentaDiaria / VentaDiariaItem): doce meses son unos cientos de filas, no millones de items.
+"""
+import datetime
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .models import Pedido, Productos, VentaDiaria, VentaDiariaItem
+
+MESES_POR_DEFECTO = 12
+TOP = 10
+
+
+def periodo(meses):
+    """Del primer día de hace `meses - 1` meses hasta hoy (fechas locales)"""
+    hoy = timezone.localdate()
+    anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - (meses - 1), 12)
+    return datetime.date(anio, mes + 1, 1), hoy
+
+
+def _con_porcentaje(filas, campo):
+    maximo = max((fila[campo] or 0 for fila in filas), default=0)
+    for fila in filas:
+        fila['porcentaje'] = round((fila[campo] or 0) * 100 / maximo, 1) if maximo else 0
+    return filas
+
+
+def resumen_ventas(desde, hasta, estados):
+    dias = VentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta, estado__in=estados)
+    items = VentaDiariaItem.objects.filter(fecha__gte=desde, fecha__lte=hasta, estado__in=estados)
+    totales = dias.aggregate(pedidos=Sum('pedidos'), subtotal=Sum('subtotal'), iva=Sum('iva'), total=Sum('total'))
+
+    mensual = list(
+        dias.annotate(mes=TruncMonth('fecha')).values('mes')
+        .annotate(pedidos=Sum('pedidos'), iva=Sum('iva'), total=Sum('total')).order_by('mes')
+    )
+    por_estado = list(dias.values('estado').annotate(pedidos=Sum('pedidos'), total=Sum('total')).order_by('-total'))
+    productos = list(
+        items.filter(producto__isnull=False).values('producto_id', 'producto__nombre')
+        .annotate(unidades=Sum('unidades'), importe=Sum('importe')).order_by('-importe')[:TOP]
+    )
+    servicios = list(
+        items.filter(servicio__isnull=False).values('servicio_id', 'servicio__nombre')
+        .annotate(unidades=Sum('unidades'), importe=Sum('importe')).order_by('-importe')[:TOP]
+    )
+    por_tipo = list(
+        items.exclude(tipo_producto='').values('tipo_producto')
+        .annotate(unidades=Sum('unidades'), importe=Sum('importe')).order_by('-importe')
+    )
+    por_proveedor = list(
+        items.filter(proveedor__isnull=False).values('proveedor_id', 'proveedor__nombre_empresa')
+        .annotate(unidades=Sum('unidades'), importe=Sum('importe'), productos=Count('producto', distinct=True))
+        .order_by('-importe')[:TOP]
+    )
+    # Cada fila lleva 'nombre' para que la plantilla de barras sirva a todas las secciones
+    nombres_tipo = dict(Productos.TIPO_PRODUCTO)
+    nombres_estado = dict(Pedido.ESTADO_CHOICES)
+    for fila in productos:
+        fila['nombre'] = fila['producto__nombre']
+    for fila in servicios:
+        fila['nombre'] = fila['servicio__nombre']
+    for fila in por_proveedor:
+        fila['nombre'] = fila['proveedor__nombre_empresa']
+    for fila in por_tipo:
+        fila['nombre'] = nombres_tipo.get(fila['tipo_producto'], fila['tipo_producto'])
+    for fila in por_estado:
+        fila['nombre'] = nombres_estado.get(fila['estado'], fila['estado'])
+    return {
+        'totales': totales,
+        'mensual': _con_porcentaje(mensual, 'total'),
+        'por_estado': por_estado,
+        'productos': _con_porcentaje(productos, 'importe'),
+        'servicios': _con_porcentaje(servicios, 'importe'),
+        'por_tipo': _con_porcentaje(por_tipo, 'importe'),
+        'por_proveedor': _con_porcentaje(por_proveedor, 'importe'),
+    }
+
+
+@staff_member_required
+@require_GET
+def dashboard_ventas(request):
+    """?meses=12&cancelados=1 (los pedidos cancelados se excluyen por defecto)"""
+    try:
+        meses = min(max(int(request.GET.get('meses', MESES_POR_DEFECTO)), 1), 60)
+    except ValueError:
+        meses = MESES_POR_DEFECTO
+    incluir_cancelados = request.GET.get('cancelados') == '1'
+    estados = [clave for clave, _ in Pedido.ESTADO_CHOICES if incluir_cancelados or clave != 'cancelado']
+    desde, hasta = periodo(meses)
+
+    contexto = resumen_ventas(desde, hasta, estados)
+    contexto.update({
+        'meses': meses,
+        'incluir_cancelados': incluir_cancelados,
+        'desde': desde,
+        'hasta': hasta,
+        'opciones_meses': (3, 6, 12, 24, 36),
+    })
+    return render(request, 'admin/ventas/dashboard.html', contexto)
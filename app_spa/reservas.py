@@ -0,0 +1,176 @@
+"""
+Reservas de stock: agregar un producto al carrito aparta sus unidades por un tiempo.
+
+Cada carrito, identificado por su llave de caché (carrito_temporal), tiene a lo sumo una
+ReservaStock por producto, que vence settings.RESERVA_STOCK_MINUTOS después del último
+cambio del carrito. Lo apartado de cada producto se lleva sumado en Productos.reservado,
+así que lo disponible es stock - reservado sin sumar reservas en cada petición. Apartar
+es un UPDATE condicional (stock >= reservado + lo que se pide, como el descuento de
+stock del checkout): dos carritos no pueden apartar la misma unidad.
+
+Las reservas vencidas siguen contando hasta que liberar_vencidas() las barre en bloque
+(manage.py liberar_reservas, p. ej. cada minuto desde cron); si apartar falla se barren
+antes las vencidas de ese producto y se intenta una vez más. En el checkout, convertir()
+descuenta stock y reservado en el mismo UPDATE sin volver a mirar las demás reservas.
+Cada cambio de reservado renueva, al confirmar, las páginas cacheadas del catálogo, que
+muestran las unidades disponibles (cache_catalogo.incrementar_version_reservas).
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache_catalogo
+from .models import CheckoutError, Productos, ReservaStock
+
+
+def vencimiento(ahora=None):
+    return (ahora or timezone.now()) + datetime.timedelta(minutes=settings.RESERVA_STOCK_MINUTOS)
+
+
+def de_carrito(llave):
+    """(producto_id, cantidad) de las reservas de un carrito, vigentes o sin barrer"""
+    return ReservaStock.objects.filter(llave=llave).values_list('producto_id', 'cantidad')
+
+
+def _reservado_cambio():
+    transaction.on_commit(cache_catalogo.incrementar_version_reservas)
+
+
+def _apartar(producto_id, diferencia):
+    """Sumar `diferencia` a reservado si cabe en el stock; restar siempre se puede"""
+    productos = Productos.objects.filter(pk=producto_id)
+    if diferencia > 0:
+        productos = productos.filter(stock__gte=F('reservado') + diferencia)
+    if not productos.update(reservado=F('reservado') + diferencia):
+        return False
+    _reservado_cambio()
+    return True
+
+
+def _libre(producto_id):
+    fila = Productos.objects.filter(pk=producto_id).values_list('stock', 'reservado').first()
+    return max(fila[0] - fila[1], 0) if fila else 0
+
+
+def sincronizar(llave, cantidades, ahora=None):
+    """
+    Dejar las reservas del carrito `llave` iguales a `cantidades` ({producto_id: unidades};
+    los productos que no están se liberan) y renovar su vencimiento. Si no alcanza se
+    aparta lo que quede libre. Devuelve {producto_id: unidades apartadas}.
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        actuales = dict(de_carrito(llave))
+        apartadas = {}
+        # Siempre en el mismo orden de productos, como el descuento de stock
+        for producto_id in sorted(actuales.keys() | cantidades.keys()):
+            actual, pedida = actuales.get(producto_id, 0), cantidades.get(producto_id, 0)
+            if pedida > actual and not _apartar(producto_id, pedida - actual):
+                liberar_vencidas(ahora, productos=[producto_id], excepto=llave)
+                pedida = actual + min(pedida - actual, _libre(producto_id))
+                if pedida > actual and not _apartar(producto_id, pedida - actual):
+                    pedida = actual
+            elif pedida < actual:
+                _apartar(producto_id, pedida - actual)
+            if pedida:
+                apartadas[producto_id] = pedida
+
+        ReservaStock.objects.filter(llave=llave).exclude(producto_id__in=apartadas).delete()
+        if apartadas:
+            expira = vencimiento(ahora)
+            ReservaStock.objects.bulk_create(
+                [
+                    ReservaStock(llave=llave, producto_id=producto_id, cantidad=cantidad, expira=expira)
+                    for producto_id, cantidad in apartadas.items()
+                ],
+                update_conflicts=True, unique_fields=['llave', 'producto'], update_fields=['cantidad', 'expira'],
+            )
+    return apartadas
+
+
+def liberar(llave):
+    """Soltar todo lo que tiene apartado un carrito"""
+    return sincronizar(llave, {})
+
+
+def transferir(origen, destino):
+    """
+    Pasar las reservas del carrito `origen` al `destino` (al iniciar sesión), sumando
+    las de un mismo producto. El total apartado no cambia, así que Productos no se toca.
+    """
+    with transaction.atomic():
+        cantidades = dict(de_carrito(destino))
+        movidas = list(de_carrito(origen))
+        if not movidas:
+            return
+        for producto_id, cantidad in movidas:
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        ReservaStock.objects.filter(llave=origen).delete()
+        expira = vencimiento()
+        ReservaStock.objects.bulk_create(
+            [
+                ReservaStock(llave=destino, producto_id=producto_id, cantidad=cantidad, expira=expira)
+                for producto_id, cantidad in cantidades.items()
+            ],
+            update_conflicts=True, unique_fields=['llave', 'producto'], update_fields=['cantidad', 'expira'],
+        )
+
+
+def convertir(llave, por_producto):
+    """
+    Checkout: descontar {producto_id: unidades} del stock y soltar las reservas del
+    carrito. Cada producto es un solo UPDATE condicional sobre su fila: lo apartado ya es
+    de este carrito y solo lo que falte debe caber en lo disponible. Se llama dentro de
+    la transacción del pedido; sin stock lanza CheckoutError y todo se revierte.
+    """
+    apartadas = dict(de_carrito(llave))
+    for producto_id in sorted(apartadas.keys() | por_producto.keys()):
+        cantidad, apartada = por_producto.get(producto_id, 0), apartadas.get(producto_id, 0)
+        descontado = Productos.objects.filter(
+            pk=producto_id, stock__gte=F('reservado') - apartada + cantidad,
+        ).update(stock=F('stock') - cantidad, reservado=F('reservado') - apartada)
+        if not descontado and cantidad:
+            raise CheckoutError("Stock insuficiente para completar el pedido")
+    if apartadas:
+        ReservaStock.objects.filter(llave=llave).delete()
+
+
+def liberar_vencidas(ahora=None, productos=None, excepto=None):
+    """
+    Barrer en bloque las reservas vencidas: un UPDATE que resta de cada producto lo que
+    tenía vencido y un DELETE. Devuelve cuántas reservas se liberaron.
+    """
+    vencidas = ReservaStock.objects.filter(expira__lte=ahora or timezone.now())
+    if productos is not None:
+        vencidas = vencidas.filter(producto_id__in=productos)
+    if excepto:
+        vencidas = vencidas.exclude(llave=excepto)
+    suma = vencidas.filter(producto=OuterRef('pk')).order_by().values('producto').annotate(
+        total=Sum('cantidad'),
+    ).values('total')
+    with transaction.atomic():
+        Productos.objects.filter(pk__in=vencidas.values('producto')).update(
+            reservado=F('reservado') - Subquery(suma),
+        )
+        liberadas, _ = vencidas.delete()
+        if liberadas:
+            _reservado_cambio()
+    return liberadas
+
+
+def reconstruir():
+    """Recalcular Productos.reservado desde las reservas; devuelve cuántos productos cambiaron"""
+    suma = ReservaStock.objects.filter(producto=OuterRef('pk')).order_by().values('producto').annotate(
+        total=Sum('cantidad'),
+    ).values('total')
+    with transaction.atomic():
+        cambiados = Productos.objects.exclude(reservado=Coalesce(Subquery(suma), 0)).update(
+            reservado=Coalesce(Subquery(suma), 0),
+        )
+        if cambiados:
+            _reservado_cambio()
+    return cambiados
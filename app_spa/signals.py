@@ -1,7 +1,15 @@
-from django.db.models.signals import post_save
+from django.contrib import messages
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Clientes
+from . import agenda, busqueda, cache_catalogo, carrito_temporal, cola
+from .models import (
+    Carrito, CarritoItem, Cita, Clientes, Empleados, Pedido, PedidoItem, Productos, Proveedores, ResumenCliente,
+    Servicios, VentaDiaria, invalidar_carrito_cacheado,
+)
 
 @receiver(post_save, sender=User)
 def crear_cliente_desde_usuario(sender, instance, created, **kwargs):
@@ -20,4 +28,163 @@ def crear_cliente_desde_usuario(sender, instance, created, **kwargs):
                 telefono="Por definir",
                 alergias="",  # Vacío ahora
                 preferencias=""  # Vacío ahora
-            )
\ No newline at end of file
+            )
+
+@receiver(post_save, sender=CarritoItem)
+@receiver(post_delete, sender=CarritoItem)
+def actualizar_totales_carrito(sender, instance, **kwargs):
+    """Mantener sincronizados cantidad_items y monto_total del carrito"""
+    instance.carrito.recalcular_totales()
+
+
+@receiver(post_save, sender=Carrito)
+@receiver(post_delete, sender=Carrito)
+def invalidar_cache_carrito(sender, instance, **kwargs):
+    """El carrito activo puede cambiar (checkout, borrado): descartar la copia cacheada"""
+    invalidar_carrito_cacheado(instance.usuario_id)
+
+
+@receiver(user_logged_in)
+def fusionar_carrito_anonimo(sender, request, user, **kwargs):
+    """Lo que el visitante agregó antes de iniciar sesión pasa a su carrito persistente"""
+    if request is None:
+        return
+    for aviso in carrito_temporal.fusionar_al_iniciar_sesion(request, user):
+        messages.warning(request, aviso, fail_silently=True)
+
+
+@receiver(post_save, sender=Productos)
+@receiver(post_save, sender=Servicios)
+def actualizar_montos_por_precio(sender, instance, created, **kwargs):
+    """Un cambio de precio altera el monto de los carritos activos que contienen el item"""
+    if created:
+        return
+    campo = 'producto' if sender is Productos else 'servicio'
+    carritos = CarritoItem.objects.filter(**{campo: instance, 'carrito__activo': True}).values('carrito')
+    Carrito.objects.filter(pk__in=carritos).update(**Carrito.totales_actualizados())
+
+
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def actualizar_resumen_por_pedido(sender, instance, **kwargs):
+    """Crear, cancelar o borrar un pedido cambia el historial del cliente"""
+    if isinstance(kwargs.get('origin'), (User, Clientes)):
+        # El cliente completo se está borrando; su resumen se va en cascada
+        return
+    ResumenCliente.programar_actualizacion(instance.usuario_id)
+
+
+@receiver(post_save, sender=PedidoItem)
+@receiver(post_delete, sender=PedidoItem)
+def actualizar_resumen_por_item(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), (User, Clientes, Pedido)):
+        # Borrado en cascada: el post_delete del pedido ya recalcula
+        return
+    ResumenCliente.programar_actualizacion(instance.pedido.usuario_id)
+
+
+@receiver(post_save, sender=Productos)
+def indexar_producto(sender, instance, **kwargs):
+    busqueda.indexar_producto(instance)
+
+
+@receiver(post_save, sender=Servicios)
+def indexar_servicio(sender, instance, **kwargs):
+    busqueda.indexar_servicio(instance)
+
+
+@receiver(post_delete, sender=Productos)
+@receiver(post_delete, sender=Servicios)
+def desindexar_catalogo(sender, instance, **kwargs):
+    busqueda.eliminar('producto' if sender is Productos else 'servicio', instance.pk)
+
+
+@receiver(post_save, sender=Proveedores)
+def reindexar_productos_proveedor(sender, instance, created, **kwargs):
+    """El nombre del proveedor forma parte del índice de sus productos"""
+    if not created:
+        for producto in instance.productos.all():
+            producto.proveedor = instance
+            busqueda.indexar_producto(producto)
+
+
+@receiver(post_save, sender=Servicios)
+@receiver(post_save, sender=Productos)
+@receiver(post_save, sender=Empleados)
+@receiver(post_save, sender=Proveedores)
+@receiver(post_save, sender=Clientes)
+@receiver(post_delete, sender=Servicios)
+@receiver(post_delete, sender=Productos)
+@receiver(post_delete, sender=Empleados)
+@receiver(post_delete, sender=Proveedores)
+@receiver(post_delete, sender=Clientes)
+@receiver(m2m_changed, sender=Productos.servicios.through)
+@receiver(m2m_changed, sender=Clientes.servicios.through)
+@receiver(m2m_changed, sender=Clientes.productos_interes.through)
+def invalidar_cache_catalogo(sender, **kwargs):
+    """Nueva versión del catálogo al confirmar la transacción: páginas y fragmentos viejos dejan de usarse"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        transaction.on_commit(cache_catalogo.incrementar_version)
+
+
+@receiver(pre_save, sender=Productos)
+@receiver(pre_save, sender=Servicios)
+def detectar_imagen_nueva(sender, instance, **kwargs):
+    """Antes de guardar, un FieldFile sin confirmar es una imagen recién subida"""
+    instance._imagen_nueva = bool(instance.imagen) and not instance.imagen._committed
+    if not instance.imagen:
+        instance.imagen_hash = ''
+
+
+@receiver(post_save, sender=Productos)
+@receiver(post_save, sender=Servicios)
+def generar_derivadas_imagen(sender, instance, **kwargs):
+    """Generar thumb/card/detail y guardar el hash del original en la cola (tareas.generar_derivadas)"""
+    if not getattr(instance, '_imagen_nueva', False):
+        return
+    instance._imagen_nueva = False
+    nombre = instance.imagen.name
+    cola.encolar(
+        'imagenes.derivadas', llave=f'derivadas:{sender._meta.label_lower}:{instance.pk}:{nombre}',
+        modelo=sender._meta.label_lower, pk=instance.pk, nombre=nombre,
+    )
+
+
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def actualizar_ventas_por_pedido(sender, instance, **kwargs):
+    """Un pedido nuevo, un cambio de estado o un borrado alteran los acumulados de su día"""
+    # Al confirmar: generar_pedido crea los items con bulk_create después del pedido
+    VentaDiaria.programar_recalculo(timezone.localdate(instance.fecha_pedido))
+
+
+@receiver(post_save, sender=PedidoItem)
+@receiver(post_delete, sender=PedidoItem)
+def actualizar_ventas_por_item(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), (User, Clientes, Pedido)):
+        # Borrado en cascada: el post_delete del pedido ya programó su día
+        return
+    VentaDiaria.programar_recalculo(timezone.localdate(instance.pedido.fecha_pedido))
+
+
+@receiver(post_save, sender=Pedido)
+def liberar_citas_de_pedido_cancelado(sender, instance, **kwargs):
+    if instance.estado == 'cancelado':
+        agenda.cancelar_citas(instance)
+
+
+@receiver(pre_save, sender=Cita)
+def recordar_dia_de_cita(sender, instance, **kwargs):
+    """Si la cita cambia de empleado o de día, el día que deja también se recalcula"""
+    if instance.pk:
+        instance._dia_anterior = Cita.objects.filter(pk=instance.pk).values_list('empleado_id', 'fecha').first()
+
+
+@receiver(post_save, sender=Cita)
+@receiver(post_delete, sender=Cita)
+def actualizar_agenda_por_cita(sender, instance, **kwargs):
+    dias = {(instance.empleado_id, instance.fecha)}
+    if getattr(instance, '_dia_anterior', None):
+        dias.add(instance._dia_anterior)
+    for empleado_id, fecha in dias:
+        agenda.recalcular_dia(empleado_id, fecha)
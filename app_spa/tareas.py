@@ -0,0 +1,46 @@
+"""
+Tareas de la cola (cola.py). Todas se pueden repetir sin daño: recalculan desde los
+datos actuales en lugar de sumar o restar sobre lo que encuentran.
+"""
+import datetime
+import logging
+
+from django.apps import apps
+
+from . import cache_catalogo, imagenes, recomendaciones
+from .cola import tarea
+from .models import Recomendacion, ResumenCliente, VentaDiaria
+
+logger = logging.getLogger(__name__)
+
+
+@tarea('ventas.recalcular_dia')
+def recalcular_ventas_dia(fecha):
+    VentaDiaria.recalcular_dia(datetime.date.fromisoformat(fecha))
+
+
+@tarea('resumen.actualizar_usuario')
+def actualizar_resumen(usuario_id):
+    ResumenCliente.actualizar_usuario(usuario_id)
+
+
+@tarea('recomendaciones.actualizar')
+def actualizar_recomendaciones():
+    if recomendaciones.actualizar() == recomendaciones.LOTE_PEDIDOS:
+        # Quedan más pedidos: en otra tarea, para no alargar esta transacción
+        Recomendacion.programar_actualizacion()
+
+
+@tarea('imagenes.derivadas', intentos=3)
+def generar_derivadas(modelo, pk, nombre):
+    """Derivadas de una imagen recién subida y su hash en el registro, si todavía tiene esa imagen"""
+    modelo = apps.get_model(modelo)
+    try:
+        hash_imagen = imagenes.generar_derivadas(nombre, modelo._meta.get_field('imagen').storage)
+    except (OSError, ValueError):
+        # Archivo que Pillow no puede abrir: reintentar no ayuda y las plantillas usan el original
+        logger.warning("No se pudieron generar derivadas de %s", nombre)
+        return
+    if modelo.objects.filter(pk=pk, imagen=nombre).update(imagen_hash=hash_imagen):
+        # El srcset aparece en el catálogo cacheado
+        cache_catalogo.incrementar_version()
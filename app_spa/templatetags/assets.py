@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+from app_spa.estaticos import ASSETS_VENDOR
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _vendorizado(ruta):
+    return finders.find(ruta) is not None
+
+
+@register.simple_tag
+def asset_vendor(nombre):
+    """
+    URL de una dependencia de ASSETS_VENDOR: la copia local (con hash tras collectstatic)
+    si ya se ejecutó vendorizar_assets, o el CDN mientras tanto.
+    """
+    ruta, url_cdn = ASSETS_VENDOR[nombre]
+    if _vendorizado(ruta):
+        return static(ruta)
+    return url_cdn
@@ -0,0 +1,46 @@
+from django import template
+from django.core.cache import cache
+
+from app_spa import cache_catalogo
+
+register = template.Library()
+
+
+class FragmentoCatalogoNode(template.Node):
+    def __init__(self, nodelist, partes):
+        self.nodelist = nodelist
+        self.partes = partes
+
+    def render(self, context):
+        if not cache_catalogo.activo():
+            return self.nodelist.render(context)
+        # Una sola lectura de la versión por render, no una por fila
+        if 'catalogo_version' not in context.render_context:
+            context.render_context['catalogo_version'] = cache_catalogo.version()
+        llave = cache_catalogo.llave_fragmento(
+            *(parte.resolve(context) for parte in self.partes),
+            version_actual=context.render_context['catalogo_version'],
+        )
+        html = cache.get(llave)
+        if html is not None:
+            cache_catalogo.registrar_acierto()
+            return html
+        cache_catalogo.registrar_fallo()
+        html = self.nodelist.render(context)
+        cache.set(llave, html, cache_catalogo.TIMEOUT)
+        return html
+
+
+@register.tag(name='cache_catalogo')
+def fragmento_catalogo(parser, token):
+    """
+    Cachea un fragmento del catálogo hasta que cambie la versión del catálogo:
+    {% cache_catalogo 'servicio' servicio.pk %} ... {% endcache_catalogo %}
+    Lo que varía por usuario (botón de carrito, acciones de staff) debe quedar fuera.
+    """
+    partes = token.split_contents()[1:]
+    if not partes:
+        raise template.TemplateSyntaxError("cache_catalogo necesita al menos un argumento para la llave")
+    nodelist = parser.parse(('endcache_catalogo',))
+    parser.delete_first_token()
+    return FragmentoCatalogoNode(nodelist, [parser.compile_filter(parte) for parte in partes])
@@ -0,0 +1,44 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from app_spa import imagenes
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagen_responsiva(objeto, variante='card', sizes=None, **atributos):
+    """
+    <picture> con srcset WebP y JPEG de las derivadas de objeto.imagen:
+    {% imagen_responsiva producto 'thumb' sizes='80px' class='rounded' alt=producto.nombre %}
+    Si la imagen aún no tiene derivadas se usa el original.
+    """
+    if not objeto.imagen:
+        return ''
+    atributos.setdefault('alt', str(objeto))
+    atributos.setdefault('loading', 'lazy')
+    atributos.setdefault('decoding', 'async')
+    hash_imagen = getattr(objeto, 'imagen_hash', '')
+    if not hash_imagen:
+        return format_html('<img src="{}"{}>', objeto.imagen.url, flatatt(atributos))
+
+    ancho, _ = imagenes.VARIANTES[variante]
+    sizes = sizes or f"{ancho // 2}px"
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        imagenes.srcset(hash_imagen, variante, 'webp'), sizes,
+        imagenes.url_derivada(hash_imagen, variante, 'jpg'),
+        imagenes.srcset(hash_imagen, variante, 'jpg'), sizes,
+        flatatt(atributos),
+    )
+
+
+@register.simple_tag
+def srcset_imagen(objeto, variante='card', formato='webp'):
+    """Solo el atributo srcset, para marcado propio: srcset="{% srcset_imagen servicio 'card' %}" """
+    hash_imagen = getattr(objeto, 'imagen_hash', '')
+    if not hash_imagen:
+        return objeto.imagen.url if objeto.imagen else ''
+    return imagenes.srcset(hash_imagen, variante, formato)
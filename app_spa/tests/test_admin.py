@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app_spa.models import Clientes, Pedido, PedidoItem, Productos, Proveedores, ResumenCliente, Servicios
+
+# Con la caché vacía: sesión y usuario, filtros, los dos conteos del paginador, la página con
+# sus prefetch y el contador del carrito de la barra
+CONSULTAS_CLIENTES = 9
+CONSULTAS_PEDIDOS = 7
+
+
+# El almacenamiento de producción necesita el manifiesto de collectstatic
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ChangelistConsultasConstantesTests(TestCase):
+    """Los changelists de Clientes y Pedido cuestan las mismas consultas con 10 filas que con 1,000"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Proveedor', contacto='-', telefono='-', email='p@example.com',
+            direccion='-', especialidad='-',
+        )
+        cls.productos = Productos.objects.bulk_create([
+            Productos(nombre=f'Producto {i}', precio=Decimal('100.00'), stock=10, tipo_producto='otros', proveedor=proveedor)
+            for i in range(3)
+        ])
+        cls.servicios = Servicios.objects.bulk_create([
+            Servicios(nombre=f'Servicio {i}', precio=Decimal('300.00'), duracion=60, tipo_servicio='masaje')
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def poblar(self, total):
+        """Completar `total` clientes, cada uno con su usuario, intereses y un pedido con dos items"""
+        desde = Clientes.objects.count()
+        usuarios = User.objects.bulk_create([
+            User(username=f'cliente{i}', email=f'cliente{i}@example.com') for i in range(desde, total)
+        ])
+        clientes = Clientes.objects.bulk_create([
+            Clientes(usuario=usuario, nombre=usuario.username, apellido='Prueba', email=usuario.email, telefono='555')
+            for usuario in usuarios
+        ])
+        Clientes.servicios.through.objects.bulk_create([
+            Clientes.servicios.through(clientes_id=cliente.pk, servicios_id=self.servicios[i % 3].pk)
+            for i, cliente in enumerate(clientes)
+        ])
+        Clientes.productos_interes.through.objects.bulk_create([
+            Clientes.productos_interes.through(clientes_id=cliente.pk, productos_id=self.productos[i % 3].pk)
+            for i, cliente in enumerate(clientes)
+        ])
+        pedidos = Pedido.objects.bulk_create([
+            Pedido(usuario=usuario, subtotal=400, total=Decimal('464.00'), estado='confirmado') for usuario in usuarios
+        ])
+        PedidoItem.objects.bulk_create([
+            item
+            for i, pedido in enumerate(pedidos)
+            for item in (
+                PedidoItem(pedido=pedido, producto=self.productos[i % 3], cantidad=1, precio=Decimal('100.00')),
+                PedidoItem(pedido=pedido, servicio=self.servicios[i % 3], cantidad=1, precio=Decimal('300.00')),
+            )
+        ])
+        ResumenCliente.reconstruir()
+
+    def consultas_constantes(self, nombre, esperadas):
+        url = reverse(nombre)
+        for filas in (10, 1000):
+            self.poblar(filas)
+            # El contador del carrito queda en caché: medir siempre desde cero
+            for alias in settings.CACHES:
+                caches[alias].clear()
+            with self.subTest(filas=filas), self.assertNumQueries(esperadas):
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+
+    def test_clientes(self):
+        self.consultas_constantes('admin:app_spa_clientes_changelist', CONSULTAS_CLIENTES)
+
+    def test_pedidos(self):
+        self.consultas_constantes('admin:app_spa_pedido_changelist', CONSULTAS_PEDIDOS)
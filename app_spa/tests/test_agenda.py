@@ -0,0 +1,74 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from app_spa import agenda
+from app_spa.models import AgendaDia, Cita, Empleados, Servicios
+
+
+class ReservarCitaTests(TestCase):
+    """agenda.reservar reparte los turnos entre empleados y nunca da dos veces el mismo"""
+
+    def setUp(self):
+        self.servicio = Servicios.objects.create(
+            nombre='Masaje', precio=Decimal('300.00'), duracion=60, tipo_servicio='masaje',
+        )
+        self.empleados = [
+            Empleados.objects.create(
+                nombre=f'Empleado {i}', apellido='-', especialidad='-', telefono='-', cargo='-',
+                servicio=self.servicio,
+            )
+            for i in range(2)
+        ]
+        self.ahora = timezone.localtime()
+        self.fecha = self.ahora.date() + datetime.timedelta(days=1)
+
+    def reservar(self, hora_inicio):
+        return agenda.reservar(self.servicio, self.fecha, hora_inicio, ahora=self.ahora)
+
+    def horarios(self):
+        (fecha, horas), = agenda.disponibilidad(self.servicio, self.fecha, dias=1, ahora=self.ahora)
+        return horas
+
+    def test_el_mismo_turno_va_a_otro_empleado_y_luego_se_agota(self):
+        diez = datetime.time(10)
+        primera = self.reservar(diez)
+        segunda = self.reservar(diez)
+        self.assertNotEqual(primera.empleado_id, segunda.empleado_id)
+        self.assertEqual(segunda.fin, datetime.time(11))
+        with self.assertRaises(agenda.HorarioNoDisponible):
+            self.reservar(datetime.time(10, 30))
+        # El bloque siguiente al fin sí queda libre
+        self.reservar(datetime.time(11))
+
+    def test_disponibilidad_sigue_a_las_citas(self):
+        diez = datetime.time(10)
+        self.assertIn(diez, self.horarios())
+        citas = [self.reservar(diez), self.reservar(diez)]
+        horas = self.horarios()
+        self.assertNotIn(diez, horas)
+        self.assertNotIn(datetime.time(9, 15), horas)
+        self.assertIn(datetime.time(9), horas)
+        self.assertIn(datetime.time(11), horas)
+
+        # Cancelar una cita recalcula su día por la señal de Cita
+        citas[0].estado = 'cancelada'
+        citas[0].save()
+        self.assertIn(diez, self.horarios())
+
+    def test_bits_cuadran_con_las_citas(self):
+        for hora_inicio in (datetime.time(9), datetime.time(12, 30), datetime.time(9)):
+            self.reservar(hora_inicio)
+        guardada = dict(AgendaDia.objects.values_list('empleado_id', 'ocupacion'))
+        agenda.reconstruir()
+        self.assertEqual(dict(AgendaDia.objects.values_list('empleado_id', 'ocupacion')), guardada)
+        self.assertEqual(Cita.objects.count(), 3)
+
+    def test_horarios_invalidos(self):
+        for hora_inicio in (datetime.time(10, 7), datetime.time(8, 30), datetime.time(19, 30)):
+            with self.subTest(hora_inicio=hora_inicio), self.assertRaises(agenda.HorarioNoDisponible):
+                self.reservar(hora_inicio)
+        with self.assertRaises(agenda.HorarioNoDisponible):
+            agenda.reservar(self.servicio, self.ahora.date() - datetime.timedelta(days=1), datetime.time(10), ahora=self.ahora)
@@ -0,0 +1,145 @@
+import asyncio
+import random
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+
+from app_spa import reservas
+from app_spa.carrito_temporal import CarritoTemporal, clave_item
+from app_spa.models import Carrito, Productos, Proveedores, Servicios, cache_carritos
+
+PETICIONES = 12
+OPERACIONES = 4
+
+
+class CarritoTemporalConcurrenteTests(TestCase):
+    """
+    Peticiones simultáneas sobre la misma llave de carrito, como las de api.carrito: cada
+    una abre el carrito con aeditar(), aplica su lote y lo guarda. Ninguna debe perder lo
+    que guardó otra, y lo apartado debe cuadrar con las líneas de producto.
+    """
+
+    def setUp(self):
+        cache_carritos.clear()
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Proveedor', contacto='-', telefono='-', email='p@example.com',
+            direccion='-', especialidad='-',
+        )
+        self.productos = [
+            Productos.objects.create(
+                nombre=f'Producto {i}', precio=Decimal('10.50') * (i + 1), stock=1000,
+                tipo_producto='otros', proveedor=proveedor,
+            )
+            for i in range(4)
+        ]
+        self.servicios = [
+            Servicios.objects.create(
+                nombre=f'Servicio {i}', precio=Decimal('300.00') + i, duracion=60, tipo_servicio='masaje',
+            )
+            for i in range(2)
+        ]
+        self.usuario = User.objects.create(username='cliente')
+        self.request = RequestFactory().post('/api/carrito/')
+
+    async def editar(self, elegir, modelo):
+        """
+        Una petición: elegir(lineas) decide el lote viendo el carrito ya bloqueado. Como las
+        peticiones se turnan, aplicar el mismo lote a `modelo` dentro del bloqueo da el
+        resultado esperado sin importar el orden.
+        """
+        async with CarritoTemporal.aeditar(self.request, self.usuario) as temporal:
+            operaciones = elegir(temporal.lineas)
+            _, _, errores = await temporal.aaplicar(operaciones)
+            self.assertEqual(errores, [])
+            await temporal.aguardar()
+            for operacion in operaciones:
+                if operacion['op'] == 'agregar':
+                    clave = clave_item(operacion['tipo'], operacion['id'])
+                    modelo[clave] = modelo.get(clave, 0) + operacion['cantidad']
+                elif operacion['op'] == 'fijar' and operacion['cantidad']:
+                    modelo[operacion['clave']] = operacion['cantidad']
+                else:
+                    modelo.pop(operacion['clave'], None)
+
+    def agregar(self, azar):
+        if azar.random() < 0.7:
+            return {'op': 'agregar', 'tipo': 'producto', 'id': azar.choice(self.productos).pk, 'cantidad': azar.randint(1, 3)}
+        return {'op': 'agregar', 'tipo': 'servicio', 'id': azar.choice(self.servicios).pk, 'cantidad': 1}
+
+    async def assertCuadra(self, modelo):
+        temporal = await CarritoTemporal.acargar(self.request, self.usuario)
+        self.assertEqual({clave: linea['cantidad'] for clave, linea in temporal.lineas.items()}, modelo)
+        self.assertEqual(temporal.total_items(), sum(modelo.values()))
+        pedidas = {int(clave[2:]): cantidad for clave, cantidad in modelo.items() if clave.startswith('p-')}
+        apartadas = await sync_to_async(lambda: dict(reservas.de_carrito(temporal.llave)))()
+        self.assertEqual(apartadas, pedidas)
+        reservado = await sync_to_async(lambda: {
+            producto.pk: producto.reservado for producto in Productos.objects.filter(reservado__gt=0)
+        })()
+        self.assertEqual(reservado, pedidas)
+
+    async def test_agregados_simultaneos_se_suman(self):
+        azar = random.Random(1)
+        modelo = {}
+        lotes = [[self.agregar(azar)] for _ in range(PETICIONES)]
+        await asyncio.gather(*(self.editar(lambda lineas, lote=lote: lote, modelo) for lote in lotes))
+        self.assertEqual(sum(modelo.values()), sum(lote[0]['cantidad'] for lote in lotes))
+        await self.assertCuadra(modelo)
+
+    async def test_ediciones_simultaneas_no_se_pisan(self):
+        """Agregar, cambiar cantidades y quitar líneas a la vez, varias veces por petición"""
+        modelo = {}
+
+        def elegir(azar):
+            def lote(lineas):
+                claves = list(lineas)
+                accion = azar.random()
+                if accion < 0.5 or not claves:
+                    return [self.agregar(azar)]
+                clave = azar.choice(claves)
+                if accion < 0.8:
+                    return [{'op': 'fijar', 'clave': clave, 'cantidad': azar.randint(0, 5) if clave.startswith('p-') else 1}]
+                return [{'op': 'quitar', 'clave': clave}]
+            return lote
+
+        async def peticiones(semilla):
+            azar = random.Random(semilla)
+            for _ in range(OPERACIONES):
+                await self.editar(elegir(azar), modelo)
+
+        await asyncio.gather(*(peticiones(semilla) for semilla in range(PETICIONES)))
+        await self.assertCuadra(modelo)
+
+
+class TotalesCarritoTests(TestCase):
+    """cantidad_items y monto_total del Carrito persistido, que _persistir recalcula en el checkout"""
+
+    def setUp(self):
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Proveedor', contacto='-', telefono='-', email='p@example.com',
+            direccion='-', especialidad='-',
+        )
+        self.producto = Productos.objects.create(
+            nombre='Producto', precio=Decimal('10.50'), stock=1000, tipo_producto='otros', proveedor=proveedor,
+        )
+        self.servicio = Servicios.objects.create(
+            nombre='Servicio', precio=Decimal('300.00'), duracion=60, tipo_servicio='masaje',
+        )
+        self.carrito = Carrito.objects.create(usuario=User.objects.create(username='cliente'))
+
+    def test_instancia_desactualizada_no_pisa_los_totales(self):
+        """Dos peticiones con el mismo carrito cargado: la segunda no escribe los totales que tenía en memoria"""
+        primera = Carrito.objects.get(pk=self.carrito.pk)
+        segunda = Carrito.objects.get(pk=self.carrito.pk)
+        primera.agregar_item(producto=self.producto, cantidad=2)
+        segunda.agregar_item(producto=self.producto)
+        item = segunda.agregar_item(servicio=self.servicio)
+        primera.agregar_item(servicio=self.servicio)
+        primera.eliminar_item(item.pk)
+        segunda.agregar_item(producto=self.producto)
+
+        carrito = Carrito.objects.get(pk=self.carrito.pk)
+        self.assertEqual(carrito.cantidad_items, 4)
+        self.assertEqual(carrito.monto_total, self.producto.precio * 4)
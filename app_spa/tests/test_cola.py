@@ -0,0 +1,74 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from app_spa import cola
+from app_spa.models import Tarea
+
+llamadas = []
+
+
+@cola.tarea('prueba.anotar')
+def anotar(valor):
+    llamadas.append(valor)
+
+
+@cola.tarea('prueba.fallar', intentos=2)
+def fallar():
+    raise RuntimeError('falla a propósito')
+
+
+@override_settings(TAREAS_EN_LINEA=False)
+class ColaTareasTests(TestCase):
+    """Reclamar, ejecutar y reintentar con espera exponencial"""
+
+    def setUp(self):
+        llamadas.clear()
+
+    def test_reclamar_no_entrega_dos_veces_la_misma(self):
+        for valor in range(3):
+            cola.encolar('prueba.anotar', valor=valor)
+        cola.encolar('prueba.anotar', retraso=60, valor='despues')
+
+        primeras = cola.reclamar(2, 'uno')
+        resto = cola.reclamar(5, 'dos')
+        self.assertEqual(len(primeras), 2)
+        self.assertEqual(len(resto), 1)
+        self.assertFalse(set(primeras) & set(resto))
+        self.assertEqual(cola.reclamar(5, 'tres'), [])
+
+        for pk in primeras + resto:
+            self.assertTrue(cola.ejecutar(pk))
+        self.assertEqual(sorted(llamadas), [0, 1, 2])
+        self.assertEqual(Tarea.objects.filter(estado='hecha').count(), 3)
+
+    def test_llave_deja_una_sola_pendiente(self):
+        for _ in range(3):
+            cola.encolar('prueba.anotar', llave='dia', valor=1)
+        self.assertEqual(Tarea.objects.filter(llave='dia', estado='pendiente').count(), 1)
+
+    def test_fallo_reintenta_con_espera_y_luego_queda_fallida(self):
+        cola.encolar('prueba.fallar')
+        tarea = Tarea.objects.get()
+        with self.assertLogs('app_spa.cola', 'ERROR'):
+            self.assertFalse(cola.ejecutar(cola.reclamar(1, 'uno')[0]))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('pendiente', 1))
+        espera = (tarea.disponible_en - timezone.now()).total_seconds()
+        self.assertGreater(espera, cola.ESPERA_BASE * 0.75 - 1)
+        self.assertLessEqual(espera, cola.ESPERA_BASE)
+        # Todavía no le toca
+        self.assertEqual(cola.reclamar(1, 'uno'), [])
+
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_en=timezone.now())
+        with self.assertLogs('app_spa.cola', 'ERROR'):
+            cola.ejecutar(cola.reclamar(1, 'uno')[0])
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('fallida', 2))
+        self.assertIn('falla a propósito', tarea.error)
+
+    def test_espera_crece_hasta_el_maximo(self):
+        for intentos in range(1, 20):
+            espera = cola.espera(intentos)
+            tope = min(cola.ESPERA_BASE * 2 ** (intentos - 1), cola.ESPERA_MAXIMA)
+            self.assertTrue(tope * 0.75 <= espera <= tope, (intentos, espera))
+        self.assertLessEqual(cola.espera(100), cola.ESPERA_MAXIMA)
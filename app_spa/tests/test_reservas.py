@@ -0,0 +1,90 @@
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from app_spa import reservas
+from app_spa.models import CheckoutError, Productos, Proveedores, ReservaStock
+
+# Lo bastante atrás para que lo apartado entonces ya esté vencido
+VENCIDA = datetime.timedelta(minutes=settings.RESERVA_STOCK_MINUTOS + 5)
+
+
+class ReservasStockTests(TestCase):
+    """Lo apartado por los carritos nunca pasa del stock, vence y se convierte en el checkout"""
+
+    def setUp(self):
+        proveedor = Proveedores.objects.create(
+            nombre_empresa='Proveedor', contacto='-', telefono='-', email='p@example.com',
+            direccion='-', especialidad='-',
+        )
+        self.producto = Productos.objects.create(
+            nombre='Producto', precio=Decimal('10.50'), stock=5, tipo_producto='otros', proveedor=proveedor,
+        )
+        self.pk = self.producto.pk
+
+    def assertApartado(self, reservado, stock=5):
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.reservado), (stock, reservado))
+        # Productos.reservado es la suma de las reservas, llevada sin sumarlas en cada petición
+        self.assertEqual(sum(ReservaStock.objects.values_list('cantidad', flat=True)), reservado)
+
+    def test_segundo_carrito_no_pasa_de_lo_libre(self):
+        self.assertEqual(reservas.sincronizar('a', {self.pk: 3}), {self.pk: 3})
+        self.assertEqual(reservas.sincronizar('b', {self.pk: 4}), {self.pk: 2})
+        self.assertEqual(reservas.sincronizar('c', {self.pk: 1}), {})
+        self.assertApartado(5)
+        self.assertEqual(self.producto.disponible(), 0)
+
+        # Lo que suelta un carrito queda para los demás
+        self.assertEqual(reservas.sincronizar('a', {self.pk: 1}), {self.pk: 1})
+        self.assertEqual(reservas.sincronizar('c', {self.pk: 3}), {self.pk: 2})
+        self.assertApartado(5)
+
+    def test_liberar_vencidas_suelta_solo_las_vencidas(self):
+        reservas.sincronizar('a', {self.pk: 3}, ahora=timezone.now() - VENCIDA)
+        reservas.sincronizar('b', {self.pk: 1})
+        self.assertApartado(4)
+
+        self.assertEqual(reservas.liberar_vencidas(), 1)
+        self.assertApartado(1)
+        self.assertEqual(list(reservas.de_carrito('a')), [])
+        self.assertEqual(list(reservas.de_carrito('b')), [(self.pk, 1)])
+        self.assertEqual(reservas.liberar_vencidas(), 0)
+
+    def test_apartar_barre_las_vencidas_del_producto(self):
+        """Sin esperar al barrido, lo vencido de otro carrito no le quita unidades a este"""
+        reservas.sincronizar('a', {self.pk: 5}, ahora=timezone.now() - VENCIDA)
+        self.assertEqual(reservas.sincronizar('b', {self.pk: 2}), {self.pk: 2})
+        self.assertApartado(2)
+        self.assertFalse(ReservaStock.objects.filter(llave='a').exists())
+
+    def test_convertir_descuenta_stock_y_suelta_la_reserva(self):
+        reservas.sincronizar('a', {self.pk: 2})
+        reservas.sincronizar('b', {self.pk: 1})
+        with transaction.atomic():
+            reservas.convertir('a', {self.pk: 2})
+        self.assertApartado(1, stock=3)
+        self.assertEqual(list(reservas.de_carrito('a')), [])
+
+    def test_convertir_con_reserva_vencida_y_tomada_falla_sin_cambios(self):
+        reservas.sincronizar('a', {self.pk: 3}, ahora=timezone.now() - VENCIDA)
+        # Otro carrito barre la vencida y se queda con todo el stock
+        self.assertEqual(reservas.sincronizar('b', {self.pk: 5}), {self.pk: 5})
+
+        with self.assertRaises(CheckoutError):
+            with transaction.atomic():
+                reservas.convertir('a', {self.pk: 3})
+        self.assertApartado(5)
+        self.assertEqual(list(reservas.de_carrito('b')), [(self.pk, 5)])
+
+    def test_convertir_con_reserva_vencida_sin_barrer_la_usa(self):
+        """Mientras nadie la barre, la reserva vencida sigue siendo del carrito"""
+        reservas.sincronizar('a', {self.pk: 5}, ahora=timezone.now() - VENCIDA)
+        with transaction.atomic():
+            reservas.convertir('a', {self.pk: 5})
+        self.assertApartado(0, stock=0)
+        self.assertEqual(reservas.liberar_vencidas(), 0)
@@ -0,0 +1,311 @@
+"""
+Vistas síncronas: registro y cierre de sesión, checkout, cancelar y borrar pedidos, y el
+CRUD de admin-spa. La tienda, el carrito y mis pedidos están en vistas_tienda.py.
+
+Los listados de admin-spa paginan por cursor (paginacion.py) sobre los para_listado()
+de cada modelo (con_resumen() en clientes), así que cuestan lo mismo en cualquier página.
+Los formularios de admin-spa son los ModelForm de forms.py; las plantillas escriben su
+propio HTML. Al editar, el objeto se carga con sus M2M ya leídos: las casillas preguntan
+por cada opción si está marcada y sin prefetch_related serían una consulta por opción.
+"""
+import datetime
+
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import login, logout
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from . import paginacion
+from .carrito_temporal import CarritoTemporal, confirmar_pedido, totales
+from .forms import (
+    CheckoutForm, ClienteForm, EmpleadoForm, ProductoForm, ProveedorForm, RegistroForm, ServicioForm,
+)
+from .models import CheckoutError, Clientes, Empleados, Pedido, Productos, Proveedores, Servicios
+
+
+# --- Cuenta ---
+
+def registro(request):
+    if request.user.is_authenticated:
+        return redirect('inicio')
+    form = RegistroForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        usuario = form.save()
+        # user_logged_in suma al del usuario el carrito que armó como anónimo
+        login(request, usuario, backend='django.contrib.auth.backends.ModelBackend')
+        messages.success(request, f"Bienvenido, {usuario.first_name}")
+        return redirect('inicio')
+    return render(request, 'registro.html', {'form': form})
+
+
+def custom_logout(request):
+    logout(request)
+    messages.info(request, "Cerraste sesión")
+    return redirect('inicio')
+
+
+# --- Checkout y pedidos del cliente ---
+
+def _citas(datos, items):
+    """(servicio_id, fecha, hora) de los campos cita_<servicio_id> con fecha y hora; los vacíos se omiten"""
+    citas = []
+    for item in items:
+        if item.tipo != 'servicio':
+            continue
+        valor = datos.get(f'cita_{item.servicio_id}')
+        if not valor:
+            continue
+        try:
+            momento = datetime.datetime.fromisoformat(valor)
+        except ValueError:
+            raise CheckoutError(f"Fecha inválida para {item.servicio.nombre}")
+        citas.append((item.servicio_id, momento.date(), momento.time()))
+    return citas
+
+
+@login_required
+def checkout(request):
+    temporal = CarritoTemporal.cargar(request, request.user)
+    if not temporal.lineas:
+        messages.warning(request, "Tu carrito está vacío")
+        return redirect('carrito')
+    items, avisos = temporal.resolver()
+    cliente = Clientes.objects.filter(usuario=request.user).first()
+    form = CheckoutForm(request.POST or None, initial={'telefono_contacto': cliente.telefono if cliente else ''})
+
+    if request.method == 'POST' and form.is_valid():
+        try:
+            pedido = confirmar_pedido(
+                request, request.user, citas=_citas(request.POST, items), **form.cleaned_data,
+            )
+        except CheckoutError as error:
+            # El carrito ya quedó ajustado (confirmar_pedido) o falta elegir otro horario
+            messages.error(request, str(error))
+            return redirect('checkout')
+        messages.success(request, f"Pedido #{pedido.pk} confirmado")
+        return redirect('mis_pedidos')
+    for aviso in avisos:
+        messages.warning(request, aviso)
+
+    montos = totales(items)
+    return render(request, 'checkout.html', {
+        'form': form,
+        'items': items,
+        'servicios': [item for item in items if item.tipo == 'servicio'],
+        'subtotal': montos['subtotal'],
+        'iva': montos['iva'],
+        'total_con_iva': montos['total'],
+    })
+
+
+@login_required
+def cancelar_pedido(request, pedido_id):
+    pedido = get_object_or_404(Pedido, pk=pedido_id, usuario=request.user)
+    if request.method == 'POST':
+        if pedido.cancelar():
+            messages.success(request, f"Pedido #{pedido.pk} cancelado; los productos volvieron al stock")
+        else:
+            messages.error(request, "Solo se pueden cancelar pedidos pendientes o confirmados")
+        return redirect('mis_pedidos')
+    return render(request, 'cancelar_pedido.html', {'pedido': pedido})
+
+
+@login_required
+@require_POST
+def eliminar_pedido(request, pedido_id):
+    """Quitar del historial un pedido cancelado; los demás se conservan para los reportes"""
+    pedido = get_object_or_404(Pedido, pk=pedido_id, usuario=request.user)
+    if pedido.estado != 'cancelado':
+        messages.error(request, "Solo se pueden eliminar pedidos cancelados")
+    else:
+        pedido.delete()
+        messages.success(request, f"Pedido #{pedido_id} eliminado")
+    return redirect('mis_pedidos')
+
+
+# --- admin-spa ---
+
+def _lista(request, listado, queryset, plantilla, nombre, **extra):
+    pagina = listado.paginar(queryset, request.GET)
+    return render(request, plantilla, {nombre: pagina, 'pagina': pagina, **extra})
+
+
+def _formulario(request, clase, plantilla, destino, mensaje, instancia=None, **contexto):
+    """Mostrar y procesar un ModelForm de admin-spa; los errores se muestran como mensajes"""
+    if request.method == 'POST':
+        form = clase(request.POST, request.FILES, instance=instancia)
+        if form.is_valid():
+            objeto = form.save()
+            messages.success(request, mensaje.format(objeto))
+            return redirect(destino)
+        for campo, errores in form.errors.items():
+            etiqueta = form.fields[campo].label if campo in form.fields else ''
+            for error in errores:
+                messages.error(request, f"{etiqueta}: {error}" if etiqueta else error)
+    else:
+        form = clase(instance=instancia)
+    return render(request, plantilla, {'form': form, **contexto})
+
+
+def _eliminar(request, objeto, plantilla, nombre, destino):
+    if request.method == 'POST':
+        objeto.delete()
+        messages.success(request, f"{objeto} se eliminó")
+        return redirect(destino)
+    return render(request, plantilla, {nombre: objeto})
+
+
+def servicios_lista(request):
+    """Pública: los clientes agregan servicios al carrito desde aquí"""
+    return _lista(
+        request, paginacion.SERVICIOS, Servicios.objects.para_listado(), 'admin/servicios/lista.html', 'servicios',
+    )
+
+
+@staff_member_required
+def servicio_agregar(request):
+    return _formulario(
+        request, ServicioForm, 'admin/servicios/agregar.html', 'servicios_lista', "Servicio {} agregado",
+        productos=Productos.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def servicio_editar(request, id):
+    servicio = get_object_or_404(Servicios.objects.prefetch_related('productos_utilizados'), pk=id)
+    return _formulario(
+        request, ServicioForm, 'admin/servicios/editar.html', 'servicios_lista', "Servicio {} actualizado",
+        instancia=servicio, servicio=servicio, productos=Productos.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def servicio_eliminar(request, id):
+    servicio = get_object_or_404(Servicios, pk=id)
+    return _eliminar(request, servicio, 'admin/servicios/eliminar.html', 'servicio', 'servicios_lista')
+
+
+@staff_member_required
+def empleados_lista(request):
+    return _lista(
+        request, paginacion.EMPLEADOS, Empleados.objects.para_listado(), 'admin/empleados/lista.html', 'empleados',
+    )
+
+
+@staff_member_required
+def empleado_agregar(request):
+    return _formulario(
+        request, EmpleadoForm, 'admin/empleados/agregar.html', 'empleados_lista', "Empleado {} agregado",
+        servicios=Servicios.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def empleado_editar(request, id):
+    empleado = get_object_or_404(Empleados.objects.select_related('servicio'), pk=id)
+    return _formulario(
+        request, EmpleadoForm, 'admin/empleados/editar.html', 'empleados_lista', "Empleado {} actualizado",
+        instancia=empleado, empleado=empleado, servicios=Servicios.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def empleado_eliminar(request, id):
+    empleado = get_object_or_404(Empleados.objects.select_related('servicio'), pk=id)
+    return _eliminar(request, empleado, 'admin/empleados/eliminar.html', 'empleado', 'empleados_lista')
+
+
+@staff_member_required
+def clientes_lista(request):
+    return _lista(
+        request, paginacion.CLIENTES, Clientes.objects.con_resumen(), 'admin/clientes/lista.html', 'clientes',
+    )
+
+
+@staff_member_required
+def cliente_agregar(request):
+    return _formulario(
+        request, ClienteForm, 'admin/clientes/agregar.html', 'clientes_lista', "Cliente {} agregado",
+        servicios=Servicios.objects.order_by('nombre'), productos=Productos.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def cliente_editar(request, id):
+    cliente = get_object_or_404(Clientes.objects.prefetch_related('servicios', 'productos_interes'), pk=id)
+    return _formulario(
+        request, ClienteForm, 'admin/clientes/editar.html', 'clientes_lista', "Cliente {} actualizado",
+        instancia=cliente, cliente=cliente,
+        servicios=Servicios.objects.order_by('nombre'), productos=Productos.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def cliente_eliminar(request, id):
+    cliente = get_object_or_404(Clientes, pk=id)
+    return _eliminar(request, cliente, 'admin/clientes/eliminar.html', 'cliente', 'clientes_lista')
+
+
+@staff_member_required
+def proveedores_lista(request):
+    return _lista(
+        request, paginacion.PROVEEDORES, Proveedores.objects.para_listado(), 'admin/proveedores/lista.html',
+        'proveedores',
+    )
+
+
+@staff_member_required
+def proveedor_agregar(request):
+    return _formulario(
+        request, ProveedorForm, 'admin/proveedores/agregar.html', 'proveedores_lista', "Proveedor {} agregado",
+    )
+
+
+@staff_member_required
+def proveedor_editar(request, id):
+    proveedor = get_object_or_404(Proveedores, pk=id)
+    return _formulario(
+        request, ProveedorForm, 'admin/proveedores/editar.html', 'proveedores_lista', "Proveedor {} actualizado",
+        instancia=proveedor, proveedor=proveedor,
+    )
+
+
+@staff_member_required
+def proveedor_eliminar(request, id):
+    proveedor = get_object_or_404(Proveedores, pk=id)
+    return _eliminar(request, proveedor, 'admin/proveedores/eliminar.html', 'proveedor', 'proveedores_lista')
+
+
+@staff_member_required
+def productos_lista(request):
+    return _lista(
+        request, paginacion.PRODUCTOS, Productos.objects.para_listado(), 'admin/productos/lista.html', 'productos',
+    )
+
+
+@staff_member_required
+def producto_agregar(request):
+    return _formulario(
+        request, ProductoForm, 'admin/productos/agregar.html', 'productos_lista', "Producto {} agregado",
+        proveedores=Proveedores.objects.order_by('nombre_empresa'), servicios=Servicios.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def producto_editar(request, id):
+    producto = get_object_or_404(
+        Productos.objects.select_related('proveedor').prefetch_related('servicios'), pk=id,
+    )
+    return _formulario(
+        request, ProductoForm, 'admin/productos/editar.html', 'productos_lista', "Producto {} actualizado",
+        instancia=producto, producto=producto,
+        proveedores=Proveedores.objects.order_by('nombre_empresa'), servicios=Servicios.objects.order_by('nombre'),
+    )
+
+
+@staff_member_required
+def producto_eliminar(request, id):
+    producto = get_object_or_404(Productos.objects.select_related('proveedor'), pk=id)
+    return _eliminar(request, producto, 'admin/productos/eliminar.html', 'producto', 'productos_lista')
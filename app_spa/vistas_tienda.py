@@ -0,0 +1,168 @@
+"""
+Vistas asíncronas de la tienda: inicio, catálogo, carrito y mis pedidos.
+
+Las lecturas usan el ORM asíncrono (aget, afirst, async for) y el usuario se resuelve
+con request.auser(), así que bajo ASGI una consulta lenta no ocupa un hilo del servidor;
+bajo WSGI Django las ejecuta con async_to_sync y siguen funcionando igual.
+El carrito, también para anónimos, es el CarritoTemporal en caché: navegar y armarlo
+no escribe en la base de datos.
+El render de plantillas es síncrono: todo lo que la plantilla toca se carga antes con
+select_related/prefetch_related, porque una consulta perezosa dentro del render
+fallaría con SynchronousOnlyOperation.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_GET, require_POST
+
+from . import busqueda, paginacion, recomendaciones
+from .cache_catalogo import cache_pagina_catalogo
+from .carrito_temporal import CarritoTemporal, totales
+from .models import Pedido, Productos, Servicios
+
+DESTACADOS = 6
+# La tienda pagina los productos; de los servicios muestra los primeros y enlaza a servicios_lista
+SERVICIOS_TIENDA = 8
+# Resultados de ?q= en la tienda, por relevancia (bm25) y sin paginar
+LIMITE_BUSQUEDA = 48
+
+
+async def _preparar(request):
+    """Resolver usuario y contador del carrito antes del render síncrono"""
+    usuario = await request.auser()
+    # La plantilla y los context processors leen request.user sin await
+    request.user = usuario
+    temporal = await CarritoTemporal.acargar(request, usuario)
+    request.carrito_count = temporal.total_items()
+    return usuario, temporal
+
+
+def _volver(request, por_defecto):
+    """Regresar a la página de origen si es de este sitio"""
+    origen = request.headers.get('Referer')
+    if origen and url_has_allowed_host_and_scheme(origen, {request.get_host()}, request.is_secure()):
+        return redirect(origen)
+    return redirect(por_defecto)
+
+
+@cache_pagina_catalogo
+@require_GET
+async def inicio(request):
+    await _preparar(request)
+    servicios = [servicio async for servicio in Servicios.objects.order_by('-pk')[:DESTACADOS]]
+    productos = [
+        producto async for producto in
+        Productos.objects.select_related('proveedor').filter(stock__gt=0).order_by('-pk')[:DESTACADOS]
+    ]
+    return render(request, 'inicio.html', {'servicios': servicios, 'productos': productos})
+
+
+@cache_pagina_catalogo
+@require_GET
+async def tienda(request):
+    await _preparar(request)
+    texto = request.GET.get('q', '').strip()
+    if texto:
+        return await _buscar(request, texto)
+    servicios = [servicio async for servicio in Servicios.objects.order_by('nombre')[:SERVICIOS_TIENDA + 1]]
+    pagina = await paginacion.TIENDA.apaginar(Productos.objects.select_related('proveedor'), request.GET)
+    return render(request, 'tienda.html', {
+        'servicios': servicios[:SERVICIOS_TIENDA],
+        'mas_servicios': len(servicios) > SERVICIOS_TIENDA,
+        'productos': pagina,
+        'pagina': pagina,
+    })
+
+
+@sync_to_async
+def _resultados(texto):
+    # El índice FTS5 (busqueda.py) se consulta con el cursor síncrono
+    return (
+        busqueda.buscar(texto, 'producto', Productos.objects.select_related('proveedor'), LIMITE_BUSQUEDA),
+        busqueda.buscar(texto, 'servicio', Servicios.objects.all(), LIMITE_BUSQUEDA),
+    )
+
+
+async def _buscar(request, texto):
+    productos, servicios = await _resultados(texto)
+    return render(request, 'tienda.html', {'q': texto, 'servicios': servicios, 'productos': productos})
+
+
+@require_GET
+async def carrito(request):
+    _, temporal = await _preparar(request)
+    items, avisos = await temporal.aresolver()
+    if avisos:
+        for aviso in avisos:
+            messages.warning(request, aviso)
+        await temporal.aguardar()
+    request.carrito_count = temporal.total_items()
+
+    montos = totales(items)
+    return render(request, 'carrito.html', {
+        'carrito': temporal,
+        'items': items,
+        'recomendados': await recomendaciones.apara(item.clave for item in items),
+        'subtotal': montos['subtotal'],
+        'iva': montos['iva'],
+        'total_con_iva': montos['total'],
+        'texto_boton': 'Reservar y Pagar' if temporal.tiene_servicios() else 'Proceder al Pago',
+    })
+
+
+async def _operar(request, operacion, exito, respuesta):
+    """Versión sin JavaScript de api.carrito: una sola operación y redirección"""
+    async with CarritoTemporal.aeditar(request, await request.auser()) as temporal:
+        _, avisos, errores = await temporal.aaplicar([operacion])
+        if errores:
+            messages.error(request, errores[0]['error'])
+        else:
+            await temporal.aguardar()
+            messages.success(request, exito)
+    for aviso in avisos:
+        messages.warning(request, aviso)
+    return temporal.poner_cookie(respuesta)
+
+
+@require_POST
+async def agregar_carrito(request, producto_id):
+    producto = await aget_object_or_404(Productos, pk=producto_id)
+    if producto.disponible() < 1:
+        messages.error(request, f"{producto.nombre} está agotado")
+        return _volver(request, 'tienda')
+    operacion = {'op': 'agregar', 'tipo': 'producto', 'id': producto.pk}
+    return await _operar(request, operacion, f"{producto.nombre} se agregó al carrito", _volver(request, 'tienda'))
+
+
+@require_POST
+async def agregar_servicio_carrito(request, servicio_id):
+    servicio = await aget_object_or_404(Servicios, pk=servicio_id)
+    operacion = {'op': 'agregar', 'tipo': 'servicio', 'id': servicio.pk}
+    return await _operar(request, operacion, f"{servicio.nombre} se agregó al carrito", _volver(request, 'inicio'))
+
+
+@require_POST
+async def actualizar_carrito(request, clave):
+    try:
+        cantidad = int(request.POST.get('cantidad', ''))
+    except ValueError:
+        cantidad = -1
+    operacion = {'op': 'fijar', 'clave': clave, 'cantidad': cantidad}
+    return await _operar(request, operacion, "Cantidad actualizada", redirect('carrito'))
+
+
+@require_POST
+async def eliminar_carrito(request, clave):
+    operacion = {'op': 'quitar', 'clave': clave}
+    return await _operar(request, operacion, "Item eliminado del carrito", redirect('carrito'))
+
+
+@login_required
+@require_GET
+async def mis_pedidos(request):
+    usuario, _ = await _preparar(request)
+    pedidos = Pedido.objects.filter(usuario=usuario).prefetch_related('items__producto', 'items__servicio')
+    pagina = await paginacion.PEDIDOS.apaginar(pedidos, request.GET)
+    return render(request, 'mis_pedidos.html', {'pedidos': pagina, 'pagina': pagina})
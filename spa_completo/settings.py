@@ -20,6 +20,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app_spa.rendimiento.MedicionRendimiento',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +50,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'spa_completo.wsgi.application'
+# Las vistas de la tienda son async; con uvicorn/daphne se sirven sin ocupar un hilo por petición
+ASGI_APPLICATION = 'spa_completo.asgi.application'
 
 DATABASES = {
     'default': {
@@ -56,6 +59,80 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# Perfil de producción (app_spa/basedatos.py): WAL, PRAGMAs y BEGIN IMMEDIATE.
+# SPA_DB_LECTURA agrega la conexión de solo lectura para catálogo y reportes.
+# SPA_DB_CONN_MAX_AGE: 0 (sin conexiones persistentes) bajo ASGI; solo subirlo con WSGI
+if os.environ.get('SPA_DB_PRODUCCION'):
+    from app_spa import basedatos
+
+    DATABASES = basedatos.perfil_produccion(
+        DATABASES['default']['NAME'],
+        lectura=bool(os.environ.get('SPA_DB_LECTURA')),
+        conn_max_age=int(os.environ.get('SPA_DB_CONN_MAX_AGE', basedatos.CONN_MAX_AGE)),
+    )
+    if basedatos.LECTURA in DATABASES:
+        DATABASE_ROUTERS = ['app_spa.basedatos.EnrutadorLectura']
+
+# Caché local en memoria por defecto; SPA_CACHE_DIR usa archivos, compartidos entre procesos.
+# MAX_ENTRIES alto: los fragmentos por fila del catálogo no deben desalojar la versión ni los contadores
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'spa-completo',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+}
+# 'carritos' guarda la copia de trabajo de los carritos (app_spa/carrito_temporal.py) aparte, para que
+# los fragmentos del catálogo no la desalojen. En producción, con varios workers, debe ser compartida
+# (SPA_CACHE_DIR, memcached o redis): en memoria local cada proceso vería un carrito distinto
+CACHES['carritos'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'spa-carritos',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
+}
+if os.environ.get('SPA_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['SPA_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+    CACHES['carritos'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.environ['SPA_CACHE_DIR'], 'carritos'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
+# Caché de páginas y fragmentos del catálogo (app_spa/cache_catalogo.py)
+CACHE_CATALOGO = True
+
+# Cuánto aparta el stock un carrito sin cambios (app_spa/reservas.py); manage.py liberar_reservas
+# barre las reservas vencidas y conviene correrlo desde cron cada minuto
+RESERVA_STOCK_MINUTOS = 15
+
+# Cola de tareas (app_spa/cola.py). Sin workers cada tarea corre al confirmar la transacción en el
+# mismo proceso (reintentos y retrasos: `manage.py run_workers --una-vez` desde cron); con
+# SPA_WORKERS=1 todas esperan en la base de datos a `manage.py run_workers`
+TAREAS_EN_LINEA = not os.environ.get('SPA_WORKERS')
+
+# Medición por petición (app_spa/rendimiento.py): fracción de peticiones medidas y umbrales.
+# Muestreo bajo por defecto; con DEBUG se miden todas. SPA_PERF_MUESTREO lo fija en cualquier caso
+PERF_MUESTREO = float(os.environ.get('SPA_PERF_MUESTREO', '1' if DEBUG else '0.05'))
+PERF_PETICION_LENTA_MS = 500
+PERF_CONSULTA_LENTA_MS = 100
+
+# app_spa.rendimiento escribe una línea JSON por petición medida (INFO) y las lentas (WARNING)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'consola': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'app_spa.rendimiento': {
+            'handlers': ['consola'],
+            'level': os.environ.get('SPA_PERF_LOG', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -66,6 +143,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic: nombres con hash, CSS vendorizado purgado y variantes .gz/.br
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'app_spa.estaticos.SpaStaticStorage'},
+}
+SPA_PURGAR_CSS = [
+    'vendor/bootstrap-5.1.3/css/bootstrap.min.css',
+    'vendor/bootstrap-icons-1.8.0/bootstrap-icons.css',
+]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -1,26 +1,38 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
+from app_spa import api as spa_api
+from app_spa import cola
+from app_spa import estaticos
+from app_spa import rendimiento
+from app_spa import reportes
 from app_spa import views as spa_views
+from app_spa import vistas_tienda
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', spa_views.inicio, name='inicio'),
+    path('', vistas_tienda.inicio, name='inicio'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', spa_views.custom_logout, name='logout'),
     path('registro/', spa_views.registro, name='registro'),
-    path('tienda/', spa_views.tienda, name='tienda'),
-    path('carrito/', spa_views.carrito, name='carrito'),
-    path('agregar-carrito/<int:producto_id>/', spa_views.agregar_carrito, name='agregar_carrito'),
-    path('agregar-servicio-carrito/<int:servicio_id>/', spa_views.agregar_servicio_carrito, name='agregar_servicio_carrito'),
-    path('eliminar-carrito/<int:item_id>/', spa_views.eliminar_carrito, name='eliminar_carrito'),
-    path('actualizar-carrito/<int:item_id>/', spa_views.actualizar_carrito, name='actualizar_carrito'),
+    path('tienda/', vistas_tienda.tienda, name='tienda'),
+    path('carrito/', vistas_tienda.carrito, name='carrito'),
+    path('agregar-carrito/<int:producto_id>/', vistas_tienda.agregar_carrito, name='agregar_carrito'),
+    path('agregar-servicio-carrito/<int:servicio_id>/', vistas_tienda.agregar_servicio_carrito, name='agregar_servicio_carrito'),
+    path('eliminar-carrito/<slug:clave>/', vistas_tienda.eliminar_carrito, name='eliminar_carrito'),
+    path('actualizar-carrito/<slug:clave>/', vistas_tienda.actualizar_carrito, name='actualizar_carrito'),
     path('checkout/', spa_views.checkout, name='checkout'),
-    path('pedidos/', spa_views.mis_pedidos, name='mis_pedidos'),
+    path('pedidos/', vistas_tienda.mis_pedidos, name='mis_pedidos'),
     path('cancelar-pedido/<int:pedido_id>/', spa_views.cancelar_pedido, name='cancelar_pedido'),
     path('eliminar-pedido/<int:pedido_id>/', spa_views.eliminar_pedido, name='eliminar_pedido'),
+    path('api/buscar/', spa_api.buscar_catalogo, name='buscar_catalogo'),
+    path('api/cache/', spa_api.estadisticas_cache, name='estadisticas_cache'),
+    path('api/exportar/<str:conjunto>/', spa_api.exportar, name='exportar'),
+    path('api/carrito/', spa_api.carrito, name='api_carrito'),
+    path('api/servicios/<int:servicio_id>/disponibilidad/', spa_api.disponibilidad, name='disponibilidad_servicio'),
+    path('api/recomendados/', spa_api.recomendados, name='recomendados'),
     
     # URLs de administración (SOLO PARA STAFF/ADMIN)
     path('admin-spa/servicios/', spa_views.servicios_lista, name='servicios_lista'),
@@ -47,8 +59,17 @@ urlpatterns = [
     path('admin-spa/productos/agregar/', spa_views.producto_agregar, name='producto_agregar'),
     path('admin-spa/productos/editar/<int:id>/', spa_views.producto_editar, name='producto_editar'),
     path('admin-spa/productos/eliminar/<int:id>/', spa_views.producto_eliminar, name='producto_eliminar'),
+
+    path('admin-spa/ventas/', reportes.dashboard_ventas, name='dashboard_ventas'),
+    path('admin-spa/perf/', rendimiento.panel_rendimiento, name='panel_rendimiento'),
+    path('admin-spa/tareas/', cola.panel_tareas, name='panel_tareas'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+else:
+    # Sin servidor web delante (kioscos): estáticos precomprimidos con caché inmutable
+    urlpatterns += [
+        re_path(r'^%s(?P<ruta>.*)$' % settings.STATIC_URL.lstrip('/'), estaticos.servir, name='estaticos'),
+    ]
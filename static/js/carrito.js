@@ -0,0 +1,151 @@
+/*
+ * Carrito sin recargar la página. Las operaciones de un mismo momento (varios clics
+ * seguidos) se juntan en un solo POST a /api/carrito/ y la respuesta actualiza líneas,
+ * totales y contador. Sin JavaScript los botones envían sus formularios (POST con CSRF).
+ *
+ * Marcado:
+ *   <button data-carrito-agregar="producto:12">          agrega una unidad
+ *   <form data-carrito-fijar="p-12"> <input name="cantidad">   fija la cantidad
+ *   <button data-carrito-quitar="p-12">                   quita la línea
+ *   [data-carrito-linea="p-12"] [data-carrito-campo="subtotal"]
+ *   [data-carrito-total="subtotal|iva|total|total_items"], [data-carrito-contador]
+ *   [data-carrito-resumen]                                página del carrito (al vaciarse se recarga)
+ *   [data-carrito-avisos]                                 contenedor de avisos
+ */
+(function () {
+    'use strict';
+
+    var url = document.body.dataset.carritoApi;
+    if (!url || !window.fetch) {
+        return;
+    }
+    var ESPERA_MS = 250;
+    var pendientes = [];
+    var temporizador = null;
+
+    function csrf() {
+        var coincidencia = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return coincidencia ? decodeURIComponent(coincidencia[1]) : null;
+    }
+
+    function dinero(valor) {
+        return '$' + Number(valor).toFixed(2);
+    }
+
+    function avisar(mensajes, tipo) {
+        var contenedor = document.querySelector('[data-carrito-avisos]');
+        if (!contenedor) {
+            return;
+        }
+        mensajes.forEach(function (mensaje) {
+            var alerta = document.createElement('div');
+            alerta.className = 'alert alert-' + tipo + ' alert-dismissible fade show';
+            alerta.setAttribute('role', 'alert');
+            alerta.textContent = mensaje;
+            var cerrar = document.createElement('button');
+            cerrar.type = 'button';
+            cerrar.className = 'btn-close';
+            cerrar.setAttribute('data-bs-dismiss', 'alert');
+            alerta.appendChild(cerrar);
+            contenedor.appendChild(alerta);
+        });
+    }
+
+    function pintar(datos) {
+        document.querySelectorAll('[data-carrito-contador]').forEach(function (elemento) {
+            elemento.textContent = datos.total_items;
+        });
+        ['subtotal', 'iva', 'total'].forEach(function (campo) {
+            document.querySelectorAll('[data-carrito-total="' + campo + '"]').forEach(function (elemento) {
+                elemento.textContent = dinero(datos[campo]);
+            });
+        });
+        document.querySelectorAll('[data-carrito-total="total_items"]').forEach(function (elemento) {
+            elemento.textContent = datos.total_items;
+        });
+
+        var lineas = {};
+        datos.items.forEach(function (item) {
+            lineas[item.clave] = item;
+        });
+        document.querySelectorAll('[data-carrito-linea]').forEach(function (fila) {
+            var item = lineas[fila.dataset.carritoLinea];
+            if (!item) {
+                fila.remove();
+                return;
+            }
+            var subtotal = fila.querySelector('[data-carrito-campo="subtotal"]');
+            var cantidad = fila.querySelector('input[name="cantidad"]');
+            if (subtotal) {
+                subtotal.textContent = dinero(item.subtotal);
+            }
+            if (cantidad) {
+                cantidad.value = item.cantidad;
+                cantidad.max = item.maximo;
+            }
+        });
+        if (!datos.items.length && document.querySelector('[data-carrito-resumen]')) {
+            // Carrito vacío: la página completa muestra su propio estado vacío
+            window.location.reload();
+        }
+        avisar(datos.avisos || [], 'warning');
+    }
+
+    function enviar() {
+        var operaciones = pendientes;
+        pendientes = [];
+        temporizador = null;
+        var preparar = csrf() ? Promise.resolve() : fetch(url, {credentials: 'same-origin'});
+        return preparar.then(function () {
+            return fetch(url, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrf()},
+                body: JSON.stringify({operaciones: operaciones})
+            });
+        }).then(function (respuesta) {
+            return respuesta.json().then(function (datos) {
+                if (!respuesta.ok) {
+                    avisar((datos.errores || [{error: datos.error}]).map(function (e) { return e.error; }), 'danger');
+                    return fetch(url, {credentials: 'same-origin'}).then(function (r) { return r.json(); });
+                }
+                return datos;
+            });
+        }).then(pintar).catch(function () {
+            avisar(['No se pudo actualizar el carrito, intenta de nuevo'], 'danger');
+        });
+    }
+
+    function programar(operacion) {
+        pendientes.push(operacion);
+        if (temporizador === null) {
+            temporizador = window.setTimeout(enviar, ESPERA_MS);
+        }
+    }
+
+    document.addEventListener('click', function (evento) {
+        if (evento.defaultPrevented) {
+            return;
+        }
+        var agregar = evento.target.closest('[data-carrito-agregar]');
+        var quitar = evento.target.closest('[data-carrito-quitar]');
+        if (agregar) {
+            var partes = agregar.dataset.carritoAgregar.split(':');
+            evento.preventDefault();
+            programar({op: 'agregar', tipo: partes[0], id: parseInt(partes[1], 10), cantidad: 1});
+        } else if (quitar) {
+            evento.preventDefault();
+            programar({op: 'quitar', clave: quitar.dataset.carritoQuitar});
+        }
+    });
+
+    document.addEventListener('submit', function (evento) {
+        var formulario = evento.target.closest('[data-carrito-fijar]');
+        if (!formulario) {
+            return;
+        }
+        evento.preventDefault();
+        var cantidad = parseInt(formulario.elements.cantidad.value, 10);
+        programar({op: 'fijar', clave: formulario.dataset.carritoFijar, cantidad: isNaN(cantidad) ? -1 : cantidad});
+    });
+})();